@@ -1,7 +1,14 @@
 import api from './axios'
 
-export const adminListUsers = async () => {
-  const res = await api.get('/admin/users')
+// Resolves to { data, pagination: { limit, count, total?, next_cursor } }
+export const adminListUsers = async (params = {}) => {
+  const res = await api.get('/admin/users', { params })
+  return res.data
+}
+
+// Resolves to { users, products, orders, archived_orders, orders_by_status, revenue, refreshed_at }
+export const adminStats = async () => {
+  const res = await api.get('/admin/stats')
   return res.data
 }
 
@@ -16,8 +16,9 @@ export const getOrdersByUser = async (userId) => {
 }
 
 // Admin
-export const adminListOrders = async () => {
-  const res = await api.get('/orders')
+// Resolves to { data, pagination: { limit, count, total?, next_cursor } }
+export const adminListOrders = async (params = {}) => {
+  const res = await api.get('/orders', { params })
   return res.data
 }
 
@@ -26,3 +27,8 @@ export const adminUpdateOrderStatus = async (id, status) => {
   return res.data
 }
 
+// updates: [{ order_id, status }]; resolves to per-order outcomes
+export const adminBulkUpdateOrderStatus = async (updates) => {
+  const res = await api.post('/admin/orders/status', { updates })
+  return res.data
+}
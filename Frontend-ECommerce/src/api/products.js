@@ -10,6 +10,24 @@ export const fetchProductById = async (id) => {
   return res.data
 }
 
+// Frequently bought together: [{ product_id, lift, count }]
+export const fetchRelatedProducts = async (id, limit) => {
+  const res = await api.get(`/product/${id}/related`, { params: { limit } })
+  return res.data
+}
+
+// Resolves to { categories: [{ category, product_count, min_price, max_price }], refreshed_at }
+export const fetchCategories = async () => {
+  const res = await api.get('/catalog/categories')
+  return res.data
+}
+
+// window: 'all' (units sold) or a trending window such as 'day' / 'week'
+export const fetchBestsellers = async ({ category, window = 'all', limit = 10 } = {}) => {
+  const res = await api.get('/products/bestsellers', { params: { category, window, limit } })
+  return res.data
+}
+
 export const searchProducts = async (query) => {
   const res = await api.post('/search-product', { query })
   return res.data
@@ -36,8 +54,29 @@ export const adminDeleteProduct = async (id) => {
   return res.data
 }
 
-export const adminListProducts = async () => {
-  const res = await api.get('/admin/products')
+// Resolves to { data, pagination: { limit, count, total?, next_cursor } }
+export const adminListProducts = async (params = {}) => {
+  const res = await api.get('/admin/products', { params })
+  return res.data
+}
+
+// Reviews
+export const fetchProductReviews = async (id, { cursor, limit = 20 } = {}) => {
+  const res = await api.get(`/product/${id}/reviews`, { params: { cursor, limit } })
+  return res.data
+}
+
+export const addReview = async (id, review) => {
+  const res = await api.post(`/product/${id}/reviews`, review)
   return res.data
 }
 
+export const updateReview = async (reviewId, update) => {
+  const res = await api.put(`/reviews/${reviewId}`, update)
+  return res.data
+}
+
+export const deleteReview = async (reviewId) => {
+  const res = await api.delete(`/reviews/${reviewId}`)
+  return res.data
+}
@@ -1,6 +1,6 @@
 import React, { useMemo, useState } from 'react'
 import { useMutation, useQuery } from '@tanstack/react-query'
-import { fetchProducts, searchProducts, filterProducts } from '../api/products'
+import { fetchProducts, searchProducts, filterProducts, fetchCategories } from '../api/products'
 import ProductCard from '../components/ProductCard'
 import Pagination from '../components/Pagination'
 import { useAuth } from '../context/AuthContext'
@@ -17,6 +17,8 @@ export default function ProductListPage() {
     queryFn: () => fetchProducts({ page, limit }),
   })
 
+  const categoriesQ = useQuery({ queryKey: ['categories'], queryFn: fetchCategories })
+
   const searchMut = useMutation({ mutationFn: (q) => searchProducts(q) })
   const filterMut = useMutation({ mutationFn: (f) => filterProducts(f) })
 
@@ -65,7 +67,12 @@ export default function ProductListPage() {
         <div>
           <label>Filters</label>
           <div style={{ display: 'flex', gap: 8 }}>
-            <input placeholder="Category" value={filters.category} onChange={(e) => setFilters({ ...filters, category: e.target.value })} />
+            <select value={filters.category} onChange={(e) => setFilters({ ...filters, category: e.target.value })}>
+              <option value="">All categories</option>
+              {(categoriesQ.data?.categories || []).map((c) => (
+                <option key={c.category} value={c.category}>{c.category} ({c.product_count})</option>
+              ))}
+            </select>
             <input placeholder="Min Price" type="number" value={filters.min_price} onChange={(e) => setFilters({ ...filters, min_price: e.target.value })} />
             <input placeholder="Max Price" type="number" value={filters.max_price} onChange={(e) => setFilters({ ...filters, max_price: e.target.value })} />
             <input placeholder="Min Rating" type="number" value={filters.min_rating} onChange={(e) => setFilters({ ...filters, min_rating: e.target.value })} />
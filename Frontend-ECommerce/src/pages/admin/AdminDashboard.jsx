@@ -1,10 +1,23 @@
 import React from 'react'
 import { Link } from 'react-router-dom'
+import { useQuery } from '@tanstack/react-query'
+import { adminStats } from '../../api/admin'
 
 export default function AdminDashboard() {
+  const statsQ = useQuery({ queryKey: ['adminStats'], queryFn: adminStats })
+  const stats = statsQ.data
+
   return (
     <div>
       <h2>Admin</h2>
+      {stats && (
+        <ul>
+          <li>Users: {stats.users}</li>
+          <li>Products: {stats.products}</li>
+          <li>Orders: {stats.orders}</li>
+          <li>Revenue: {stats.revenue}</li>
+        </ul>
+      )}
       <ul>
         <li><Link to="/admin/users">Users</Link></li>
         <li><Link to="/admin/products">Products</Link></li>
@@ -13,4 +26,3 @@ export default function AdminDashboard() {
     </div>
   )
 }
-
@@ -3,12 +3,16 @@ import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query'
 import { adminListOrders, adminUpdateOrderStatus } from '../../api/orders'
 import { adminDeleteOrder, adminListUsers } from '../../api/admin'
 import { adminListProducts } from '../../api/products'
+import Pagination from '../../components/Pagination'
+import { useCursorPages } from '../../utils/cursorPages'
 
 export default function OrdersAdminPage() {
   const qc = useQueryClient()
-  const ordersQ = useQuery({ queryKey: ['adminOrders'], queryFn: adminListOrders })
-  const usersQ = useQuery({ queryKey: ['adminUsers'], queryFn: adminListUsers })
-  const productsQ = useQuery({ queryKey: ['adminProducts'], queryFn: adminListProducts })
+  const { page, cursor, setPage } = useCursorPages()
+  const ordersQ = useQuery({ queryKey: ['adminOrders', cursor], queryFn: () => adminListOrders({ cursor }) })
+  // Name lookups use the first (largest) page; anything beyond it falls back to the id
+  const usersQ = useQuery({ queryKey: ['adminUsers', 'lookup'], queryFn: () => adminListUsers({ limit: 200 }) })
+  const productsQ = useQuery({ queryKey: ['adminProducts', 'lookup'], queryFn: () => adminListProducts({ limit: 200 }) })
   const [statusById, setStatusById] = useState({})
 
   const statusMut = useMutation({
@@ -23,13 +27,13 @@ export default function OrdersAdminPage() {
 
   const userIdToName = useMemo(() => {
     const map = {}
-    ;(usersQ.data || []).forEach((u) => { map[u.id] = u.name })
+    ;(usersQ.data?.data || []).forEach((u) => { map[u.id] = u.name })
     return map
   }, [usersQ.data])
 
   const productIdToName = useMemo(() => {
     const map = {}
-    ;(productsQ.data || []).forEach((p) => { map[p.id] = p.name })
+    ;(productsQ.data?.data || []).forEach((p) => { map[p.id] = p.name })
     return map
   }, [productsQ.data])
 
@@ -53,7 +57,7 @@ export default function OrdersAdminPage() {
           </tr>
         </thead>
         <tbody>
-          {ordersQ.data?.map((o) => (
+          {ordersQ.data?.data.map((o) => (
             <tr key={o.id}>
               <td>{o.id}</td>
               <td>{userIdToName[o.user_id] || o.user_id}</td>
@@ -76,6 +80,7 @@ export default function OrdersAdminPage() {
           ))}
         </tbody>
       </table>
+      <Pagination page={page} setPage={setPage(ordersQ.data?.pagination.next_cursor)} hasNext={!!ordersQ.data?.pagination.next_cursor} />
     </div>
   )
 }
@@ -1,12 +1,15 @@
 import React, { useState } from 'react'
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query'
 import { adminListProducts, adminAddProduct, adminUpdateProduct, adminDeleteProduct } from '../../api/products'
+import Pagination from '../../components/Pagination'
+import { useCursorPages } from '../../utils/cursorPages'
 
 const empty = { name: '', price: '', description: '', stock: '', image_url: '', category: '', rating: '' }
 
 export default function ProductsAdminPage() {
   const qc = useQueryClient()
-  const { data, isLoading, isError } = useQuery({ queryKey: ['adminProducts'], queryFn: adminListProducts })
+  const { page, cursor, setPage } = useCursorPages()
+  const { data, isLoading, isError } = useQuery({ queryKey: ['adminProducts', cursor], queryFn: () => adminListProducts({ cursor }) })
   const [form, setForm] = useState(empty)
 
   const addMut = useMutation({
@@ -59,7 +62,7 @@ export default function ProductsAdminPage() {
           </tr>
         </thead>
         <tbody>
-          {data?.map((p) => (
+          {data?.data.map((p) => (
             <tr key={p.id}>
               <td>{p.id}</td>
               <td>{p.name}</td>
@@ -74,6 +77,7 @@ export default function ProductsAdminPage() {
           ))}
         </tbody>
       </table>
+      <Pagination page={page} setPage={setPage(data?.pagination.next_cursor)} hasNext={!!data?.pagination.next_cursor} />
     </div>
   )
 }
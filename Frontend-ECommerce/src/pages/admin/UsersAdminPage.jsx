@@ -1,10 +1,13 @@
 import React from 'react'
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query'
 import { adminListUsers, adminDeleteUser } from '../../api/admin'
+import Pagination from '../../components/Pagination'
+import { useCursorPages } from '../../utils/cursorPages'
 
 export default function UsersAdminPage() {
   const qc = useQueryClient()
-  const { data, isLoading, isError } = useQuery({ queryKey: ['adminUsers'], queryFn: adminListUsers })
+  const { page, cursor, setPage } = useCursorPages()
+  const { data, isLoading, isError } = useQuery({ queryKey: ['adminUsers', cursor], queryFn: () => adminListUsers({ cursor }) })
 
   const delMut = useMutation({
     mutationFn: (id) => adminDeleteUser(id),
@@ -28,7 +31,7 @@ export default function UsersAdminPage() {
           </tr>
         </thead>
         <tbody>
-          {data?.map((u) => (
+          {data?.data.map((u) => (
             <tr key={u.id}>
               <td>{u.id}</td>
               <td>{u.name}</td>
@@ -39,6 +42,7 @@ export default function UsersAdminPage() {
           ))}
         </tbody>
       </table>
+      <Pagination page={page} setPage={setPage(data?.pagination.next_cursor)} hasNext={!!data?.pagination.next_cursor} />
     </div>
   )
 }
@@ -0,0 +1,14 @@
+import { useState } from 'react'
+
+// Cursor paging for the admin lists: keeps the cursors of the pages visited so Prev can go back
+export function useCursorPages() {
+  const [cursors, setCursors] = useState([null])
+  const page = cursors.length
+  const cursor = cursors[page - 1]
+  // Adapts to <Pagination setPage>: nextCursor comes from the current response's pagination.next_cursor
+  const setPage = (nextCursor) => (update) => {
+    const target = update(page)
+    setCursors((prev) => (target > prev.length ? [...prev, nextCursor] : prev.slice(0, Math.max(1, target))))
+  }
+  return { page, cursor, setPage }
+}
@@ -0,0 +1,31 @@
+import os
+
+from dotenv import load_dotenv
+
+from factories.cache_factory import CacheFactory, BaseCacheBackend
+
+# Load the .env file
+load_dotenv();
+
+# "memory" (per process), "redis" (shared) or "two_level" (in-process L1 + shared L2)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", "5"))
+
+cache_factory = CacheFactory()
+
+
+def make_cache(namespace: str, ttl: float, max_size: int = 10_000, backend: str = None) -> BaseCacheBackend:
+    """Build a cache for the configured backend (CACHE_BACKEND unless overridden)."""
+    backend = backend or CACHE_BACKEND
+    if backend == "memory":
+        return cache_factory.create("memory", namespace=namespace, ttl=ttl, max_size=max_size)
+    if backend == "redis":
+        return cache_factory.create("redis", namespace=namespace, ttl=ttl, url=REDIS_URL)
+    return cache_factory.create("two_level", namespace=namespace, ttl=ttl, url=REDIS_URL,
+                                l1_ttl=CACHE_L1_TTL, l1_max_size=max_size)
+
+
+# Shared caches
+product_cache = make_cache("product", float(os.getenv("PRODUCT_CACHE_TTL", "60")), 50_000)
+principal_cache = make_cache("principal", float(os.getenv("PRINCIPAL_CACHE_TTL", "30")), 50_000)
@@ -1,6 +1,9 @@
 import os
 from pymongo import MongoClient
 
+from utils.metrics import mongo_event_listeners
+from utils.query_counter import QueryCounterListener
+
 from dotenv import load_dotenv
 
 # Load the .env file
@@ -10,12 +13,48 @@ load_dotenv();
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-# Make the mongo db connection
-client = MongoClient(MONGO_URI);
-db = client[DB_NAME]
+# "mongo" (default) or "memory" to run every route against in-process collections
+DB_BACKEND = os.getenv("DB_BACKEND", "mongo")
+
+if DB_BACKEND == "memory":
+    from factories.memory_repository import get_memory_collection
+
+    client = None
+    db = None
+
+    #Collections
+    product_collection = get_memory_collection("products")
+    order_collection = get_memory_collection("orders")
+    user_collection = get_memory_collection("users")
+    cart_collection = get_memory_collection("carts")
+    stock_shards_collection = get_memory_collection("stock_shards")
+    reservations_collection = get_memory_collection("reservations")
+    carts_archive_collection = get_memory_collection("carts_archive")
+    orders_archive_collection = get_memory_collection("orders_archive")
+    product_related_collection = get_memory_collection("product_related")
+    product_sales_collection = get_memory_collection("product_sales")
+    reviews_collection = get_memory_collection("reviews")
+
+    # Same index set as Mongo, so unique constraints (e.g. one review per user and product) hold here too
+    from configs.indexes import INDEXES
+
+    for name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            get_memory_collection(name).create_index(keys, **options)
+else:
+    # Make the mongo db connection
+    client = MongoClient(MONGO_URI, event_listeners=mongo_event_listeners() + [QueryCounterListener()]);
+    db = client[DB_NAME]
 
-#Collections
-product_collection = db["products"]
-order_collection = db['orders']
-user_collection = db["users"]
-cart_collection = db["carts"]
\ No newline at end of file
+    #Collections
+    product_collection = db["products"]
+    order_collection = db['orders']
+    user_collection = db["users"]
+    cart_collection = db["carts"]
+    stock_shards_collection = db["stock_shards"]
+    reservations_collection = db["reservations"]
+    carts_archive_collection = db["carts_archive"]
+    orders_archive_collection = db["orders_archive"]
+    product_related_collection = db["product_related"]
+    product_sales_collection = db["product_sales"]
+    reviews_collection = db["reviews"]
\ No newline at end of file
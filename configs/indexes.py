@@ -0,0 +1,103 @@
+import logging
+import os
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# IndexOptionsConflict: an index on the same keys exists with other options
+_INDEX_OPTIONS_CONFLICT = 85
+
+# collection -> list of (keys, options); every lookup field the routes filter on
+INDEXES = {
+    "products": [
+        ([("category", ASCENDING)], {}),
+        # filter_products: min_rating alone or with a category
+        ([("rating", ASCENDING)], {}),
+        ([("category", ASCENDING), ("rating", ASCENDING)], {}),
+        # Admin product list sorted by price, optionally within a category
+        ([("price", ASCENDING)], {}),
+        ([("category", ASCENDING), ("price", ASCENDING)], {}),
+        # Change consumer polling fallback
+        ([("updated_at", ASCENDING)], {}),
+    ],
+    "users": [
+        ([("email", ASCENDING)], {}),
+        ([("role", ASCENDING)], {}),
+        ([("role", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("updated_at", ASCENDING)], {}),
+    ],
+    "carts": [([("user_id", ASCENDING)], {}), ([("updated_at", ASCENDING)], {})],
+    "orders": [
+        ([("user_id", ASCENDING)], {}),
+        ([("status", ASCENDING)], {}),
+        ([("status", ASCENDING), ("created_at", ASCENDING)], {}),
+        # Admin order list: newest first, optionally per user
+        ([("created_at", DESCENDING)], {}),
+        ([("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+    ],
+    "orders_archive": [([("user_id", ASCENDING)], {}), ([("created_at", ASCENDING)], {})],
+    "stock_shards": [([("product_id", ASCENDING), ("shard", ASCENDING)], {})],
+    "reservations": [
+        ([("user_id", ASCENDING), ("product_id", ASCENDING), ("status", ASCENDING)], {}),
+        ([("status", ASCENDING), ("expires_at", ASCENDING)], {}),
+    ],
+    "reviews": [
+        # Newest-first cursor pages per product
+        ([("product_id", ASCENDING), ("_id", DESCENDING)], {}),
+        # One review per user and product
+        ([("product_id", ASCENDING), ("user_id", ASCENDING)], {"unique": True}),
+    ],
+}
+
+
+# Optional hard cap on cart age, enforced by the server (the cleanup job archives first; this doesn't)
+CART_TTL_DAYS = os.getenv("CART_TTL_DAYS")
+if CART_TTL_DAYS:
+    # Replaces the plain updated_at index (converted by ensure_indexes): a TTL index serves the same queries
+    INDEXES["carts"][1] = ([("updated_at", ASCENDING)], {"expireAfterSeconds": int(float(CART_TTL_DAYS) * 86400)})
+
+
+def _retime_index(collection, keys, options) -> bool:
+    """
+    Change the TTL of the existing index on keys to options' expireAfterSeconds
+    (adding or removing it); False if the index differs in anything else.
+    collMod converts it in place; servers that can't (before MongoDB 5.1) get
+    the index dropped and rebuilt.
+    """
+    wanted = {k: v for k, v in options.items() if k != "expireAfterSeconds"}
+    for name, info in collection.index_information().items():
+        if [tuple(key) for key in info["key"]] != list(keys):
+            continue
+        current = {k: v for k, v in info.items() if k not in ("v", "key", "ns", "expireAfterSeconds")}
+        if current != wanted:
+            return False
+        if "expireAfterSeconds" in options:
+            try:
+                collection.database.command("collMod", collection.name,
+                                            index={"name": name, "expireAfterSeconds": options["expireAfterSeconds"]})
+                return True
+            except OperationFailure:
+                pass
+        collection.drop_index(name)
+        collection.create_index(keys, **options)
+        return True
+    return False
+
+
+def ensure_indexes(db) -> None:
+    """Create the indexes the routes rely on (idempotent; called from the app lifespan)."""
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                try:
+                    db[collection].create_index(keys, **options)
+                except OperationFailure as exc:
+                    # e.g. CART_TTL_DAYS set (or unset) over an existing updated_at index
+                    if exc.code != _INDEX_OPTIONS_CONFLICT or not _retime_index(db[collection], keys, options):
+                        raise
+                    logger.info("Changed the TTL of index %s on %s", keys, collection)
+            except Exception:
+                # A conflicting pre-existing index shouldn't stop the app from starting
+                logger.warning("Could not create index %s on %s", keys, collection, exc_info=True)
@@ -0,0 +1,347 @@
+import gzip
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+from bson import ObjectId, json_util
+from pymongo import UpdateOne
+
+from .base_factory import BaseFactory
+
+_CANCELLED = "Cancelled"
+
+
+def empty_totals() -> Dict:
+    return {"orders": 0, "revenue": 0.0, "by_status": {}}
+
+
+def _add(totals: Dict, status: Optional[str], total: Optional[float], sign: int = 1) -> None:
+    status = status or "Pending"
+    totals["orders"] += sign
+    totals["by_status"][status] = totals["by_status"].get(status, 0) + sign
+    if status != _CANCELLED:
+        totals["revenue"] += sign * (total or 0)
+
+
+def order_totals(collection) -> Dict:
+    """
+    Order count, per-status counts and revenue (non-cancelled totals) of an orders collection.
+
+    One $group on MongoDB; backends without aggregate (the in-memory one) get a projected scan.
+    """
+    totals = empty_totals()
+    if hasattr(collection, "aggregate"):
+        pipeline = [{"$group": {"_id": "$status", "orders": {"$sum": 1}, "revenue": {"$sum": "$total"}}}]
+        for group in collection.aggregate(pipeline):
+            status = group["_id"] or "Pending"
+            totals["orders"] += group["orders"]
+            totals["by_status"][status] = totals["by_status"].get(status, 0) + group["orders"]
+            if status != _CANCELLED:
+                totals["revenue"] += group["revenue"] or 0
+        return totals
+    for order in collection.find({}, {"status": 1, "total": 1, "_id": 0}).batch_size(10_000):
+        _add(totals, order.get("status"), order.get("total"))
+    return totals
+
+
+class BaseOrderArchive(ABC):
+    """
+    Abstract base class for cold storage of old orders.
+    Documents keep their original _id so reads can fall through by id.
+    """
+
+    @abstractmethod
+    def write(self, orders: List[Dict]) -> List[Dict]:
+        """Durably store a batch of orders; returns those that weren't archived yet (the rest are skipped)."""
+        pass
+
+    @abstractmethod
+    def find_by_id(self, order_id: str) -> Optional[Dict]:
+        """Get an archived order by id."""
+        pass
+
+    @abstractmethod
+    def find_by_user(self, user_id: str) -> List[Dict]:
+        """Get every archived order of a user."""
+        pass
+
+    @abstractmethod
+    def delete(self, order_id: str) -> bool:
+        """Remove an archived order."""
+        pass
+
+    @abstractmethod
+    def scan(self) -> Iterator[Dict]:
+        """Iterate over every archived order (batch jobs only)."""
+        pass
+
+    @abstractmethod
+    def totals(self) -> Dict:
+        """Order count, per-status counts and revenue of what the archive holds."""
+        pass
+
+
+class CollectionOrderArchive(BaseOrderArchive):
+    """
+    Archive kept in a separate MongoDB collection (orders_archive).
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def write(self, orders: List[Dict]) -> List[Dict]:
+        if not orders:
+            return []
+        # Insert-if-absent per id: a retried or concurrently archived batch only counts where it upserted
+        result = self.collection.bulk_write(
+            [UpdateOne({"_id": order["_id"]}, {"$setOnInsert": {k: v for k, v in order.items() if k != "_id"}},
+                       upsert=True) for order in orders],
+            ordered=False,
+        )
+        return [orders[index] for index in sorted(result.upserted_ids)]
+
+    def find_by_id(self, order_id: str) -> Optional[Dict]:
+        return self.collection.find_one({"_id": ObjectId(order_id)})
+
+    def find_by_user(self, user_id: str) -> List[Dict]:
+        return list(self.collection.find({"user_id": user_id}))
+
+    def delete(self, order_id: str) -> bool:
+        return self.collection.delete_one({"_id": ObjectId(order_id)}).deleted_count > 0
+
+    def scan(self) -> Iterator[Dict]:
+        return iter(self.collection.find().batch_size(10_000))
+
+    def totals(self) -> Dict:
+        return order_totals(self.collection)
+
+
+class SegmentOrderArchive(BaseOrderArchive):
+    """
+    Archive written as gzip-compressed NDJSON segment files on local disk.
+
+    Each write() produces one immutable segment plus a small JSON sidecar
+    listing the order and user ids it holds; a lookup opens only the segments
+    that can contain a match. Recently read segments are kept decoded in a
+    small LRU. Deletes are recorded in a tombstone log rather than rewriting
+    segments.
+
+    Several processes can share the directory: each one re-reads new sidecars
+    and tombstones whenever the directory or the tombstone log changed since
+    it last looked (one stat per call). Orders already indexed are skipped on
+    write, and scan() yields an order only from the segment the index maps it
+    to, so an order written twice (a crash before the hot copy was deleted,
+    or two writers racing) is still seen once. Sidecars also carry each
+    order's status and total, so totals() is kept up to date while indexing,
+    counting every order once and dropping it when it is tombstoned.
+    """
+
+    def __init__(self, directory: str, cached_segments: int = 8):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.cached_segments = cached_segments
+        self._by_order: Dict[str, str] = {}
+        self._by_user: Dict[str, List[str]] = {}
+        self._decoded: "OrderedDict[str, Dict[str, Dict]]" = OrderedDict()
+        self._tombstones = set()
+        self._indexed = set()
+        self._seen_state = None
+        self._totals = empty_totals()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh()
+
+    def _tombstone_path(self) -> str:
+        return os.path.join(self.directory, "deleted.log")
+
+    def _state(self):
+        tombstones = self._tombstone_path()
+        return os.stat(self.directory).st_mtime_ns, os.path.getsize(tombstones) if os.path.exists(tombstones) else 0
+
+    def _refresh(self) -> None:
+        """Index tombstones and sidecars written since the last look (by this or another process)."""
+        if self._state() == self._seen_state:
+            return
+        with self._refresh_lock:
+            state = self._state()
+            if state == self._seen_state:
+                return
+            tombstones = set()
+            if os.path.exists(self._tombstone_path()):
+                with open(self._tombstone_path()) as fh:
+                    tombstones = {line.strip() for line in fh if line.strip()}
+            # Drop newly deleted orders from the totals before indexing more segments
+            for order_id in tombstones - self._tombstones:
+                self._uncount(order_id)
+            with self._lock:
+                self._tombstones |= tombstones
+            for name in sorted(os.listdir(self.directory)):
+                if name.endswith(".idx.json") and name not in self._indexed:
+                    with open(os.path.join(self.directory, name)) as fh:
+                        sidecar = json.load(fh)
+                    segment = name[: -len(".idx.json")] + ".ndjson.gz"
+                    if "statuses" not in sidecar:
+                        # Sidecars of older versions only list ids
+                        sidecar = self._summarize(segment, sidecar)
+                    with self._lock:
+                        self._index(segment, sidecar)
+                        self._indexed.add(name)
+            self._seen_state = state
+
+    def _summarize(self, segment: str, sidecar: Dict) -> Dict:
+        orders = {}
+        with gzip.open(os.path.join(self.directory, segment), "rt", encoding="utf-8") as fh:
+            for line in fh:
+                order = json_util.loads(line)
+                orders[str(order["_id"])] = order
+        ids = [order_id for order_id in sidecar["orders"] if order_id in orders]
+        return {**sidecar, "orders": ids, "statuses": [orders[i].get("status") for i in ids],
+                "totals": [orders[i].get("total") for i in ids]}
+
+    def _index(self, segment: str, sidecar: Dict) -> None:
+        for order_id, status, total in zip(sidecar["orders"], sidecar["statuses"], sidecar["totals"]):
+            # An order written twice keeps the segment it was first seen in, so it maps to exactly one
+            if order_id in self._by_order:
+                continue
+            self._by_order[order_id] = segment
+            if order_id not in self._tombstones:
+                _add(self._totals, status, total)
+        for user_id in sidecar["users"]:
+            segments = self._by_user.setdefault(user_id, [])
+            if segment not in segments:
+                segments.append(segment)
+
+    def _uncount(self, order_id: str) -> None:
+        segment = self._by_order.get(order_id)
+        if segment is None:
+            return
+        order = self._read_segment(segment).get(order_id)
+        if order is not None:
+            with self._lock:
+                _add(self._totals, order.get("status"), order.get("total"), -1)
+
+    def _read_segment(self, segment: str) -> Dict[str, Dict]:
+        with self._lock:
+            if segment in self._decoded:
+                self._decoded.move_to_end(segment)
+                return self._decoded[segment]
+        orders = {}
+        with gzip.open(os.path.join(self.directory, segment), "rt", encoding="utf-8") as fh:
+            for line in fh:
+                order = json_util.loads(line)
+                orders[str(order["_id"])] = order
+        with self._lock:
+            self._decoded[segment] = orders
+            while len(self._decoded) > self.cached_segments:
+                self._decoded.popitem(last=False)
+        return orders
+
+    def write(self, orders: List[Dict]) -> List[Dict]:
+        self._refresh()
+        orders = [order for order in orders if str(order["_id"]) not in self._by_order]
+        if not orders:
+            return []
+        base = f"orders-{time.time_ns()}"
+        segment, sidecar_name = base + ".ndjson.gz", base + ".idx.json"
+        tmp = os.path.join(self.directory, segment + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+            for order in orders:
+                fh.write(json_util.dumps(order) + "\n")
+        # Segment first, sidecar last: a crash leaves at worst an unindexed segment, never a dangling index
+        os.replace(tmp, os.path.join(self.directory, segment))
+        sidecar = {"orders": [str(o["_id"]) for o in orders], "users": sorted({o.get("user_id", "") for o in orders}),
+                   "statuses": [o.get("status") for o in orders], "totals": [o.get("total") for o in orders]}
+        with open(os.path.join(self.directory, sidecar_name + ".tmp"), "w") as fh:
+            json.dump(sidecar, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(os.path.join(self.directory, sidecar_name + ".tmp"), os.path.join(self.directory, sidecar_name))
+        with self._lock:
+            self._index(segment, sidecar)
+            self._indexed.add(sidecar_name)
+        return orders
+
+    def find_by_id(self, order_id: str) -> Optional[Dict]:
+        self._refresh()
+        segment = self._by_order.get(order_id)
+        if segment is None or order_id in self._tombstones:
+            return None
+        order = self._read_segment(segment).get(order_id)
+        return dict(order) if order else None
+
+    def find_by_user(self, user_id: str) -> List[Dict]:
+        self._refresh()
+        orders = {}
+        for segment in self._by_user.get(user_id, []):
+            for order_id, order in self._read_segment(segment).items():
+                if order.get("user_id") == user_id and order_id not in self._tombstones:
+                    orders[order_id] = dict(order)
+        return list(orders.values())
+
+    def delete(self, order_id: str) -> bool:
+        self._refresh()
+        if order_id not in self._by_order or order_id in self._tombstones:
+            return False
+        with self._lock:
+            # In the set before the log, so a concurrent refresh never counts it as newly deleted
+            self._tombstones.add(order_id)
+            with open(self._tombstone_path(), "a") as fh:
+                fh.write(order_id + "\n")
+        self._uncount(order_id)
+        return True
+
+    def scan(self) -> Iterator[Dict]:
+        self._refresh()
+        # Straight from disk: a full scan shouldn't flush the LRU that serves reads
+        for segment in sorted(set(self._by_order.values())):
+            with gzip.open(os.path.join(self.directory, segment), "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    order = json_util.loads(line)
+                    order_id = str(order["_id"])
+                    # Copies of an order in other segments are skipped
+                    if self._by_order.get(order_id) == segment and order_id not in self._tombstones:
+                        yield order
+
+    def totals(self) -> Dict:
+        self._refresh()
+        with self._lock:
+            return {**self._totals, "by_status": dict(self._totals["by_status"])}
+
+
+class ArchiveFactory(BaseFactory):
+    """
+    Factory for creating order archive backends.
+    """
+
+    def __init__(self):
+        self._backends = {
+            "collection": CollectionOrderArchive,
+            "segments": SegmentOrderArchive,
+        }
+
+    def create(self, backend_type: str, *args, **kwargs) -> BaseOrderArchive:
+        """
+        Create an order archive.
+
+        Args:
+            backend_type: Type of archive to create ('collection' or 'segments')
+
+        Returns:
+            Order archive instance
+
+        Raises:
+            ValueError: If backend type not supported
+        """
+        if backend_type not in self._backends:
+            raise ValueError(f"Archive backend '{backend_type}' not supported. Available: {list(self._backends.keys())}")
+
+        backend_class = self._backends[backend_type]
+        return backend_class(*args, **kwargs)
+
+    def get_available_types(self) -> list:
+        """Get list of available archive backends."""
+        return list(self._backends.keys())
@@ -0,0 +1,459 @@
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import bson
+
+from .base_factory import BaseFactory
+from utils.metrics import REGISTRY
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - redis is optional; only its backends raise this
+    class RedisError(Exception):
+        pass
+
+logger = logging.getLogger(__name__)
+
+# Log a failing Redis cache at most this often; every failure is still counted
+_ERROR_LOG_INTERVAL = 30.0
+
+cache_operations_total = REGISTRY.counter(
+    "cache_operations_total", "Cache lookups by cache namespace, tier and result.", ("namespace", "tier", "result")
+)
+cache_errors_total = REGISTRY.counter(
+    "cache_errors_total", "Redis cache commands that failed and were treated as a miss or skipped.", ("namespace", "operation")
+)
+cache_invalidations_total = REGISTRY.counter(
+    "cache_invalidations_received_total", "Invalidation messages applied from other workers.", ("namespace",)
+)
+
+_MISS = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed TTL.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 10_000, on_evict: Callable[[], None] = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                if self._on_evict:
+                    self._on_evict()
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class BaseCacheBackend(ABC):
+    """
+    Abstract base class for cache backends shared by the product and
+    principal caches and the repository caches. Keys are strings; values are BSON-serializable.
+    Values returned by in-process backends are shared and must be treated
+    as read-only.
+    """
+
+    # Whether calls may wait on the network; async callers run blocking backends in a worker thread
+    blocking = True
+
+    def __init__(self, namespace: str = "default", ttl: float = 60.0):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a cached value."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds (backend default when None)."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key (and tell other workers to drop it)."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every key in this namespace."""
+        pass
+
+    @abstractmethod
+    def counter(self, key: str) -> int:
+        """Current value of a counter; counters are kept apart from cached values and never evicted."""
+        pass
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment a counter; returns the new value."""
+        pass
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several keys at once; missing keys are absent from the result."""
+        result = {}
+        for key in keys:
+            value = self.get(key, _MISS)
+            if value is not _MISS:
+                result[key] = value
+        return result
+
+    def set_many(self, mapping: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store several values at once."""
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove several keys at once."""
+        for key in keys:
+            self.delete(key)
+
+    def close(self) -> None:
+        """Release connections and background threads."""
+        pass
+
+
+class MemoryCacheBackend(BaseCacheBackend):
+    """
+    Per-process LRU + TTL cache.
+    """
+
+    blocking = False
+
+    def __init__(self, namespace: str = "default", ttl: float = 60.0, max_size: int = 10_000):
+        super().__init__(namespace, ttl)
+        self._cache = TTLCache(ttl, max_size)
+        self._counters: Dict[str, int] = {}
+        self._counters_lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._cache.get(key, _MISS)
+        cache_operations_total.inc(namespace=self.namespace, tier="memory", result="miss" if value is _MISS else "hit")
+        return default if value is _MISS else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._counters_lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+def _encode(value: Any) -> bytes:
+    return bson.encode({"v": value})
+
+
+def _decode(raw: bytes) -> Any:
+    return bson.decode(raw)["v"]
+
+
+# A counter Redis lost (eviction, restart) restarts from the clock, above any value it had before
+_INCR_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then redis.call('set', KEYS[1], ARGV[1]) end
+return redis.call('incr', KEYS[1])
+"""
+
+
+class RedisCacheBackend(BaseCacheBackend):
+    """
+    Cache shared by every worker process through any Redis-protocol server.
+
+    Values are BSON-encoded so ObjectId and datetime survive the round trip.
+    get_many uses a single MGET and set_many a single pipeline. The cache is
+    never the source of truth, so a Redis outage is logged and counted and
+    reads become misses and writes are skipped; requests don't fail with it.
+    """
+
+    def __init__(self, namespace: str = "default", ttl: float = 60.0, url: str = "redis://localhost:6379/0", client: Any = None):
+        super().__init__(namespace, ttl)
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise ImportError("RedisCacheBackend requires the 'redis' package (pip install redis)") from exc
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = f"cache:{namespace}:"
+        self._error_logged_at = 0.0
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def _call(self, operation: str, default: Any, command: Callable[[], Any]) -> Any:
+        """Run a Redis command; on a Redis error count it, log it (throttled) and return default."""
+        try:
+            return command()
+        except RedisError:
+            cache_errors_total.inc(namespace=self.namespace, operation=operation)
+            now = time.monotonic()
+            if now - self._error_logged_at >= _ERROR_LOG_INTERVAL:
+                self._error_logged_at = now
+                logger.warning("Redis cache %s failed for %s; serving from the database", operation, self.namespace,
+                               exc_info=True)
+            return default
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raw = self._call("get", None, lambda: self.client.get(self._key(key)))
+        cache_operations_total.inc(namespace=self.namespace, tier="redis", result="miss" if raw is None else "hit")
+        return default if raw is None else _decode(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        px = int((self.ttl if ttl is None else ttl) * 1000)
+        self._call("set", None, lambda: self.client.set(self._key(key), _encode(value), px=px))
+
+    def delete(self, key: str) -> None:
+        self._call("delete", None, lambda: self.client.delete(self._key(key)))
+
+    def clear(self) -> None:
+        def clear_all():
+            batch = []
+            for key in self.client.scan_iter(match=self.prefix + "*", count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    self.client.delete(*batch)
+                    batch = []
+            if batch:
+                self.client.delete(*batch)
+
+        self._call("clear", None, clear_all)
+
+    def counter(self, key: str) -> int:
+        def read():
+            raw = self.client.get(self._key(key))
+            if raw is None:
+                self.client.set(self._key(key), time.time_ns(), nx=True)
+                raw = self.client.get(self._key(key))
+            return int(raw)
+
+        value = self._call("counter", None, read)
+        # Redis is down: a value no cached entry is keyed by, so readers miss
+        return -time.time_ns() if value is None else value
+
+    def incr(self, key: str) -> int:
+        value = self._call("incr", None, lambda: self.client.eval(_INCR_SCRIPT, 1, self._key(key), time.time_ns()))
+        return -time.time_ns() if value is None else int(value)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._call("get_many", [None] * len(keys), lambda: self.client.mget([self._key(k) for k in keys]))
+        result = {k: _decode(raw) for k, raw in zip(keys, values) if raw is not None}
+        cache_operations_total.inc(len(result), namespace=self.namespace, tier="redis", result="hit")
+        cache_operations_total.inc(len(keys) - len(result), namespace=self.namespace, tier="redis", result="miss")
+        return result
+
+    def set_many(self, mapping: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        if not mapping:
+            return
+        px = int((self.ttl if ttl is None else ttl) * 1000)
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(self._key(key), _encode(value), px=px)
+        self._call("set_many", None, pipe.execute)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = [self._key(k) for k in keys]
+        if keys:
+            self._call("delete_many", None, lambda: self.client.delete(*keys))
+
+    def close(self) -> None:
+        self._call("close", None, self.client.close)
+
+
+class TwoLevelCacheBackend(BaseCacheBackend):
+    """
+    In-process L1 in front of a shared L2 (Redis).
+
+    Writes and deletes go to L2 and are broadcast on a pub/sub channel; every
+    other worker drops the affected keys from its L1, so L1 staleness is
+    bounded by pub/sub latency rather than by the L1 TTL.
+    """
+
+    def __init__(self, namespace: str = "default", ttl: float = 60.0, url: str = "redis://localhost:6379/0",
+                 l1_ttl: float = 5.0, l1_max_size: int = 10_000, l2: RedisCacheBackend = None):
+        super().__init__(namespace, ttl)
+        self.l1 = MemoryCacheBackend(namespace, min(l1_ttl, ttl), l1_max_size)
+        self.l2 = l2 or RedisCacheBackend(namespace, ttl, url)
+        self.channel = f"cache-invalidate:{namespace}"
+        self.node_id = uuid.uuid4().hex
+        self._pubsub = None
+        self._listener: Optional[threading.Thread] = None
+        self._start_listener()
+
+    def _start_listener(self) -> None:
+        try:
+            self._pubsub = self.l2.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.channel: self._on_message})
+            self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except Exception:
+            # Without pub/sub the L1 TTL still bounds staleness
+            logger.warning("Cache invalidation listener unavailable for %s", self.namespace, exc_info=True)
+
+    def _on_message(self, message: Dict) -> None:
+        payload = _decode(message["data"])
+        if payload.get("node") == self.node_id:
+            return
+        cache_invalidations_total.inc(namespace=self.namespace)
+        if payload.get("all"):
+            self.l1.clear()
+        for key in payload.get("keys", []):
+            self.l1.delete(key)
+
+    def _publish(self, keys: List[str] = None, all: bool = False) -> None:
+        try:
+            self.l2.client.publish(self.channel, _encode({"node": self.node_id, "keys": keys or [], "all": all}))
+        except Exception:
+            logger.warning("Failed to publish cache invalidation for %s", self.namespace, exc_info=True)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.l1.get(key, _MISS)
+        if value is not _MISS:
+            return value
+        value = self.l2.get(key, _MISS)
+        if value is _MISS:
+            return default
+        self.l1.set(key, value)
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        result = self.l1.get_many(keys)
+        missing = [k for k in keys if k not in result]
+        if missing:
+            fetched = self.l2.get_many(missing)
+            for key, value in fetched.items():
+                self.l1.set(key, value)
+            result.update(fetched)
+        return result
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.l2.set(key, value, ttl)
+        self.l1.set(key, value, None if ttl is None else min(ttl, self.l1.ttl))
+        self._publish([key])
+
+    def set_many(self, mapping: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        self.l2.set_many(mapping, ttl)
+        for key, value in mapping.items():
+            self.l1.set(key, value, None if ttl is None else min(ttl, self.l1.ttl))
+        self._publish(list(mapping))
+
+    def delete(self, key: str) -> None:
+        self.l2.delete(key)
+        self.l1.delete(key)
+        self._publish([key])
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        self.l2.delete_many(keys)
+        for key in keys:
+            self.l1.delete(key)
+        self._publish(keys)
+
+    def clear(self) -> None:
+        self.l2.clear()
+        self.l1.clear()
+        self._publish(all=True)
+
+    def counter(self, key: str) -> int:
+        # The L1 copy is dropped on every incr (here and, via pub/sub, elsewhere)
+        value = self.l1.get(key, _MISS)
+        if value is _MISS:
+            value = self.l2.counter(key)
+            self.l1.set(key, value)
+        return value
+
+    def incr(self, key: str) -> int:
+        value = self.l2.incr(key)
+        self.l1.delete(key)
+        self._publish([key])
+        return value
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+        if self._pubsub is not None:
+            self._pubsub.close()
+        self.l2.close()
+
+
+class CacheFactory(BaseFactory):
+    """
+    Factory for creating cache backends.
+    """
+
+    def __init__(self):
+        self._backends = {
+            "memory": MemoryCacheBackend,
+            "redis": RedisCacheBackend,
+            "two_level": TwoLevelCacheBackend,
+        }
+
+    def create(self, backend_type: str, *args, **kwargs) -> BaseCacheBackend:
+        """
+        Create a cache backend.
+
+        Args:
+            backend_type: Type of backend to create ('memory', 'redis' or 'two_level')
+
+        Returns:
+            Cache backend instance
+
+        Raises:
+            ValueError: If backend type not supported
+        """
+        if backend_type not in self._backends:
+            raise ValueError(f"Cache backend '{backend_type}' not supported. Available: {list(self._backends.keys())}")
+
+        backend_class = self._backends[backend_type]
+        return backend_class(*args, **kwargs)
+
+    def get_available_types(self) -> list:
+        """Get list of available cache backends."""
+        return list(self._backends.keys())
@@ -0,0 +1,121 @@
+import copy
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from bson import json_util
+
+from .cache_factory import BaseCacheBackend, MemoryCacheBackend
+from .repository_factory import BaseRepository
+from utils.metrics import REGISTRY
+
+cache_requests_total = REGISTRY.counter(
+    "repository_cache_requests_total", "CachingRepository lookups by entity and result.", ("entity", "result")
+)
+
+_MISS = object()
+_GENERATION_KEY = "__generation__"
+
+
+def _query_key(value: Any) -> str:
+    """Canonical, hashable form of a filter/query document."""
+    return json_util.dumps(value, sort_keys=True)
+
+
+class CachingRepository(BaseRepository):
+    """
+    Read-through cache decorator for any BaseRepository.
+
+    Caches find_by_id, parameterized find_all and search results (plus the
+    read helpers listed in cached_methods, e.g. ProductRepository.search_by_name)
+    with a per-entity TTL and LRU size bound. create/update/delete through this
+    repository invalidate the affected id and every cached query result.
+
+    The cache may be any BaseCacheBackend; with a shared backend the query
+    generation is a shared counter (atomic INCR), so invalidations reach
+    every worker.
+    """
+
+    DEFAULT_CACHED_METHODS = ("search_by_name", "filter_products", "find_by_email")
+
+    def __init__(self, repository: BaseRepository, entity: str = "default", ttl: float = 60.0,
+                 max_size: int = 10_000, cached_methods: Iterable[str] = DEFAULT_CACHED_METHODS,
+                 cache: BaseCacheBackend = None):
+        super().__init__(repository.collection)
+        self.repository = repository
+        self.entity = entity
+        self.cached_methods = set(cached_methods)
+        self.cache = cache or MemoryCacheBackend(f"repository:{entity}", ttl, max_size)
+
+    @property
+    def _generation(self) -> int:
+        # Query results are keyed by generation; bumping it drops them all at once.
+        # It is a backend counter, not a cached value, so LRU eviction can't reset it.
+        return self.cache.counter(_GENERATION_KEY)
+
+    def _bump_generation(self) -> None:
+        self.cache.incr(_GENERATION_KEY)
+
+    def _cached(self, key: str, loader: Callable[[], Any]) -> Any:
+        value = self.cache.get(key, _MISS)
+        if value is _MISS:
+            cache_requests_total.inc(entity=self.entity, result="miss")
+            value = loader()
+            self.cache.set(key, copy.deepcopy(value))
+            return value
+        cache_requests_total.inc(entity=self.entity, result="hit")
+        # Callers mutate returned documents (e.g. del doc["_id"]), so hand out copies
+        return copy.deepcopy(value)
+
+    def _invalidate(self, id: Optional[str] = None) -> None:
+        if id is not None:
+            self.cache.delete(f"id:{id}")
+        self._bump_generation()
+
+    def find_all(self, skip: int = 0, limit: int = 10, filters: Dict = None) -> List[Dict]:
+        """Find all documents with pagination and optional filters (cached)."""
+        key = f"all:{self._generation}:{skip}:{limit}:{_query_key(filters or {})}"
+        return self._cached(key, lambda: self.repository.find_all(skip=skip, limit=limit, filters=filters))
+
+    def find_by_id(self, id: str) -> Optional[Dict]:
+        """Find a document by ID (cached)."""
+        return self._cached(f"id:{id}", lambda: self.repository.find_by_id(id))
+
+    def create(self, data: Dict) -> Dict:
+        """Create a new document and invalidate cached query results."""
+        result = self.repository.create(data)
+        self._invalidate()
+        return result
+
+    def update(self, id: str, data: Dict) -> bool:
+        """Update a document by ID and invalidate it."""
+        updated = self.repository.update(id, data)
+        self._invalidate(id)
+        return updated
+
+    def delete(self, id: str) -> bool:
+        """Delete a document by ID and invalidate it."""
+        deleted = self.repository.delete(id)
+        self._invalidate(id)
+        return deleted
+
+    def search(self, query: Dict) -> List[Dict]:
+        """Search documents based on query (cached)."""
+        key = f"search:{self._generation}:{_query_key(query)}"
+        return self._cached(key, lambda: self.repository.search(query))
+
+    def invalidate_all(self) -> None:
+        """Drop every cached entry, e.g. after an out-of-band write."""
+        self.cache.clear()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not defined here: delegate to the wrapped repository
+        if name == "repository":
+            raise AttributeError(name)
+        attr = getattr(self.repository, name)
+        if name not in self.cached_methods or not callable(attr):
+            return attr
+
+        def cached_method(*args, **kwargs):
+            key = f"{name}:{self._generation}:{_query_key([args, kwargs])}"
+            return self._cached(key, lambda: attr(*args, **kwargs))
+
+        return cached_method
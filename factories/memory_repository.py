@@ -0,0 +1,747 @@
+import itertools
+import re
+import threading
+import time
+from datetime import datetime, UTC
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from .repository_factory import MongoRepository
+from utils.query_counter import current_query_stats
+
+# Secondary indexes created for the collections the routes query by field
+DEFAULT_INDEXES = {
+    "products": ["category"],
+    "users": ["email", "role"],
+    "carts": ["user_id"],
+    "orders": ["user_id", "status"],
+}
+
+_MISSING = object()
+
+
+def _copy(value: Any) -> Any:
+    """Copy nested dicts/lists so callers can't mutate stored documents."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _get_path(doc: Dict, path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set_path(doc: Dict, path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: Dict, path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return repr(value)
+    return value
+
+
+def _compare(a: Any, b: Any, op) -> bool:
+    if a is _MISSING or a is None or b is None:
+        return False
+    try:
+        return op(a, b)
+    except TypeError:
+        return False
+
+
+def _regex(pattern: Any, options: str = "") -> re.Pattern:
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    if "i" in options:
+        flags |= re.IGNORECASE
+    if "m" in options:
+        flags |= re.MULTILINE
+    if "s" in options:
+        flags |= re.DOTALL
+    if "x" in options:
+        flags |= re.VERBOSE
+    return re.compile(pattern, flags)
+
+
+def _values_for_match(value: Any) -> List[Any]:
+    """A field matches a condition if it or (for arrays) any element does."""
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def _match_operator(value: Any, op: str, arg: Any, spec: Dict) -> bool:
+    if op == "$eq":
+        return any(v == arg for v in _values_for_match(value)) if value is not _MISSING else arg is None
+    if op == "$ne":
+        return not _match_operator(value, "$eq", arg, spec)
+    if op == "$gt":
+        return any(_compare(v, arg, lambda a, b: a > b) for v in _values_for_match(value))
+    if op == "$gte":
+        return any(_compare(v, arg, lambda a, b: a >= b) for v in _values_for_match(value))
+    if op == "$lt":
+        return any(_compare(v, arg, lambda a, b: a < b) for v in _values_for_match(value))
+    if op == "$lte":
+        return any(_compare(v, arg, lambda a, b: a <= b) for v in _values_for_match(value))
+    if op == "$in":
+        return any(_match_operator(value, "$eq", a, spec) for a in arg)
+    if op == "$nin":
+        return not _match_operator(value, "$in", arg, spec)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$regex":
+        pattern = _regex(arg, spec.get("$options", ""))
+        return any(isinstance(v, str) and pattern.search(v) for v in _values_for_match(value))
+    if op == "$options":
+        return True
+    if op == "$not":
+        return not _match_value(value, arg)
+    if op == "$size":
+        return isinstance(value, list) and len(value) == arg
+    if op == "$elemMatch":
+        return isinstance(value, list) and any(isinstance(v, dict) and _matches(v, arg) for v in value)
+    raise ValueError(f"Operator '{op}' not supported by the in-memory backend")
+
+
+def _match_value(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        return all(_match_operator(value, op, arg, condition) for op, arg in condition.items())
+    if isinstance(condition, re.Pattern):
+        return _match_operator(value, "$regex", condition, {})
+    return _match_operator(value, "$eq", condition, {})
+
+
+def _matches(doc: Dict, query: Optional[Dict]) -> bool:
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(_matches(doc, q) for q in condition):
+                return False
+        elif not _match_value(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _apply_update(doc: Dict, update: Dict, inserting: bool = False) -> None:
+    if not any(k.startswith("$") for k in update):
+        # Replacement document
+        doc_id = doc.get("_id")
+        doc.clear()
+        doc.update(_copy(update))
+        doc["_id"] = doc_id
+        return
+
+    for op, fields in update.items():
+        if op == "$set":
+            for path, value in fields.items():
+                _set_path(doc, path, _copy(value))
+        elif op == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    _set_path(doc, path, _copy(value))
+        elif op == "$unset":
+            for path in fields:
+                _unset_path(doc, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING or current is None else current) + amount)
+        elif op in ("$min", "$max"):
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                if current is _MISSING or (value < current if op == "$min" else value > current):
+                    _set_path(doc, path, value)
+        elif op == "$currentDate":
+            for path in fields:
+                _set_path(doc, path, datetime.now(UTC))
+        elif op in ("$push", "$addToSet"):
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                for v in values:
+                    if op == "$push" or v not in items:
+                        items.append(_copy(v))
+                _set_path(doc, path, items)
+        elif op == "$pull":
+            for path, condition in fields.items():
+                current = _get_path(doc, path)
+                if isinstance(current, list):
+                    if isinstance(condition, dict) and not all(k.startswith("$") for k in condition):
+                        kept = [v for v in current if not (isinstance(v, dict) and _matches(v, condition))]
+                    else:
+                        kept = [v for v in current if not _match_value(v, condition)]
+                    _set_path(doc, path, kept)
+        else:
+            raise ValueError(f"Update operator '{op}' not supported by the in-memory backend")
+
+
+def _project(doc: Dict, projection: Optional[Any]) -> Dict:
+    if not projection:
+        return _copy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = [k for k, v in projection.items() if v and k != "_id"]
+    if include:
+        result = {}
+        for path in include:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(result, path, _copy(value))
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    result = _copy(doc)
+    for path, value in projection.items():
+        if not value:
+            _unset_path(result, path)
+    return result
+
+
+def _sort_key(value: Any) -> Tuple:
+    # Missing/None sort first, then numbers, strings, ObjectIds, datetimes
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, int(value))
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, ObjectId):
+        return (3, value.binary)
+    if isinstance(value, datetime):
+        return (4, (value if value.tzinfo else value.replace(tzinfo=UTC)).timestamp())
+    return (5, repr(value))
+
+
+class InMemoryCursor:
+    """
+    Minimal pymongo Cursor lookalike supporting skip/limit/sort chaining.
+    """
+
+    def __init__(self, collection: "InMemoryCollection", query: Optional[Dict], projection: Optional[Any] = None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+        self._sort: List[Tuple[str, int]] = []
+        self._results: Optional[List[Dict]] = None
+
+    def skip(self, skip: int) -> "InMemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "InMemoryCursor":
+        self._limit = limit
+        return self
+
+    def sort(self, key_or_list: Any, direction: int = 1) -> "InMemoryCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        elif isinstance(key_or_list, dict):
+            self._sort = list(key_or_list.items())
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def batch_size(self, size: int) -> "InMemoryCursor":
+        return self
+
+    def _execute(self) -> List[Dict]:
+        if self._results is None:
+            self._results = self._collection._run_find(self._query, self._projection, self._sort, self._skip, self._limit)
+        return self._results
+
+    def __iter__(self):
+        return iter(self._execute())
+
+    def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        results = self._execute()
+        return results[:length] if length else list(results)
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryCollection:
+    """
+    Dict-backed stand-in for a pymongo Collection.
+
+    Supports the query/update operators used by routes/ and factories/, keeps
+    equality indexes on configured fields, and charges every operation to the
+    current request's QueryStats so round-trip accounting still works.
+    """
+
+    def __init__(self, name: str, indexes: Optional[Iterable[str]] = None):
+        self.name = name
+        self._docs: Dict[Any, Dict] = {}
+        self._indexes: Dict[str, Dict[Any, Set[Any]]] = {}
+        # index name -> indexed fields, for unique (possibly compound) indexes
+        self._unique: Dict[str, Tuple[str, ...]] = {}
+        self._seq: Dict[Any, int] = {}
+        self._next_seq = 0
+        self._lock = threading.RLock()
+        for field in indexes if indexes is not None else DEFAULT_INDEXES.get(name, []):
+            self.create_index(field)
+
+    # ---- indexes ----
+
+    def create_index(self, keys: Any, unique: bool = False, **kwargs) -> str:
+        """
+        Create an equality index on the first key of a (compound) index spec.
+
+        unique is enforced on the whole key; options without a constraint
+        (name, expireAfterSeconds, ...) are accepted and ignored.
+        """
+        if isinstance(keys, str):
+            spec = [(keys, 1)]
+        else:
+            spec = [key if isinstance(key, (list, tuple)) else (key, 1) for key in keys]
+        fields = tuple(field for field, _ in spec)
+        field = fields[0]
+        name = "_".join(f"{f}_{direction}" for f, direction in spec)
+        with self._lock:
+            if field not in self._indexes and field != "_id":
+                index: Dict[Any, Set[Any]] = {}
+                for doc_id, doc in self._docs.items():
+                    for value in self._index_values(doc, field):
+                        index.setdefault(value, set()).add(doc_id)
+                self._indexes[field] = index
+            # A key containing _id is unique already
+            if unique and "_id" not in fields:
+                for doc_id, doc in self._docs.items():
+                    self._check_unique_key(name, fields, doc, doc_id)
+                self._unique[name] = fields
+        return name
+
+    def create_indexes(self, models: Iterable[Any]) -> List[str]:
+        return [self.create_index(m.document["key"], unique=m.document.get("unique", False)) for m in models]
+
+    def index_information(self) -> Dict:
+        info = {"_id_": {"key": [("_id", 1)]}}
+        for field in self._indexes:
+            info[f"{field}_1"] = {"key": [(field, 1)], "unique": (field,) in self._unique.values()}
+        for name, fields in self._unique.items():
+            if len(fields) > 1:
+                info[name] = {"key": [(field, 1) for field in fields], "unique": True}
+        return info
+
+    def _index_values(self, doc: Dict, field: str) -> List[Any]:
+        value = _get_path(doc, field)
+        if value is _MISSING:
+            return [None]
+        if isinstance(value, list):
+            return [_hashable(v) for v in value] or [None]
+        return [_hashable(value)]
+
+    def _index_add(self, doc: Dict) -> None:
+        for field, index in self._indexes.items():
+            for value in self._index_values(doc, field):
+                index.setdefault(value, set()).add(doc["_id"])
+
+    def _index_remove(self, doc: Dict) -> None:
+        for field, index in self._indexes.items():
+            for value in self._index_values(doc, field):
+                ids = index.get(value)
+                if ids is not None:
+                    ids.discard(doc["_id"])
+                    if not ids:
+                        del index[value]
+
+    def _unique_keys(self, doc: Dict, fields: Tuple[str, ...]) -> Set[Tuple]:
+        # Documents missing every indexed field are exempt (as if the index were sparse)
+        keys = set(itertools.product(*(self._index_values(doc, field) for field in fields)))
+        keys.discard((None,) * len(fields))
+        return keys
+
+    def _check_unique_key(self, name: str, fields: Tuple[str, ...], doc: Dict, ignore_id: Any = None) -> None:
+        keys = self._unique_keys(doc, fields)
+        if not keys:
+            return
+        candidates: Set[Any] = set()
+        for value in {key[0] for key in keys}:
+            candidates |= self._indexes[fields[0]].get(value, set())
+        for other_id in candidates - {ignore_id, doc.get("_id")}:
+            if keys & self._unique_keys(self._docs[other_id], fields):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+
+    def _check_unique(self, doc: Dict, ignore_id: Any = None) -> None:
+        for name, fields in self._unique.items():
+            self._check_unique_key(name, fields, doc, ignore_id)
+
+    def _candidates(self, query: Optional[Dict]) -> Iterable[Any]:
+        """Narrow the scan using _id or a secondary index when the query allows."""
+        if not query:
+            return list(self._docs.keys())
+        best: Optional[Set[Any]] = None
+        for field, condition in query.items():
+            if field.startswith("$"):
+                continue
+            if field == "_id":
+                values = self._equality_values(condition)
+                if values is not None:
+                    ids = {v for v in values if v in self._docs}
+                    best = ids if best is None else best & ids
+                continue
+            index = self._indexes.get(field)
+            if index is None:
+                continue
+            values = self._equality_values(condition)
+            if values is not None:
+                ids: Set[Any] = set()
+                for v in values:
+                    ids |= index.get(_hashable(v), set())
+                best = ids if best is None else best & ids
+        if best is None:
+            return list(self._docs.keys())
+        # Preserve insertion (natural) order
+        return sorted(best, key=self._seq.__getitem__)
+
+    @staticmethod
+    def _equality_values(condition: Any) -> Optional[List[Any]]:
+        if isinstance(condition, dict):
+            if set(condition) == {"$eq"}:
+                return [condition["$eq"]]
+            if set(condition) == {"$in"}:
+                return list(condition["$in"])
+            return None
+        if isinstance(condition, re.Pattern):
+            return None
+        return [condition]
+
+    # ---- accounting ----
+
+    def _account(self, command: str, start: float) -> None:
+        stats = current_query_stats()
+        if stats is not None:
+            stats.record(command, time.perf_counter() - start)
+
+    # ---- reads ----
+
+    def _run_find(self, query, projection, sort, skip, limit) -> List[Dict]:
+        start = time.perf_counter()
+        with self._lock:
+            matched = [self._docs[i] for i in self._candidates(query) if _matches(self._docs[i], query)]
+            for key, direction in reversed(sort):
+                matched.sort(key=lambda d: _sort_key(_get_path(d, key)), reverse=direction < 0)
+            if skip:
+                matched = matched[skip:]
+            if limit:
+                matched = matched[:limit]
+            results = [_project(d, projection) for d in matched]
+        self._account("find", start)
+        return results
+
+    def find(self, filter: Optional[Dict] = None, projection: Optional[Any] = None, *args, **kwargs) -> InMemoryCursor:
+        cursor = InMemoryCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("skip"):
+            cursor.skip(kwargs["skip"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def find_one(self, filter: Optional[Any] = None, projection: Optional[Any] = None, *args, **kwargs) -> Optional[Dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        results = self.find(filter, projection, *args, **kwargs).limit(1).to_list()
+        return results[0] if results else None
+
+    def count_documents(self, filter: Dict, **kwargs) -> int:
+        start = time.perf_counter()
+        with self._lock:
+            count = sum(1 for i in self._candidates(filter) if _matches(self._docs[i], filter))
+        self._account("count", start)
+        limit = kwargs.get("limit")
+        return min(count, limit) if limit else count
+
+    def estimated_document_count(self, **kwargs) -> int:
+        start = time.perf_counter()
+        count = len(self._docs)
+        self._account("count", start)
+        return count
+
+    def distinct(self, key: str, filter: Optional[Dict] = None, **kwargs) -> List[Any]:
+        values = []
+        for doc in self.find(filter):
+            value = _get_path(doc, key)
+            for v in (value if isinstance(value, list) else [value]):
+                if v is not _MISSING and v not in values:
+                    values.append(v)
+        return values
+
+    # ---- writes ----
+
+    def _insert(self, document: Dict) -> Any:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        doc = _copy(document)
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        self._seq[doc["_id"]] = self._next_seq
+        self._next_seq += 1
+        self._index_add(doc)
+        return doc["_id"]
+
+    def insert_one(self, document: Dict, *args, **kwargs) -> InsertOneResult:
+        start = time.perf_counter()
+        with self._lock:
+            inserted_id = self._insert(document)
+        self._account("insert", start)
+        return InsertOneResult(inserted_id, True)
+
+    def insert_many(self, documents: Iterable[Dict], ordered: bool = True, *args, **kwargs) -> InsertManyResult:
+        start = time.perf_counter()
+        ids = []
+        errors = []
+        with self._lock:
+            for index, document in enumerate(documents):
+                try:
+                    ids.append(self._insert(document))
+                except DuplicateKeyError as exc:
+                    errors.append({"index": index, "code": 11000, "errmsg": str(exc), "op": document})
+                    if ordered:
+                        break
+        self._account("insert", start)
+        if errors:
+            # Like pymongo: the writes before (or around) the failures stay applied
+            raise BulkWriteError({"nInserted": len(ids), "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0,
+                                  "upserted": [], "writeErrors": errors, "writeConcernErrors": []})
+        return InsertManyResult(ids, True)
+
+    def _update(self, filter: Dict, update: Any, upsert: bool, many: bool) -> Dict:
+        matched = modified = 0
+        upserted_id = None
+        targets = [i for i in self._candidates(filter) if _matches(self._docs[i], filter)]
+        if not many:
+            targets = targets[:1]
+        for doc_id in targets:
+            doc = self._docs[doc_id]
+            before = _copy(doc)
+            updated = _copy(doc)
+            _apply_update(updated, update)
+            matched += 1
+            if updated != before:
+                self._check_unique(updated, ignore_id=doc_id)
+                self._index_remove(doc)
+                self._docs[doc_id] = updated
+                self._index_add(updated)
+                modified += 1
+        if not targets and upsert:
+            seed = {k: v for k, v in filter.items() if not k.startswith("$") and not isinstance(v, dict)}
+            _apply_update(seed, update, inserting=True)
+            upserted_id = self._insert(seed)
+        return {"n": matched + (1 if upserted_id is not None else 0), "nModified": modified, "upserted": upserted_id}
+
+    def _update_result(self, raw: Dict) -> UpdateResult:
+        if raw["upserted"] is None:
+            raw = {k: v for k, v in raw.items() if k != "upserted"}
+        return UpdateResult(raw, True)
+
+    def update_one(self, filter: Dict, update: Any, upsert: bool = False, *args, **kwargs) -> UpdateResult:
+        start = time.perf_counter()
+        with self._lock:
+            raw = self._update(filter, update, upsert, many=False)
+        self._account("update", start)
+        return self._update_result(raw)
+
+    def update_many(self, filter: Dict, update: Any, upsert: bool = False, *args, **kwargs) -> UpdateResult:
+        start = time.perf_counter()
+        with self._lock:
+            raw = self._update(filter, update, upsert, many=True)
+        self._account("update", start)
+        return self._update_result(raw)
+
+    def replace_one(self, filter: Dict, replacement: Dict, upsert: bool = False, *args, **kwargs) -> UpdateResult:
+        return self.update_one(filter, {k: v for k, v in replacement.items() if k != "_id"}, upsert)
+
+    def find_one_and_update(self, filter: Dict, update: Any, projection: Optional[Any] = None, sort: Optional[Any] = None,
+                            upsert: bool = False, return_document: bool = ReturnDocument.BEFORE, **kwargs) -> Optional[Dict]:
+        start = time.perf_counter()
+        with self._lock:
+            ids = [i for i in self._candidates(filter) if _matches(self._docs[i], filter)]
+            if sort:
+                docs = self._run_sort([self._docs[i] for i in ids], sort)
+                ids = [d["_id"] for d in docs]
+            before = _copy(self._docs[ids[0]]) if ids else None
+            target = {"_id": ids[0]} if ids else filter
+            raw = self._update(target, update, upsert, many=False)
+            if return_document == ReturnDocument.AFTER:
+                doc_id = ids[0] if ids else raw["upserted"]
+                result = self._docs.get(doc_id)
+            else:
+                result = before
+            result = _project(result, projection) if result is not None else None
+        self._account("findAndModify", start)
+        return result
+
+    def find_one_and_delete(self, filter: Dict, projection: Optional[Any] = None, sort: Optional[Any] = None, **kwargs) -> Optional[Dict]:
+        start = time.perf_counter()
+        with self._lock:
+            ids = [i for i in self._candidates(filter) if _matches(self._docs[i], filter)]
+            if sort:
+                ids = [d["_id"] for d in self._run_sort([self._docs[i] for i in ids], sort)]
+            result = None
+            if ids:
+                doc = self._docs.pop(ids[0])
+                del self._seq[ids[0]]
+                self._index_remove(doc)
+                result = _project(doc, projection)
+        self._account("findAndModify", start)
+        return result
+
+    @staticmethod
+    def _run_sort(docs: List[Dict], sort: Any) -> List[Dict]:
+        for key, direction in reversed(list(sort)):
+            docs.sort(key=lambda d: _sort_key(_get_path(d, key)), reverse=direction < 0)
+        return docs
+
+    def _delete(self, filter: Dict, many: bool) -> int:
+        targets = [i for i in self._candidates(filter) if _matches(self._docs[i], filter)]
+        if not many:
+            targets = targets[:1]
+        for doc_id in targets:
+            self._index_remove(self._docs.pop(doc_id))
+            del self._seq[doc_id]
+        return len(targets)
+
+    def delete_one(self, filter: Dict, *args, **kwargs) -> DeleteResult:
+        start = time.perf_counter()
+        with self._lock:
+            deleted = self._delete(filter, many=False)
+        self._account("delete", start)
+        return DeleteResult({"n": deleted}, True)
+
+    def delete_many(self, filter: Dict, *args, **kwargs) -> DeleteResult:
+        start = time.perf_counter()
+        with self._lock:
+            deleted = self._delete(filter, many=True)
+        self._account("delete", start)
+        return DeleteResult({"n": deleted}, True)
+
+    def bulk_write(self, requests: Iterable[Any], ordered: bool = True, *args, **kwargs) -> BulkWriteResult:
+        """Apply pymongo InsertOne/UpdateOne/UpdateMany/DeleteOne/DeleteMany/ReplaceOne operations."""
+        start = time.perf_counter()
+        result = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0, "upserted": [],
+                  "writeErrors": [], "writeConcernErrors": []}
+        with self._lock:
+            for index, request in enumerate(requests):
+                kind = type(request).__name__
+                try:
+                    if kind == "InsertOne":
+                        self._insert(request._doc)
+                        result["nInserted"] += 1
+                    elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                        raw = self._update(request._filter, request._doc, bool(request._upsert), many=kind == "UpdateMany")
+                        if raw["upserted"] is not None:
+                            result["nUpserted"] += 1
+                            result["upserted"].append({"index": index, "_id": raw["upserted"]})
+                        else:
+                            result["nMatched"] += raw["n"]
+                            result["nModified"] += raw["nModified"]
+                    elif kind in ("DeleteOne", "DeleteMany"):
+                        result["nRemoved"] += self._delete(request._filter, many=kind == "DeleteMany")
+                    else:
+                        raise ValueError(f"Bulk operation '{kind}' not supported by the in-memory backend")
+                except DuplicateKeyError as exc:
+                    result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(exc)})
+                    if ordered:
+                        break
+        self._account("bulkWrite", start)
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def drop(self) -> None:
+        with self._lock:
+            self._docs.clear()
+            self._seq.clear()
+            for index in self._indexes.values():
+                index.clear()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+_memory_collections: Dict[str, InMemoryCollection] = {}
+_memory_lock = threading.Lock()
+
+
+def get_memory_collection(name: str) -> InMemoryCollection:
+    """Get (or create) the process-wide in-memory collection with the given name."""
+    with _memory_lock:
+        collection = _memory_collections.get(name)
+        if collection is None:
+            collection = _memory_collections[name] = InMemoryCollection(name)
+        return collection
+
+
+def reset_memory_collections() -> None:
+    """Empty every in-memory collection (keeps the instances routes already imported)."""
+    with _memory_lock:
+        for collection in _memory_collections.values():
+            collection.drop()
+
+
+def memory_collection_for(collection: Any) -> InMemoryCollection:
+    """Map a pymongo Collection (or a name) onto its in-memory counterpart."""
+    if isinstance(collection, InMemoryCollection):
+        return collection
+    if isinstance(collection, str):
+        return get_memory_collection(collection)
+    return get_memory_collection(getattr(collection, "name", "default"))
+
+
+class InMemoryRepository(MongoRepository):
+    """
+    In-memory implementation of the repository pattern.
+
+    Stores documents in an InMemoryCollection, so the MongoRepository logic
+    (and the Product/User repositories built on it) runs unchanged at CPU speed
+    without a database process.
+    """
+
+    def __init__(self, collection: Any = None):
+        super().__init__(memory_collection_for(collection if collection is not None else "default"))
@@ -1,3 +1,4 @@
+import os
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 from bson import ObjectId
@@ -153,17 +154,41 @@ class UserRepository(MongoRepository):
         """Count number of admin users."""
         return self.collection.count_documents({"role": "admin"})
 
+def parse_cache_config(raw: str) -> Dict[str, Dict]:
+    """
+    Parse REPOSITORY_CACHE, e.g. "product:60:5000,user:30" (entity:ttl_seconds[:max_size]).
+    """
+    config = {}
+    for entry in filter(None, (part.strip() for part in raw.split(","))):
+        parts = entry.split(":")
+        options = {}
+        if len(parts) > 1 and parts[1]:
+            options["ttl"] = float(parts[1])
+        if len(parts) > 2 and parts[2]:
+            options["max_size"] = int(parts[2])
+        config[parts[0]] = options
+    return config
+
 class RepositoryFactory(BaseFactory):
     """
     Factory for creating repository instances.
     """
     
-    def __init__(self):
+    def __init__(self, backend: str = None, cache_config: Dict[str, Dict] = None):
+        self.backend = backend or os.getenv("DB_BACKEND", "mongo")
+        # Repository types to wrap in a CachingRepository, with their TTL/size options
+        self.cache_config = cache_config if cache_config is not None else parse_cache_config(os.getenv("REPOSITORY_CACHE", ""))
         self._repositories = {
             "mongo": MongoRepository,
             "product": ProductRepository,
             "user": UserRepository,
         }
+        self._backends = ("mongo", "memory")
+        if self.backend not in self._backends:
+            raise ValueError(f"Repository backend '{self.backend}' not supported. Available: {list(self._backends)}")
+        # Imported lazily: the in-memory backend builds on MongoRepository above
+        from .memory_repository import InMemoryRepository
+        self._repositories["memory"] = InMemoryRepository
     
     def create(self, repo_type: str, collection: Collection, *args, **kwargs) -> BaseRepository:
         """
@@ -171,10 +196,12 @@ class RepositoryFactory(BaseFactory):
         
         Args:
             repo_type: Type of repository to create
-            collection: MongoDB collection instance
+            collection: MongoDB collection instance (mapped onto the in-memory
+                collection of the same name when the backend is "memory")
             
         Returns:
-            Repository instance
+            Repository instance, wrapped in a CachingRepository when repo_type
+            is enabled in cache_config
             
         Raises:
             ValueError: If repository type not supported
@@ -182,8 +209,21 @@ class RepositoryFactory(BaseFactory):
         if repo_type not in self._repositories:
             raise ValueError(f"Repository type '{repo_type}' not supported. Available: {list(self._repositories.keys())}")
         
+        if self.backend == "memory":
+            from .memory_repository import memory_collection_for
+            collection = memory_collection_for(collection)
+        
         repository_class = self._repositories[repo_type]
-        return repository_class(collection, *args, **kwargs)
+        repository = repository_class(collection, *args, **kwargs)
+        
+        if repo_type in self.cache_config:
+            from .caching_repository import CachingRepository
+            from configs.cache import make_cache
+            options = self.cache_config[repo_type]
+            cache = make_cache(f"repository:{repo_type}", options.get("ttl", 60.0), options.get("max_size", 10_000))
+            repository = CachingRepository(repository, entity=repo_type, cache=cache, **options)
+        
+        return repository
     
     def get_available_types(self) -> list:
         """Get list of available repository types."""
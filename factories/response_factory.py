@@ -20,8 +20,8 @@ class BaseResponseFormatter(ABC):
         pass
     
     @abstractmethod
-    def paginated_response(self, data: List, page: int, limit: int, total: int = None) -> Dict:
-        """Format paginated response."""
+    def paginated_response(self, data: List, page: int, limit: int, total: int = None, next_cursor: str = None) -> Dict:
+        """Format paginated response (page-numbered, or cursor-based when next_cursor is given)."""
         pass
 
 class StandardResponseFormatter(BaseResponseFormatter):
@@ -49,7 +49,7 @@ class StandardResponseFormatter(BaseResponseFormatter):
             response["details"] = details
         return response
     
-    def paginated_response(self, data: List, page: int, limit: int, total: int = None) -> Dict:
+    def paginated_response(self, data: List, page: int, limit: int, total: int = None, next_cursor: str = None) -> Dict:
         """Format paginated response with metadata."""
         response = {
             "success": True,
@@ -63,6 +63,9 @@ class StandardResponseFormatter(BaseResponseFormatter):
         if total is not None:
             response["pagination"]["total"] = total
             response["pagination"]["pages"] = (total + limit - 1) // limit
+        if page is None:
+            # Cursor paging: null on the last page
+            response["pagination"]["next_cursor"] = next_cursor
         return response
 
 class APIResponseFormatter(BaseResponseFormatter):
@@ -92,7 +95,7 @@ class APIResponseFormatter(BaseResponseFormatter):
             response["error_details"] = details
         return response
     
-    def paginated_response(self, data: List, page: int, limit: int, total: int = None) -> Dict:
+    def paginated_response(self, data: List, page: int, limit: int, total: int = None, next_cursor: str = None) -> Dict:
         """Format API paginated response."""
         response = {
             "status": "success",
@@ -109,6 +112,8 @@ class APIResponseFormatter(BaseResponseFormatter):
         if total is not None:
             response["result"]["pagination"]["total_items"] = total
             response["result"]["pagination"]["total_pages"] = (total + limit - 1) // limit
+        if page is None:
+            response["result"]["pagination"]["next_cursor"] = next_cursor
         return response
     
     def _get_timestamp(self) -> str:
@@ -134,9 +139,10 @@ class ResponseService:
         error_data = self.formatter.error_response(message, status_code, details)
         raise HTTPException(status_code=status_code, detail=error_data)
     
-    def paginated(self, data: List, page: int, limit: int, total: int = None, status_code: int = 200) -> JSONResponse:
+    def paginated(self, data: List, page: int, limit: int, total: int = None, status_code: int = 200,
+                  next_cursor: str = None) -> JSONResponse:
         """Return paginated JSON response."""
-        response_data = self.formatter.paginated_response(data, page, limit, total)
+        response_data = self.formatter.paginated_response(data, page, limit, total, next_cursor)
         return JSONResponse(content=response_data, status_code=status_code)
     
     def not_found(self, resource: str = "Resource") -> HTTPException:
@@ -4,17 +4,89 @@ from dotenv import load_dotenv
 # Load the .env file
 load_dotenv();
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from routes import order_routes, product_routes, user_routes, cart_routes, admin_routes
+from routes import order_routes, product_routes, user_routes, cart_routes, admin_routes, review_routes, metrics_routes
+from utils.metrics import MetricsMiddleware
+from utils.query_counter import QueryCountMiddleware
+from utils.rate_limit import RateLimitMiddleware
+from utils.admission import AdmissionMiddleware
+from utils.idempotency import IdempotencyMiddleware
+from utils.change_stream import start_change_consumer, stop_change_consumer
+from utils.order_queue import ORDER_WRITE_BEHIND, start_order_queue, stop_order_queue
+from utils.inventory import inventory
+from utils.reservations import reservations, CART_RESERVATIONS_ENABLED
+from utils.cart_cleanup import cart_cleanup, CART_CLEANUP_ENABLED
+from utils.order_archive import order_archiver
+from utils.recommendations import recommendations, RECOMMENDATIONS_ENABLED
+from utils.bestsellers import bestsellers, BESTSELLERS_ENABLED
+from utils.catalog_stats import catalog_stats, CATALOG_STATS_ENABLED
+from configs.database import db, DB_BACKEND, order_collection, cart_collection
+from configs.indexes import ensure_indexes
 
 from fastapi.middleware.cors import CORSMiddleware
 
 
 
-app = FastAPI()
-
 # ACcess the vaiables
 FRONTEND_API = os.getenv("FRONTEND_API")
+CHANGE_STREAM_ENABLED = os.getenv("CHANGE_STREAM_ENABLED", "true" if DB_BACKEND == "mongo" else "false").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if db is not None:
+        ensure_indexes(db)
+    # Background consumer pushing out-of-band DB writes into the in-process caches
+    if CHANGE_STREAM_ENABLED:
+        start_change_consumer(db)
+    # Write-behind order ingestion: replays the local queue log before serving
+    if ORDER_WRITE_BEHIND:
+        start_order_queue(order_collection, cart_collection)
+    # Loads sharded (hot) products and rebalances their stock shards in the background
+    inventory.start()
+    # Returns stock from expired cart holds in batches
+    if CART_RESERVATIONS_ENABLED:
+        reservations.start()
+    # Scheduled, rate-limited removal of empty and abandoned carts
+    if CART_CLEANUP_ENABLED:
+        cart_cleanup.start()
+    # Moves old delivered/cancelled orders out of the hot orders collection
+    if order_archiver is not None:
+        order_archiver.start()
+    # Periodic rebuild of "frequently bought together" lists from order history
+    if RECOMMENDATIONS_ENABLED:
+        recommendations.start()
+    # Bestseller/trending rankings: load counters now, refresh and reconcile in the background
+    if BESTSELLERS_ENABLED:
+        bestsellers.start()
+    # Category list and admin dashboard aggregates, recomputed on write events or on a schedule
+    if CATALOG_STATS_ENABLED:
+        catalog_stats.start()
+    yield
+    catalog_stats.stop()
+    bestsellers.stop()
+    recommendations.stop()
+    if order_archiver is not None:
+        order_archiver.stop()
+    cart_cleanup.stop()
+    reservations.stop()
+    inventory.stop()
+    stop_order_queue()
+    stop_change_consumer()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Priority-tiered admission control: sheds admin/browse with 503 before checkout queues
+app.add_middleware(AdmissionMiddleware)
+
+# Per-client token-bucket limits on auth and search routes (inside CORS so 429s stay readable by the browser)
+app.add_middleware(RateLimitMiddleware)
+
+# Idempotency-Key replay for checkout and cart writes (retries skip the handler entirely)
+app.add_middleware(IdempotencyMiddleware)
 
 # ✅ Add the CORS middleware
 app.add_middleware(
@@ -25,6 +97,12 @@ app.add_middleware(
     allow_headers=["*"],              # Allow all headers
 )
 
+# Per-route request count, status and latency histograms (served at /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# Per-request DB round-trip accounting (X-DB-Calls / X-DB-Time-Ms headers)
+app.add_middleware(QueryCountMiddleware)
+
 app.include_router(product_routes.router, prefix="/api/v1")
 
 app.include_router(order_routes.router, prefix="/api/v1")
@@ -33,4 +111,8 @@ app.include_router(user_routes.router, prefix="/api/v1")
 
 app.include_router(cart_routes.router, prefix="/api/v1")
 
-app.include_router(admin_routes.router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(admin_routes.router, prefix="/api/v1")
+
+app.include_router(review_routes.router, prefix="/api/v1")
+
+app.include_router(metrics_routes.router)
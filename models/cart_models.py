@@ -1,15 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 class CartItem(BaseModel):
     product_id : str
-    quantity : int
+    quantity : int = Field(gt=0)
     
 
 
 class UpdateCartItem(BaseModel):
     product_id : str
-    quantity : int
+    quantity : int = Field(gt=0)
     
 
 class Cart(BaseModel):
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, UTC
 
@@ -8,4 +8,28 @@ class Order(BaseModel):
     user_id: str
     shipping_address: str
     status: Optional[str] = "Pending"
-    created_at: Optional[datetime] = datetime.now(UTC)
\ No newline at end of file
+    # Per order: archival selects by age, so this must not be the import time
+    created_at: Optional[datetime] = Field(default_factory=lambda: datetime.now(UTC))
+
+# Order lifecycle: status -> statuses it may move to next
+ORDER_TRANSITIONS = {
+    "Pending": {"Confirmed", "Cancelled"},
+    "Confirmed": {"Shipped", "Cancelled"},
+    "Shipped": {"Delivered"},
+    "Delivered": set(),
+    "Cancelled": set(),
+}
+
+
+def allowed_from(status: str) -> List[str]:
+    """Statuses an order may be in to move to the given status."""
+    return [current for current, targets in ORDER_TRANSITIONS.items() if status in targets]
+
+
+class OrderStatusChange(BaseModel):
+    order_id: str
+    status: str
+
+
+class BulkOrderStatusUpdate(BaseModel):
+    updates: List[OrderStatusChange]
@@ -1,58 +1,127 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from configs.database import user_collection, order_collection, product_collection
+from configs.cache import principal_cache, product_cache
 
 from bson import ObjectId
+from typing import Optional
 
 from utils.auth_dependencies import admin_required
+from utils.executors import run_in_executor
+from utils.inventory import inventory, MAX_STOCK_SHARDS
+from utils.order_archive import delete_archived_order
+from utils.catalog_stats import catalog_stats
+from utils import invalidation
+from utils.pagination import keyset_page, parse_sort, estimated_total, paginated, MAX_PAGE_SIZE
 
 router = APIRouter()
 
 
-# view All Users
+# view All Users (cursor paginated; newest first by default)
 @router.get("/admin/users")
-def get_all_users(current_user: dict = Depends(admin_required)):
-    users = list(user_collection.find())
+@run_in_executor("admin")
+def get_all_users(role: Optional[str] = None, sort: str = "-_id", cursor: Optional[str] = None,
+                  limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), current_user: dict = Depends(admin_required)):
+    query = {}
+    
+    if role:
+        query["role"] = role
+    
+    field, direction = parse_sort(sort, ["_id", "email"])
+    users, next_cursor = keyset_page(user_collection, query, field, direction, cursor, limit, {"password": 0})
     
     for user in users:
         user["id"] = str(user["_id"])
         del user["_id"]
-        del user["password"]
         
-    return users
+    return paginated(users, limit, estimated_total(user_collection, query), next_cursor)
 
 # Delete a User
 @router.delete("/admin/users/{user_id}")
+@run_in_executor("admin")
 def delete_user(user_id : str, current_user: dict = Depends(admin_required)):
     result = user_collection.delete_one({"_id": ObjectId(user_id)})
+    principal_cache.delete(user_id)
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User Not Found")
     
+    invalidation.publish("users", [user_id], "delete")
+    
     return {"message" : "User Deleted Successfully"}
 
 
 # Delete a order
 @router.delete("/admin/orders/{order_id}")
+@run_in_executor("admin")
 def delete_order(order_id : str , current_user: dict = Depends(admin_required)):
     
     result = order_collection.delete_one({"_id" : ObjectId(order_id)})
     
-    if result.deleted_count == 0:
+    if result.deleted_count == 0 and not delete_archived_order(order_id):
         raise HTTPException(status_code=404, detail="Order Not Found")
     
+    invalidation.publish("orders", [order_id], "delete")
+    
     return {"message" : "Order deleted Successfully"}
 
-# View all products
+
+# Dashboard figures: user, product and order counts and revenue (an in-memory snapshot when CATALOG_STATS_ENABLED)
+@router.get("/admin/stats")
+@run_in_executor("admin")
+def get_stats(current_user: dict = Depends(admin_required)):
+    return catalog_stats.stats()
+
+# View all products (cursor paginated; newest first by default)
 @router.get("/admin/products")
-def get_all_products(current_user: dict = Depends(admin_required)):
-    products = list(product_collection.find())
+@run_in_executor("admin")
+def get_all_products(category: Optional[str] = None, min_price: Optional[float] = None, max_price: Optional[float] = None,
+                     sort: str = "-_id", cursor: Optional[str] = None, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+                     current_user: dict = Depends(admin_required)):
+    query = {}
+    
+    if category:
+        query["category"] = category
+    
+    if min_price is not None or max_price is not None:
+        query["price"] = {}
+        if min_price is not None:
+            query["price"]["$gte"] = min_price
+        if max_price is not None:
+            query["price"]["$lte"] = max_price
+    
+    field, direction = parse_sort(sort, ["_id", "price", "rating"])
+    products, next_cursor = keyset_page(product_collection, query, field, direction, cursor, limit)
     
     for product in products:
         product["id"] = str(product["_id"])
         
         del product["_id"]
+
+    inventory.overlay(products)
         
-        
-    return products
+    return paginated(products, limit, estimated_total(product_collection, query), next_cursor)
+
+
+# Split a hot product's stock across N shard documents to spread checkout writes
+@router.post("/admin/products/{product_id}/stock-shards")
+@run_in_executor("admin")
+def enable_stock_shards(product_id: str, shards: int = Query(8, ge=1, le=MAX_STOCK_SHARDS), current_user: dict = Depends(admin_required)):
+    if not product_collection.find_one({"_id": ObjectId(product_id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Product Not Found")
+
+    stock = inventory.enable(product_id, shards)
+    product_cache.delete(product_id)
+
+    return {"message": "Stock sharding enabled", "product_id": product_id, "shards": shards, "stock": stock}
+
+
+# Fold a product's stock shards back into the product document
+@router.delete("/admin/products/{product_id}/stock-shards")
+@run_in_executor("admin")
+def disable_stock_shards(product_id: str, current_user: dict = Depends(admin_required)):
+    stock = inventory.disable(product_id)
+    product_cache.delete(product_id)
+
+    return {"message": "Stock sharding disabled", "product_id": product_id, "stock": stock}
 
 
@@ -6,6 +6,10 @@ from configs.database import cart_collection , product_collection
 from utils.auth_dependencies import get_current_user
 
 from bson import ObjectId
+from utils.executors import run_in_executor
+from utils.reservations import reservations, CART_RESERVATIONS_ENABLED
+from typing import Optional
+from datetime import datetime, UTC
 
 
 router = APIRouter()
@@ -13,7 +17,8 @@ router = APIRouter()
 
 # Add item to cart
 @router.post("/cart/{user_id}/add")
-def add_to_cart(user_id: str, item : CartItem , current_user: dict = Depends(get_current_user)):
+@run_in_executor("cart")
+def add_to_cart(user_id: str, item : CartItem , hold: Optional[bool] = None, current_user: dict = Depends(get_current_user)):
     if str(current_user["_id"]) != (user_id) and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
     # Validate product exxistence
@@ -22,13 +27,18 @@ def add_to_cart(user_id: str, item : CartItem , current_user: dict = Depends(get
     if not product:
         raise HTTPException(status_code=404,
                             detail = "Sorry No Product Found")
+
+    # Hold the stock now so a flash-sale checkout fails here rather than at place_order
+    if CART_RESERVATIONS_ENABLED and hold is not False and not reservations.hold(user_id, item.product_id, item.quantity):
+        raise HTTPException(status_code=400, detail=f"Product '{product.get('name')}' is out of stock")
         
     existing_cart = cart_collection.find_one({"user_id": user_id})
     
     if not existing_cart:
         cart_collection.insert_one({
             "user_id" : user_id,
-            "items" : [{"product_id" : item.product_id, "quantity" : item.quantity}]
+            "items" : [{"product_id" : item.product_id, "quantity" : item.quantity}],
+            "updated_at": datetime.now(UTC)
         })
         
     else:
@@ -42,12 +52,13 @@ def add_to_cart(user_id: str, item : CartItem , current_user: dict = Depends(get
         else:
             items.append({"product_id": item.product_id, "quantity": item.quantity})
             
-        cart_collection.update_one({"user_id" : user_id}, {"$set" : {"items": items}})
+        cart_collection.update_one({"user_id" : user_id}, {"$set" : {"items": items, "updated_at": datetime.now(UTC)}})
         
     return {"message": "Product added to Cart"}
 
 # view Cart
 @router.get("/cart/{user_id}")
+@run_in_executor("cart")
 def get_cart(user_id: str, current_user: dict = Depends(get_current_user)):
     
     if str(current_user["_id"]) != user_id and current_user["role"] != "admin":
@@ -61,8 +72,12 @@ def get_cart(user_id: str, current_user: dict = Depends(get_current_user)):
     total = 0
     enriched_items = []
     
+    # One round trip for every product in the cart
+    ids = [ObjectId(item["product_id"]) for item in cart["items"]]
+    products = {str(p["_id"]): p for p in product_collection.find({"_id": {"$in": ids}}, {"name": 1, "price": 1})}
+    
     for item in cart["items"]:
-        product = product_collection.find_one({"_id": ObjectId(item["product_id"])})
+        product = products.get(item["product_id"])
         
         if product :
             price = product["price"]
@@ -76,11 +91,12 @@ def get_cart(user_id: str, current_user: dict = Depends(get_current_user)):
                 "subtotal" : subtotal
             })
             
-    return {"items": enriched_items, "total_price" : price}
+    return {"items": enriched_items, "total_price" : total}
     
     
 # Update Quantity 
 @router.put("/cart/{user_id}/update")
+@run_in_executor("cart")
 def update_cart_items(user_id: str, item: UpdateCartItem, current_user: dict = Depends(get_current_user)):
     
     if str(current_user["_id"]) != user_id and current_user["role"] != "admin":
@@ -101,14 +117,19 @@ def update_cart_items(user_id: str, item: UpdateCartItem, current_user: dict = D
         
     if not updated:
         raise HTTPException(status_code = 404, detail = "Item not found in cart")
+
+    # Grow or shrink the stock hold to the new quantity
+    if CART_RESERVATIONS_ENABLED and not reservations.resize(user_id, item.product_id, item.quantity):
+        raise HTTPException(status_code=400, detail="Not enough stock for the requested quantity")
     
-    cart_collection.update_one({"user_id" : user_id}, {"$set" : {"items" : cart["items"]}})
+    cart_collection.update_one({"user_id" : user_id}, {"$set" : {"items" : cart["items"], "updated_at": datetime.now(UTC)}})
     
     
     return {"message": "Quantity Updated"}
 
 # Remove Products
 @router.delete("/cart/{user_id}/remove/{product_id}")
+@run_in_executor("cart")
 def remove_cart_item(user_id : str, product_id : str, current_user: dict = Depends(get_current_user)):
     
     if str(current_user["_id"]) != user_id and current_user["role"] != "admin":
@@ -121,7 +142,11 @@ def remove_cart_item(user_id : str, product_id : str, current_user: dict = Depen
     
     items = [i for i in cart["items"] if i["product_id"] != product_id]
     
-    cart_collection.update_one({"user_id" : user_id}, {"$set" : {"items" : items}})
+    cart_collection.update_one({"user_id" : user_id}, {"$set" : {"items" : items, "updated_at": datetime.now(UTC)}})
+
+    # Give any held stock back right away instead of waiting for the hold to expire
+    if CART_RESERVATIONS_ENABLED:
+        reservations.cancel(user_id, product_id)
     
     return {"message" : "Item Removed From Cart"}
 
@@ -1,46 +1,82 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from configs.database import order_collection, product_collection, cart_collection
-from models.order_models import Order
+from configs.cache import product_cache
+from models.order_models import Order, BulkOrderStatusUpdate, ORDER_TRANSITIONS, allowed_from
 from bson import ObjectId
+from pymongo import UpdateOne
+from datetime import datetime, UTC
+from typing import Optional
 from utils.auth_dependencies import get_current_user, admin_required
+from utils.executors import run_in_executor
+from utils.order_queue import get_order_queue
+from utils.order_archive import find_archived_order, find_archived_orders
+from utils.inventory import inventory
+from utils.reservations import reservations, CART_RESERVATIONS_ENABLED
+from utils.bestsellers import record_sales
+from utils.pagination import keyset_page, parse_sort, estimated_total, paginated, MAX_PAGE_SIZE
+from utils import invalidation
 
 
 router = APIRouter()
 
+MAX_BULK_STATUS_UPDATES = 1000
+
 
 # Place Order 
 @router.post("/orders")
+@run_in_executor("checkout")
 def place_order(order: Order, current_user: dict = Depends(get_current_user)):
     
     if str(current_user["_id"]) != order.user_id and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
         
         
-    # 1. Decrease stock for each product
+    # 1. Reserve stock atomically: the stock check and the decrement are one conditional update
+    reserved = []
     for product_id in order.products:
-        # Convert string to ObjectId
-        obj_id = ObjectId(product_id)
-
-        # Check if product exists
-        product = product_collection.find_one({"_id": obj_id})
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
+        # Stock held when the item went into the cart is already taken out of sale
+        if CART_RESERVATIONS_ENABLED and reservations.consume(order.user_id, product_id):
+            reserved.append((product_id, True))
+            continue
 
-        # Check stock
-        if product.get("stock", 0) <= 0:
+        if not inventory.decrement(product_id):
+            # Give back what this order already took before reporting why it failed
+            release_stock(order.user_id, reserved)
+            product = product_collection.find_one({"_id": ObjectId(product_id)}, {"name": 1})
+            if not product:
+                raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
             raise HTTPException(status_code=400, detail=f"Product '{product.get('name')}' is out of stock")
 
-        # Decrease stock by 1
-        product_collection.update_one(
-            {"_id": obj_id},
-            {"$inc": {"stock": -1}}
-        )
+        reserved.append((product_id, False))
+        if not inventory.is_hot(product_id):
+            # Hot products keep stock in shards; their product document didn't change
+            product_cache.delete(product_id)
+
+    # 2. Write-behind: durably queue the order and acknowledge; the queue inserts it and clears the cart
+    queue = get_order_queue()
+    if queue is not None:
+        order_id = queue.enqueue(order.model_dump())
+        record_sales(order.products, order.created_at)
+        invalidation.publish("orders", [order_id], "insert")
+        release_unused_holds(order.user_id)
+        return {
+            "success": True,
+            "message": "Order Created Successfully",
+            "order_id": order_id
+        }
 
     # 2. Insert the order
     res = order_collection.insert_one(order.model_dump())
 
     # 3. Clear user's cart items after successful order creation
-    cart_collection.update_one({"user_id": order.user_id}, {"$set": {"items": []}})
+    cart_collection.update_one({"user_id": order.user_id}, {"$set": {"items": [], "updated_at": datetime.now(UTC)}})
+
+    # 4. Bump the bestseller/trending counters
+    record_sales(order.products, order.created_at)
+    invalidation.publish("orders", [str(res.inserted_id)], "insert")
+
+    # 5. The cart is emptied, so holds checkout didn't use would only keep stock off sale until they expire
+    release_unused_holds(order.user_id)
 
     return {
         "success": res.acknowledged,
@@ -48,24 +84,64 @@ def place_order(order: Order, current_user: dict = Depends(get_current_user)):
         "order_id": str(res.inserted_id)
     }
 
-# Get all orders
+
+def release_stock(user_id: str, reserved) -> None:
+    """Compensate a partially reserved order: units from cart holds go back on hold, the rest back to stock."""
+    for product_id, from_hold in reserved:
+        if from_hold:
+            reservations.restore(user_id, product_id)
+            continue
+        inventory.release(product_id)
+        product_cache.delete(product_id)
+
+def release_unused_holds(user_id: str) -> None:
+    if CART_RESERVATIONS_ENABLED:
+        reservations.cancel_all(user_id)
+
+# Get all orders (cursor paginated; newest first by default)
 @router.get("/orders")
-def get_orders(current_user: dict = Depends(admin_required)):
-    orders_cursor = order_collection.find()
+@run_in_executor("admin")
+def get_orders(status: Optional[str] = None, user_id: Optional[str] = None, created_from: Optional[datetime] = None,
+               created_to: Optional[datetime] = None, sort: str = "-created_at", cursor: Optional[str] = None,
+               limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), current_user: dict = Depends(admin_required)):
+    query = {}
     
-    orders = []
-    for order in orders_cursor:
+    if status:
+        query["status"] = status
+    if user_id:
+        query["user_id"] = user_id
+    
+    # Timestamps without an offset are UTC, as stored
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from.replace(tzinfo=created_from.tzinfo or UTC)
+        if created_to:
+            query["created_at"]["$lt"] = created_to.replace(tzinfo=created_to.tzinfo or UTC)
+    
+    field, direction = parse_sort(sort, ["created_at", "_id"])
+    orders, next_cursor = keyset_page(order_collection, query, field, direction, cursor, limit)
+    
+    for order in orders:
         order["id"] = str(order["_id"])
         del order["_id"]
-        orders.append(order)
         
-    return orders
+    return paginated(orders, limit, estimated_total(order_collection, query), next_cursor)
 
 
 # Get Order Detail
 @router.get("/orders/{id}")
+@run_in_executor("cart")
 def get_order_by_id(id: str, current_user: dict = Depends(get_current_user)):
     order = order_collection.find_one({"_id": ObjectId(id)})
+
+    # Not written yet? It may still be in the write-behind queue
+    if not order and get_order_queue() is not None:
+        order = get_order_queue().get(id)
+
+    # Old delivered/cancelled orders live in the archive
+    if not order:
+        order = find_archived_order(id)
     
     if not order:
         raise HTTPException(status_code=404, detail="Order Not Found")
@@ -78,23 +154,110 @@ def get_order_by_id(id: str, current_user: dict = Depends(get_current_user)):
 
 # Update Order Status (Admin)
 @router.put("/admin/orders/{id}/status")
+@run_in_executor("admin")
 def update_order_status(id: str, status: str, current_user: dict = Depends(admin_required)):
     """
-    Update the status of an existing order. Allowed statuses:
-    Pending, Confirmed, Shipped, Delivered, Cancelled
+    Update the status of an existing order. Allowed transitions:
+    Pending -> Confirmed/Cancelled, Confirmed -> Shipped/Cancelled, Shipped -> Delivered
     """
-    allowed_statuses = ["Pending", "Confirmed", "Shipped", "Delivered", "Cancelled"]
-    if status not in allowed_statuses:
+    if status not in ORDER_TRANSITIONS:
         raise HTTPException(status_code=400, detail="Invalid status")
 
-    result = order_collection.update_one({"_id": ObjectId(id)}, {"$set": {"status": status}})
+    # The from-state guard makes the transition check and the write one atomic update
+    result = order_collection.update_one(
+        {"_id": ObjectId(id), "status": {"$in": allowed_from(status)}},
+        {"$set": {"status": status, "status_updated_at": datetime.now(UTC)}}
+    )
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Order Not Found")
+        order = order_collection.find_one({"_id": ObjectId(id)}, {"status": 1})
+        if not order:
+            raise HTTPException(status_code=404, detail="Order Not Found")
+        if order.get("status") != status:
+            raise HTTPException(status_code=409, detail=f"Cannot change order status from {order.get('status')} to {status}")
+    else:
+        invalidation.publish("orders", [id], "update")
 
     return {"message": f"Order status updated to {status}", "order_id": id, "status": status}
 
+
+# Bulk Update Order Status (Admin)
+@router.post("/admin/orders/status")
+@run_in_executor("admin")
+def bulk_update_order_status(payload: BulkOrderStatusUpdate, current_user: dict = Depends(admin_required)):
+    """
+    Apply many status changes in one bulk_write and report an outcome per order:
+    updated, unchanged, not_found, invalid_id, invalid_status, invalid_transition
+    or conflict (the order changed status while the batch was being applied).
+    """
+    if len(payload.updates) > MAX_BULK_STATUS_UPDATES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_STATUS_UPDATES} updates per request")
+    if len({change.order_id for change in payload.updates}) != len(payload.updates):
+        raise HTTPException(status_code=400, detail="Each order may appear only once per request")
+
+    results = {}
+    targets = {}
+    for change in payload.updates:
+        if change.status not in ORDER_TRANSITIONS:
+            results[change.order_id] = "invalid_status"
+        elif not ObjectId.is_valid(change.order_id):
+            results[change.order_id] = "invalid_id"
+        else:
+            targets[change.order_id] = change.status
+
+    # One read for every current status, then one bulk_write guarded by those statuses
+    current = {
+        str(order["_id"]): order.get("status")
+        for order in order_collection.find({"_id": {"$in": [ObjectId(i) for i in targets]}}, {"status": 1})
+    }
+    now = datetime.now(UTC)
+    requests = []
+    for order_id, status in targets.items():
+        if order_id not in current:
+            results[order_id] = "not_found"
+        elif current[order_id] == status:
+            results[order_id] = "unchanged"
+        elif current[order_id] not in allowed_from(status):
+            results[order_id] = "invalid_transition"
+        else:
+            results[order_id] = "updated"
+            requests.append(UpdateOne(
+                {"_id": ObjectId(order_id), "status": current[order_id]},
+                {"$set": {"status": status, "status_updated_at": now}}
+            ))
+
+    updated = [order_id for order_id, outcome in results.items() if outcome == "updated"]
+    if requests:
+        result = order_collection.bulk_write(requests, ordered=False)
+        if result.modified_count < len(requests):
+            # Someone else moved these orders between our read and the write
+            applied = {
+                str(order["_id"])
+                for order in order_collection.find(
+                    {"_id": {"$in": [ObjectId(i) for i in updated]}, "status_updated_at": now}, {"_id": 1}
+                )
+            }
+            for order_id in updated:
+                if order_id not in applied:
+                    results[order_id] = "conflict"
+            updated = [order_id for order_id in updated if order_id in applied]
+
+    # Rollups and caches are refreshed once for the whole batch
+    if updated:
+        invalidation.publish("orders", updated, "update")
+
+    counts = {}
+    for outcome in results.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    return {
+        "message": f"{len(updated)} orders updated",
+        "counts": counts,
+        "results": [{"order_id": order_id, "outcome": outcome} for order_id, outcome in results.items()]
+    }
+
 # Get Orders by user id (Order History)
 @router.get("/orders/user/{user_id}")
+@run_in_executor("cart")
 def get_orders_by_user(user_id : str, current_user: dict = Depends(get_current_user)):
     
     if str(current_user["_id"]) != user_id and current_user["role"] != "admin":
@@ -102,12 +265,22 @@ def get_orders_by_user(user_id : str, current_user: dict = Depends(get_current_u
     orders_cursor = order_collection.find({"user_id": user_id})
     
     orders = []
+    seen = set()
     
-    for order in orders_cursor:
+    # Hot collection, then orders still queued for writing, then archived history
+    queue = get_order_queue()
+    pending = queue.pending_for_user(user_id) if queue is not None else []
+    for order in [*orders_cursor, *pending, *find_archived_orders(user_id)]:
         order["id"] = str(order["_id"])
         
         del order["_id"]
         
+        # An order mid-archival can briefly be in both places
+        if order["id"] in seen:
+            continue
+        seen.add(order["id"])
+        orders.append(order)
+        
     return orders
 
 
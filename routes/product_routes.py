@@ -1,15 +1,28 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from bson import ObjectId
 from models.product_models import Product, ProductSearch, ProductUpdate, ProductFilter
-from configs.database import product_collection
+from configs.database import product_collection, reviews_collection
+from configs.cache import product_cache
 from typing import Optional
+from datetime import datetime, UTC
 from utils.auth_dependencies import get_current_user, admin_required
+from utils.single_flight import SingleFlight
+from utils.executors import run_in_executor
+from utils.inventory import inventory
+from utils.recommendations import related_for, RECOMMENDATIONS_TOP_K
+from utils.bestsellers import bestsellers, ALL_TIME, BESTSELLERS_TOP_K
+from utils.catalog_stats import catalog_stats
+from utils import invalidation
 
 router = APIRouter()
 
+# Concurrent cache misses for the same product share one find_one
+product_flight = SingleFlight("product")
+
 
 # GEt all the products with pagination
 @router.get("/product-list")
+@run_in_executor("catalog")
 def get_all_products(page: int = 1, limit: int = 10):
     skip = (page - 1) * limit
     products = list(product_collection.find().skip(skip).limit(limit))
@@ -17,59 +30,136 @@ def get_all_products(page: int = 1, limit: int = 10):
     for p in products:
         p["id"] = str(p["_id"])
         del p["_id"]
+
+    inventory.overlay(products)
     
     return products
 
 # Get the product detail
 @router.get("/product/{id}")
+@run_in_executor("catalog")
 def get_product(id: str):
-    product = product_collection.find_one({"_id" : ObjectId(id)})
+    product = product_cache.get(id)
+    
+    if product is None:
+        product = product_flight.do(id, lambda: load_product(id))
     
     if not product:
         raise HTTPException(status_code = 404, detail = "Product not found")
+
+    # Sharded (hot) products: report the summed shard stock, not the pinned product field
+    if inventory.is_hot(id):
+        product = {**product, "stock": inventory.available(id)}
+    
+    return product  
+
+
+# Frequently bought together (precomputed by the recommendations job)
+@router.get("/product/{id}/related")
+@run_in_executor("catalog")
+def get_related_products(id: str, limit: int = Query(RECOMMENDATIONS_TOP_K, ge=1, le=RECOMMENDATIONS_TOP_K)):
+    return {"product_id": id, "related": related_for(id)[:limit]}
+
+
+# Best sellers (window=all) or trending (a decayed window), overall or per category
+@router.get("/products/bestsellers")
+@run_in_executor("catalog")
+def get_bestsellers(category: Optional[str] = None, window: str = ALL_TIME,
+                    limit: int = Query(10, ge=1, le=BESTSELLERS_TOP_K)):
+    try:
+        products = bestsellers.top(category, window, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    
+    return {"category": category, "window": window, "products": products}
+
+
+# Categories with product counts and price ranges (an in-memory snapshot when CATALOG_STATS_ENABLED)
+@router.get("/catalog/categories")
+@run_in_executor("catalog")
+def get_categories():
+    return catalog_stats.categories()
+
+
+def load_product(id: str):
+    product = product_collection.find_one({"_id" : ObjectId(id)})
+    
+    if not product:
+        return None
     
     product["id"] = str(product["_id"])
     
     del product["_id"]
     
-    return product  
+    product_cache.set(id, product)
+    
+    return product
 
 # Set the New products
 @router.post("/add-product")
+@run_in_executor("admin")
 def add_product(product : Product, current_user: dict = Depends(admin_required)):
     
     # The mongodb accepts the dictionary data type of python hence we have converted it
-    res = product_collection.insert_one(product.model_dump())
+    res = product_collection.insert_one({**product.model_dump(), "updated_at": datetime.now(UTC)})
+    invalidation.publish("products", [str(res.inserted_id)], "insert")
    
     return {"success":res.acknowledged, "message":"Product Added Successfully", "id":str(res.inserted_id)}
 
 # Update The Product
 @router.post("/product/{id}")
+@run_in_executor("admin")
 def update_product(id: str, update: ProductUpdate, current_user: dict = Depends(admin_required)):
-    result = product_collection.update_one(
-        {"_id": ObjectId(id)},
-        {"$set" : {k: v for k, v in update.model_dump().items() if v is not None}}
-    )
+    changes = {k: v for k, v in update.model_dump().items() if v is not None}
+
+    # Stock of a sharded product lives in its shards
+    if "stock" in changes and inventory.is_hot(id):
+        inventory.set_stock(id, changes.pop("stock"))
+
+    query = {"_id": ObjectId(id)}
+    if "stock" in changes:
+        # Never write stock onto a product another worker has sharded meanwhile
+        query["stock_shards"] = {"$exists": False}
+    result = product_collection.update_one(query, {"$set" : {**changes, "updated_at": datetime.now(UTC)}})
+
+    if result.matched_count == 0 and "stock" in changes and inventory.learn(id):
+        inventory.set_stock(id, changes.pop("stock"))
+        result = product_collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set" : {**changes, "updated_at": datetime.now(UTC)}}
+        )
+    
+    product_cache.delete(id)
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
 
+    invalidation.publish("products", [id], "update")
+
     return {"message" : "Product updated successfully"}
 
 
 # Delete the product
 @router.delete("/product/{id}")
+@run_in_executor("admin")
 def delete_product(id: str, current_user: dict = Depends(admin_required)):
     result = product_collection.delete_one({"_id" : ObjectId(id)})
+    product_cache.delete(id)
+    inventory.forget(id)
+    bestsellers.forget(id)
     
     if result.deleted_count == 0:
         raise HTTPException(status_code = 404, detail = "Product Not Found")
     
+    reviews_collection.delete_many({"product_id": id})
+    invalidation.publish("products", [id], "delete")
+
     return {"message" : "Product Deleted Successfully"}
 
 
 # Search Product
 @router.post("/search-product")
+@run_in_executor("catalog")
 def search_product(data : ProductSearch):
     query = {"name" : {"$regex": data.query, "$options" : "i"}} 
     
@@ -93,12 +183,15 @@ But here, you're just using "i" to make sure searches match regardless of case.
     for product in products:
         product["id"] = str(product["_id"])
         del product["_id"]
+
+    inventory.overlay(products)
         
     return products
 
 
 # Filter Product
 @router.post("/filter-products")
+@run_in_executor("catalog")
 def filter_products(filters: ProductFilter):
     
     query = {}
@@ -122,7 +215,8 @@ def filter_products(filters: ProductFilter):
     for product in products:
         product["id"] = str(product["_id"])
         del product["_id"]
-        
+
+    inventory.overlay(products)
     
     return products
    
@@ -0,0 +1,137 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from configs.database import product_collection, reviews_collection
+from configs.cache import product_cache
+from models.review_models import Review, ReviewUpdate
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, UTC
+from typing import Optional
+from utils.auth_dependencies import get_current_user
+from utils.executors import run_in_executor
+
+
+router = APIRouter()
+
+MAX_REVIEWS_PAGE = 100
+
+
+def apply_rating_change(product_id: str, sum_delta: int, count_delta: int) -> None:
+    """
+    Fold one review change into the product's running rating_sum/rating_count and refresh its average.
+
+    The $set of the average is guarded on the sums it was computed from: if another review
+    changed them in between, that writer's $set (computed from newer sums) wins instead.
+    Once the last review is gone the product has no rating rather than a 0.0 one.
+    updated_at moves with every rating write so catalog polling picks it up.
+    """
+    product = product_collection.find_one_and_update(
+        {"_id": ObjectId(product_id)},
+        {"$inc": {"rating_sum": sum_delta, "rating_count": count_delta}},
+        projection={"rating_sum": 1, "rating_count": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if product is None:
+        return
+    total, count = product["rating_sum"], product["rating_count"]
+    now = datetime.now(UTC)
+    rating = {"$set": {"rating": round(total / count, 2), "updated_at": now}} if count > 0 else \
+        {"$unset": {"rating": ""}, "$set": {"updated_at": now}}
+    product_collection.update_one({"_id": product["_id"], "rating_sum": total, "rating_count": count}, rating)
+    product_cache.delete(product_id)
+
+
+# Add a review (one per user and product)
+@router.post("/product/{id}/reviews")
+@run_in_executor("catalog")
+def add_review(id: str, review: Review, current_user: dict = Depends(get_current_user)):
+
+    if not product_collection.find_one({"_id": ObjectId(id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    user_id = str(current_user["_id"])
+    now = datetime.now(UTC)
+    try:
+        res = reviews_collection.update_one(
+            {"product_id": id, "user_id": user_id},
+            {"$setOnInsert": {**review.model_dump(), "user_name": current_user.get("name"),
+                              "created_at": now, "updated_at": now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        res = None
+
+    if res is None or res.upserted_id is None:
+        raise HTTPException(status_code=409, detail="You have already reviewed this product")
+
+    apply_rating_change(id, review.rating, 1)
+
+    return {"success": True, "message": "Review Added Successfully", "id": str(res.upserted_id)}
+
+
+# Reviews of a product, newest first (cursor = the last id of the previous page)
+@router.get("/product/{id}/reviews")
+@run_in_executor("catalog")
+def get_product_reviews(id: str, cursor: Optional[str] = None, limit: int = Query(20, ge=1, le=MAX_REVIEWS_PAGE)):
+    query = {"product_id": id}
+
+    if cursor:
+        try:
+            query["_id"] = {"$lt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # One extra document tells whether there is a next page
+    reviews = list(reviews_collection.find(query).sort("_id", DESCENDING).limit(limit + 1))
+    has_more = len(reviews) > limit
+    reviews = reviews[:limit]
+
+    for review in reviews:
+        review["id"] = str(review["_id"])
+        del review["_id"]
+
+    return {
+        "reviews": reviews,
+        "next_cursor": reviews[-1]["id"] if has_more else None
+    }
+
+
+# Edit your review
+@router.put("/reviews/{review_id}")
+@run_in_executor("catalog")
+def update_review(review_id: str, update: ReviewUpdate, current_user: dict = Depends(get_current_user)):
+    changes = {k: v for k, v in update.model_dump().items() if v is not None}
+
+    before = reviews_collection.find_one_and_update(
+        {"_id": ObjectId(review_id), "user_id": str(current_user["_id"])},
+        {"$set": {**changes, "updated_at": datetime.now(UTC)}},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if not before:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    if "rating" in changes and changes["rating"] != before["rating"]:
+        apply_rating_change(before["product_id"], changes["rating"] - before["rating"], 0)
+
+    return {"message": "Review updated successfully"}
+
+
+# Delete a review (its author or an admin)
+@router.delete("/reviews/{review_id}")
+@run_in_executor("catalog")
+def delete_review(review_id: str, current_user: dict = Depends(get_current_user)):
+    query = {"_id": ObjectId(review_id)}
+
+    if current_user["role"] != "admin":
+        query["user_id"] = str(current_user["_id"])
+
+    review = reviews_collection.find_one_and_delete(query)
+
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    apply_rating_change(review["product_id"], -review["rating"], -1)
+
+    return {"message": "Review deleted successfully"}
@@ -2,16 +2,21 @@ from fastapi import APIRouter, HTTPException, Request, Depends
 from models.user_models import User, UserLogin, UserOut
 
 from configs.database import user_collection
+from configs.cache import principal_cache
 
 from bson import ObjectId
+from datetime import datetime, UTC
 from utils.auth_utils import hash_password, verify_password, generate_token
 from utils.auth_dependencies import admin_required
+from utils.executors import run_in_executor
+from utils import invalidation
 
 
 
 router = APIRouter()
 
 @router.post("/auth/register")
+@run_in_executor("auth")
 def register_user(user: User):
     if user_collection.find_one({"email": user.email}):
         raise HTTPException(status_code=400, detail="Email already Exists")
@@ -19,8 +24,10 @@ def register_user(user: User):
     user_dict = user.model_dump()
     user_dict["password"] = hash_password(user.password)
     user_dict["role"] = "user"
+    user_dict["updated_at"] = datetime.now(UTC)
     
     result = user_collection.insert_one(user_dict)
+    invalidation.publish("users", [str(result.inserted_id)], "insert")
     user_out = {
         "id" : str(result.inserted_id),
         "name" : user.name,
@@ -32,6 +39,7 @@ def register_user(user: User):
 
 
 @router.post("/auth/login")
+@run_in_executor("auth")
 def login_user(user: UserLogin):
     db_user = user_collection.find_one({"email": user.email})
     
@@ -47,6 +55,7 @@ def login_user(user: UserLogin):
 
 # === NEW: register-admin (bootstrap-safe) ===
 @router.post("/auth/register-admin", response_model=UserOut)
+@run_in_executor("auth")
 def register_admin(user: User, request: Request):
     """
     Create an admin user.
@@ -77,17 +86,21 @@ def register_admin(user: User, request: Request):
     user_dict = user.dict()
     user_dict["password"] = hash_password(user.password)
     user_dict["role"] = "admin"
+    user_dict["updated_at"] = datetime.now(UTC)
     result = user_collection.insert_one(user_dict)
+    invalidation.publish("users", [str(result.inserted_id)], "insert")
     return {"id": str(result.inserted_id), "name": user.name, "email": user.email, "role": "admin"}
 
 
 # === NEW: promote an existing user to admin (admin only) ===
 @router.put("/auth/promote/{user_id}")
+@run_in_executor("admin")
 def promote_user(user_id: str, current_user: dict = Depends(admin_required)):
     """
     Promote an existing user to role='admin'. Only callable by admins.
     """
-    res = user_collection.update_one({"_id": ObjectId(user_id)}, {"$set": {"role": "admin"}})
+    res = user_collection.update_one({"_id": ObjectId(user_id)}, {"$set": {"role": "admin", "updated_at": datetime.now(UTC)}})
+    principal_cache.delete(user_id)
     if res.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     user = user_collection.find_one({"_id": ObjectId(user_id)})
@@ -0,0 +1,219 @@
+"""
+Endpoint micro-benchmarks driven in-process through the ASGI app.
+
+Seeds a deterministic dataset into the in-memory backend (default) or a local
+mongod, exercises the hot read endpoints and reports ops/sec, p50/p95/p99 and
+DB round trips per request. Results are written as JSON so runs can be
+compared, and --baseline turns the comparison into a pass/fail gate.
+
+Usage:
+    python -m tests.benchmarks.bench_endpoints --preset small
+    python -m tests.benchmarks.bench_endpoints --backend mongo --preset large --output bench.json
+    python -m tests.benchmarks.bench_endpoints --baseline bench.json --max-regression 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, UTC
+
+from tests.benchmarks.seed_data import CATEGORIES, PRESETS, WORDS, DataGenerator, seed_collections
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def configure_environment(args) -> None:
+    """Point configs.database at the selected backend before the app is imported."""
+    os.environ["DB_BACKEND"] = args.backend
+    # One client hammering one route: per-IP limits would turn the run into a 429 benchmark
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    if args.backend == "mongo":
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ["DB_NAME"] = args.db_name
+
+
+def seed(args):
+    """Insert products, users, carts and orders; returns ids needed by the scenarios."""
+    from configs.database import product_collection, user_collection, cart_collection, order_collection
+
+    collections = {
+        "products": product_collection,
+        "users": user_collection,
+        "carts": cart_collection,
+        "orders": order_collection,
+    }
+    for collection in collections.values():
+        collection.delete_many({})
+
+    generator = DataGenerator(args.products, args.users, args.orders, seed=args.seed, max_cart_items=args.cart_items)
+    seed_collections(generator, collections, batch_size=args.batch_size, workers=4 if args.backend == "mongo" else 1,
+                     log=lambda line: None)
+    # User 0 is the seeded admin; carts exist for the first generator.carts users
+    return {
+        "admin_id": generator.user_id(0),
+        "user_ids": [generator.user_id(n) for n in range(1, max(2, generator.carts))],
+    }
+
+
+def build_scenarios(ids, args, rng: random.Random):
+    """Each scenario yields (method, path, json_body, headers) per iteration."""
+    from utils.auth_utils import generate_token
+
+    admin_token = generate_token({"user_id": ids["admin_id"], "email": "admin@bench.local"}, expires_minutes=600)
+    user_tokens = {}
+
+    def user_headers(user_id):
+        if user_id not in user_tokens:
+            user_tokens[user_id] = generate_token({"user_id": user_id, "email": "bench"}, expires_minutes=600)
+        return {"Authorization": f"Bearer {user_tokens[user_id]}"}
+
+    max_page = max(1, args.products // 10)
+
+    return {
+        "product_list": lambda: ("GET", f"/api/v1/product-list?page={rng.randint(1, max_page)}&limit=10", None, None),
+        "filter_products": lambda: ("POST", "/api/v1/filter-products", {
+            "category": rng.choice(CATEGORIES),
+            "min_price": 50.0,
+            "max_price": 150.0,
+            "min_rating": 4.0,
+        }, None),
+        "search_product": lambda: ("POST", "/api/v1/search-product", {"query": rng.choice(WORDS)}, None),
+        "get_cart": lambda: (lambda uid: ("GET", f"/api/v1/cart/{uid}", None, user_headers(uid)))(rng.choice(ids["user_ids"])),
+        "get_orders": lambda: ("GET", "/api/v1/orders", None, {"Authorization": f"Bearer {admin_token}"}),
+    }
+
+
+def run_scenario(client, make_request, iterations: int, warmup: int):
+    for _ in range(warmup):
+        method, path, body, headers = make_request()
+        client.request(method, path, json=body, headers=headers)
+
+    latencies, db_calls, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        method, path, body, headers = make_request()
+        t0 = time.perf_counter()
+        response = client.request(method, path, json=body, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code >= 400:
+            errors += 1
+        db_calls.append(int(response.headers.get("x-db-calls", 0)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "ops_per_sec": round(iterations / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "db_calls_per_request": round(statistics.fmean(db_calls), 2),
+        "db_calls_max": max(db_calls),
+    }
+
+
+def compare(results, baseline, max_regression: float):
+    """Return a list of human readable regressions against a previous run."""
+    failures = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        if previous["ops_per_sec"] and current["ops_per_sec"] < previous["ops_per_sec"] * (1 - max_regression):
+            failures.append(f"{name}: ops/sec {previous['ops_per_sec']} -> {current['ops_per_sec']}")
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["db_calls_per_request"] > previous["db_calls_per_request"]:
+            failures.append(f"{name}: db calls/request {previous['db_calls_per_request']} -> {current['db_calls_per_request']}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="ecommerce_bench", help="Database to seed; its collections are emptied first")
+    parser.add_argument("--preset", choices=PRESETS, default="tiny")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--cart-items", type=int, default=20, help="Maximum items per seeded cart")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--heavy-iterations", type=int, default=5, help="Iterations for full-collection endpoints (/orders)")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    args = parser.parse_args(argv)
+    for key, value in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    if args.backend == "mongo" and "bench" not in args.db_name:
+        parser.error("--db-name must contain 'bench' since its collections are emptied")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    rng = random.Random(args.seed)
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    t0 = time.perf_counter()
+    ids = seed(args)
+    seed_seconds = time.perf_counter() - t0
+    print(f"Seeded {args.products} products, {args.users} users, {args.orders} orders in {seed_seconds:.1f}s")
+
+    scenarios = build_scenarios(ids, args, rng)
+    results = {
+        "meta": {
+            "timestamp": datetime.now(UTC).isoformat(),
+            "backend": args.backend,
+            "dataset": {"products": args.products, "users": args.users, "orders": args.orders},
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        "results": {},
+    }
+    with TestClient(app_module.app) as client:
+        for name, make_request in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            iterations = args.heavy_iterations if name == "get_orders" else args.iterations
+            warmup = min(args.warmup, iterations)
+            results["results"][name] = stats = run_scenario(client, make_request, iterations, warmup)
+            print(f"{name:16} {stats['ops_per_sec']:>10} ops/s  p50 {stats['p50_ms']:>9}ms  p95 {stats['p95_ms']:>9}ms  "
+                  f"p99 {stats['p99_ms']:>9}ms  db/req {stats['db_calls_per_request']}")
+
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            failures = compare(results, json.load(fh), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
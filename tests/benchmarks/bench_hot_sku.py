@@ -0,0 +1,122 @@
+"""
+Checkout throughput on a single hot SKU as its stock is split across N shards.
+
+Each round resets one product with enough stock for the whole round, enables
+N stock shards (N=1 means the plain product document) and lets --threads
+workers reserve one unit at a time through utils.inventory until --seconds
+elapse. Against a real mongod, throughput should grow with N until the
+server runs out of cores; the in-memory backend serializes every write on
+one collection lock, so it only checks that the code path works.
+
+Usage:
+    python -m tests.benchmarks.bench_hot_sku --backend mongo --shards 1 2 4 8 16
+    python -m tests.benchmarks.bench_hot_sku --threads 32 --seconds 10 --output hot_sku.json
+"""
+import argparse
+import json
+import os
+import platform
+import threading
+import time
+from datetime import datetime, UTC
+
+from tests.benchmarks.bench_endpoints import configure_environment
+
+
+def run_round(inventory, product_collection, product_id: str, shards: int, threads: int, seconds: float, stock: int):
+    """Hammer one product from several threads; returns reservations/sec and failures."""
+    from bson import ObjectId
+
+    if inventory.is_hot(product_id):
+        inventory.disable(product_id)
+    product_collection.update_one({"_id": ObjectId(product_id)}, {"$set": {"stock": stock}})
+    if shards > 1:
+        inventory.enable(product_id, shards)
+
+    counts = [0] * threads
+    failures = [0] * threads
+    deadline = time.perf_counter() + seconds
+    start_barrier = threading.Barrier(threads)
+
+    def worker(index: int) -> None:
+        start_barrier.wait()
+        while time.perf_counter() < deadline:
+            if inventory.decrement(product_id):
+                counts[index] += 1
+            else:
+                failures[index] += 1
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    remaining = inventory.available(product_id) if inventory.is_hot(product_id) else \
+        product_collection.find_one({"_id": ObjectId(product_id)})["stock"]
+    reserved = sum(counts)
+    return {
+        "shards": shards,
+        "reservations": reserved,
+        "failures": sum(failures),
+        "ops_per_sec": round(reserved / elapsed, 1),
+        # Every reserved unit must have come out of stock exactly once
+        "consistent": reserved + remaining == stock,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="ecommerce_bench", help="Database to use; its products/stock_shards are emptied first")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--stock", type=int, default=10_000_000, help="Starting stock; large enough not to run out")
+    parser.add_argument("--output", default="bench_hot_sku.json")
+    args = parser.parse_args(argv)
+    if args.backend == "mongo" and "bench" not in args.db_name:
+        parser.error("--db-name must contain 'bench' since its collections are emptied")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from configs.database import product_collection, stock_shards_collection
+    from utils.inventory import inventory
+
+    product_collection.delete_many({})
+    stock_shards_collection.delete_many({})
+    product_id = str(product_collection.insert_one({
+        "name": "Hot SKU", "price": 1.0, "description": "bench", "stock": 0, "category": "bench", "rating": 0.0,
+    }).inserted_id)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(UTC).isoformat(),
+            "backend": args.backend,
+            "threads": args.threads,
+            "seconds": args.seconds,
+            "python": platform.python_version(),
+        },
+        "results": [],
+    }
+    for shards in args.shards:
+        stats = run_round(inventory, product_collection, product_id, shards, args.threads, args.seconds, args.stock)
+        results["results"].append(stats)
+        print(f"shards {shards:>3}  {stats['ops_per_sec']:>10} reservations/s  "
+              f"failures {stats['failures']:>6}  consistent {stats['consistent']}")
+
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"Results written to {args.output}")
+    return 0 if all(r["consistent"] for r in results["results"]) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+"""
+Runtime and memory of the co-purchase recommendations build.
+
+Streams --orders synthetic orders (the same Zipfian generator as seed_data)
+straight into utils.recommendations.CoPurchaseCounter, or, with --source
+mongo, the orders collection of a database seeded by seed_data. Each engine
+(numpy, python) runs in a fresh process so its peak RSS is its own; the
+reported memory is peak RSS minus the RSS after imports. The source is
+first iterated once on its own so its cost (synthetic generation or the
+Mongo scan) can be told apart from the counting.
+
+Usage:
+    python -m tests.benchmarks.bench_recommendations --orders 1000000
+    python -m tests.benchmarks.bench_recommendations --source mongo --db-name ecommerce_scale --engines numpy
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, UTC
+
+from tests.benchmarks.bench_endpoints import configure_environment
+from tests.benchmarks.seed_data import DataGenerator
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _baskets(args):
+    if args.source == "mongo":
+        from configs.database import order_collection
+        for order in order_collection.find({"status": {"$ne": "Cancelled"}}, {"products": 1, "_id": 0}).batch_size(10_000):
+            yield order.get("products") or []
+        return
+    generator = DataGenerator(args.products, 1_000, args.orders, seed=args.seed, password_hash="unused")
+    for batch, start in enumerate(range(0, args.orders, 10_000)):
+        for order in generator.order_batch(start, min(start + 10_000, args.orders), batch):
+            yield order["products"]
+
+
+def run_engine(args, engine: str, results) -> None:
+    """Child process: build once with one engine and report timings and memory."""
+    configure_environment(args)
+    from utils.recommendations import CoPurchaseCounter
+
+    started = time.perf_counter()
+    for _ in _baskets(args):
+        pass
+    source_seconds = time.perf_counter() - started
+
+    baseline = _max_rss_mb()
+    counter = CoPurchaseCounter(max_basket=args.max_basket, use_numpy=engine == "numpy")
+    started = time.perf_counter()
+    for basket in _baskets(args):
+        counter.add(basket)
+    counted = time.perf_counter()
+    related = counter.top_k(args.top_k, args.min_support)
+    finished = time.perf_counter()
+    results.put({
+        "engine": engine,
+        "orders": counter.orders,
+        "products": len(counter.products),
+        "products_with_related": len(related),
+        "source_seconds": round(source_seconds, 2),
+        "count_seconds": round(counted - started, 2),
+        "top_k_seconds": round(finished - counted, 2),
+        "total_seconds": round(finished - started, 2),
+        "orders_per_sec": round(counter.orders / (finished - started)),
+        "peak_rss_mb": round(_max_rss_mb() - baseline, 1),
+    })
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["generator", "mongo"], default="generator")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="ecommerce_scale", help="Database seeded by seed_data (read only)")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engines", nargs="+", choices=["numpy", "python"], default=["numpy", "python"])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--min-support", type=int, default=2)
+    parser.add_argument("--max-basket", type=int, default=50)
+    parser.add_argument("--output", default="bench_recommendations.json")
+    args = parser.parse_args(argv)
+    args.backend = "mongo" if args.source == "mongo" else "memory"
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    engines = list(args.engines)
+    if "numpy" in engines:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            print("numpy is not installed; skipping the numpy engine")
+            engines.remove("numpy")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(UTC).isoformat(),
+            "source": args.source,
+            "orders": args.orders if args.source == "generator" else None,
+            "products": args.products if args.source == "generator" else None,
+            "python": platform.python_version(),
+        },
+        "results": [],
+    }
+    context = multiprocessing.get_context("spawn")
+    for engine in engines:
+        queue = context.Queue()
+        process = context.Process(target=run_engine, args=(args, engine, queue))
+        process.start()
+        stats = queue.get()
+        process.join()
+        results["results"].append(stats)
+        print(f"{engine:6}  {stats['orders']:>10,} orders  source {stats['source_seconds']:>6}s  count {stats['count_seconds']:>7}s  "
+              f"top-k {stats['top_k_seconds']:>6}s  {stats['orders_per_sec']:>8,} orders/s  "
+              f"peak {stats['peak_rss_mb']:>7} MB  {stats['products_with_related']:,} products with related")
+
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
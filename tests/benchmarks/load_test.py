@@ -0,0 +1,314 @@
+"""
+Scenario-based load generator for browse / search / cart / checkout traffic.
+
+Replays weighted user journeys against a running uvicorn instance, e.g.
+
+    RATE_LIMIT_ENABLED=false uvicorn main:app --workers 4 --port 8000
+    python -m tests.benchmarks.load_test --base-url http://localhost:8000 --duration 60 --rate 200
+
+All traffic comes from one IP, so the server's per-IP rate limits (e.g. 5
+registrations a minute) must be off, as above; setup stops with a hint when
+it runs into them.
+
+Journeys only use the public routes in routes/*.py. A set of "hot" products
+with a known stock level is created up front so that checkouts race each other
+on the same documents; at the end the tool compares units sold against the
+initial stock and reports any oversell.
+
+--rate > 0 runs an open-loop Poisson arrival process (journeys started per
+second, capped by --concurrency in flight); --rate 0 runs --concurrency
+closed-loop workers back to back.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from tests.benchmarks.bench_endpoints import percentile
+
+API = "/api/v1"
+
+DEFAULT_MIX = {"browse": 50, "search": 20, "cart": 15, "checkout": 10, "register": 5}
+
+
+class Stats:
+    """Latency samples and outcomes per route step."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.journeys = defaultdict(int)
+        self.journey_errors = defaultdict(int)
+        self.hot_units_sold = defaultdict(int)
+
+    def record(self, step: str, status: int, seconds: float) -> None:
+        self.latencies[step].append(seconds)
+        self.statuses[step][status] += 1
+
+    def report(self, elapsed: float) -> dict:
+        steps = {}
+        total_requests = total_errors = 0
+        for step, samples in sorted(self.latencies.items()):
+            samples.sort()
+            errors = sum(n for status, n in self.statuses[step].items() if status >= 400 or status == 0)
+            total_requests += len(samples)
+            total_errors += errors
+            steps[step] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 2),
+                "error_rate": round(errors / len(samples), 4),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "statuses": dict(self.statuses[step]),
+            }
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total_requests,
+            "throughput_rps": round(total_requests / elapsed, 2),
+            "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+            "journeys": dict(self.journeys),
+            "journey_errors": dict(self.journey_errors),
+            "steps": steps,
+        }
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.stats = Stats()
+        self.client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout,
+                                        limits=httpx.Limits(max_connections=args.concurrency))
+        self.admin_headers = {}
+        self.users = []  # (user_id, headers)
+        self.product_ids = []
+        self.hot_products = {}  # product_id -> initial stock
+        self.mix = self._parse_mix(args.mix)
+
+    @staticmethod
+    def _parse_mix(raw):
+        if not raw:
+            return DEFAULT_MIX
+        mix = {}
+        for part in raw.split(","):
+            name, _, weight = part.partition("=")
+            mix[name.strip()] = float(weight)
+        unknown = set(mix) - set(DEFAULT_MIX)
+        if unknown:
+            raise SystemExit(f"Unknown journeys in --mix: {sorted(unknown)}")
+        return mix
+
+    async def call(self, step, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, API + path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.stats.record(step, status, time.perf_counter() - started)
+        return response
+
+    # ---- setup ----
+
+    async def setup(self):
+        args = self.args
+        credentials = {"email": args.admin_email, "password": args.admin_password}
+        response = await self.client.post(f"{API}/auth/login", json=credentials)
+        if response.status_code != 200:
+            await self.client.post(f"{API}/auth/register-admin", json={"name": "Load Admin", **credentials})
+            response = await self.client.post(f"{API}/auth/login", json=credentials)
+        if response.status_code != 200:
+            raise SystemExit("Could not obtain an admin token; pass --admin-email/--admin-password of an existing admin")
+        self.admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for n in range(args.hot_products):
+            response = await self.client.post(f"{API}/add-product", headers=self.admin_headers, json={
+                "name": f"Hot SKU {n} {int(time.time())}", "price": 9.99, "description": "Load test hot product",
+                "stock": args.hot_stock, "image_url": None, "category": "loadtest", "rating": 0.0,
+            })
+            response.raise_for_status()
+            self.hot_products[response.json()["id"]] = args.hot_stock
+
+        response = await self.client.get(f"{API}/product-list", params={"page": 1, "limit": 200})
+        self.product_ids = [p["id"] for p in response.json()] or list(self.hot_products)
+
+        semaphore = asyncio.Semaphore(min(args.concurrency, 32))
+
+        async def register(n):
+            async with semaphore:
+                user = await self._register(f"load{int(time.time())}-{n}@example.com")
+                if user:
+                    self.users.append(user)
+
+        await asyncio.gather(*(register(n) for n in range(args.users)))
+        if self.stats.statuses["auth_register"].get(429):
+            raise SystemExit("Registrations were rate limited (429); start the server with RATE_LIMIT_ENABLED=false")
+        if not self.users:
+            raise SystemExit("Could not register any load-test users")
+
+    async def _register(self, email):
+        body = {"name": "Load User", "email": email, "password": "load-test-password"}
+        response = await self.call("auth_register", "POST", "/auth/register", json=body)
+        if response is None or response.status_code != 200:
+            return None
+        user_id = response.json()["id"]
+        response = await self.call("auth_login", "POST", "/auth/login", json={"email": email, "password": body["password"]})
+        if response is None or response.status_code != 200:
+            return None
+        return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    # ---- journeys ----
+
+    async def journey_browse(self):
+        for _ in range(self.rng.randint(1, 3)):
+            await self.call("product_list", "GET", "/product-list", params={"page": self.rng.randint(1, 20), "limit": 10})
+        for _ in range(self.rng.randint(1, 3)):
+            await self.call("product_detail", "GET", f"/product/{self.rng.choice(self.product_ids)}")
+        return True
+
+    async def journey_search(self):
+        await self.call("search_product", "POST", "/search-product", json={"query": self.rng.choice(["phone", "hot", "lamp", "book", "a"])})
+        response = await self.call("filter_products", "POST", "/filter-products", json={
+            "category": None, "min_price": 5.0, "max_price": 200.0, "min_rating": None,
+        })
+        return response is not None and response.status_code < 400
+
+    async def journey_cart(self):
+        user_id, headers = self.rng.choice(self.users)
+        for product_id in self.rng.sample(self.product_ids, k=min(len(self.product_ids), self.rng.randint(1, 3))):
+            await self.call("cart_add", "POST", f"/cart/{user_id}/add", headers=headers,
+                            json={"product_id": product_id, "quantity": self.rng.randint(1, 2)})
+        response = await self.call("cart_view", "GET", f"/cart/{user_id}", headers=headers)
+        return response is not None and response.status_code < 400
+
+    async def journey_checkout(self):
+        user_id, headers = self.rng.choice(self.users)
+        products = [self.rng.choice(list(self.hot_products))] if self.hot_products else []
+        products += self.rng.sample(self.product_ids, k=min(len(self.product_ids), self.rng.randint(0, 2)))
+        for product_id in products:
+            await self.call("cart_add", "POST", f"/cart/{user_id}/add", headers=headers,
+                            json={"product_id": product_id, "quantity": 1})
+        await self.call("cart_view", "GET", f"/cart/{user_id}", headers=headers)
+        response = await self.call("place_order", "POST", "/orders", headers=headers, json={
+            "products": products, "total": 9.99 * len(products), "user_id": user_id, "shipping_address": "1 Load Test Way",
+        })
+        if response is None or response.status_code != 200:
+            return False
+        for product_id in products:
+            if product_id in self.hot_products:
+                self.stats.hot_units_sold[product_id] += 1
+        await self.call("order_detail", "GET", f"/orders/{response.json()['order_id']}", headers=headers)
+        return True
+
+    async def journey_register(self):
+        user = await self._register(f"load-{time.time_ns()}-{self.rng.randint(0, 1 << 30)}@example.com")
+        if user:
+            self.users.append(user)
+            await self.journey_browse()
+        return user is not None
+
+    async def run_journey(self):
+        names = list(self.mix)
+        name = self.rng.choices(names, weights=[self.mix[n] for n in names])[0]
+        self.stats.journeys[name] += 1
+        try:
+            ok = await getattr(self, f"journey_{name}")()
+        except Exception:
+            ok = False
+        if not ok:
+            self.stats.journey_errors[name] += 1
+
+    # ---- drivers ----
+
+    async def run(self):
+        args = self.args
+        deadline = time.perf_counter() + args.duration
+        if args.rate > 0:
+            semaphore = asyncio.Semaphore(args.concurrency)
+            tasks = set()
+
+            async def bounded():
+                async with semaphore:
+                    await self.run_journey()
+
+            while time.perf_counter() < deadline:
+                task = asyncio.create_task(bounded())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await asyncio.sleep(self.rng.expovariate(args.rate))
+            await asyncio.gather(*tasks)
+        else:
+            async def worker():
+                while time.perf_counter() < deadline:
+                    await self.run_journey()
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+    async def oversell(self):
+        report = {}
+        for product_id, initial in self.hot_products.items():
+            response = await self.client.get(f"{API}/product/{product_id}")
+            final_stock = response.json().get("stock") if response.status_code == 200 else None
+            sold = self.stats.hot_units_sold[product_id]
+            report[product_id] = {
+                "initial_stock": initial,
+                "units_sold": sold,
+                "final_stock": final_stock,
+                "oversold": max(0, sold - initial) + max(0, -(final_stock or 0)),
+            }
+        return report
+
+
+async def amain(args):
+    test = LoadTest(args)
+    try:
+        await test.setup()
+        print(f"Setup: {len(test.users)} users, {len(test.product_ids)} products, {len(test.hot_products)} hot products")
+        started = time.perf_counter()
+        await test.run()
+        elapsed = time.perf_counter() - started
+        report = test.stats.report(elapsed)
+        report["oversell"] = await test.oversell()
+        report["oversell_count"] = sum(p["oversold"] for p in report["oversell"].values())
+        report["config"] = {k: v for k, v in vars(args).items() if k != "admin_password"}
+    finally:
+        await test.client.aclose()
+
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s -> {report['throughput_rps']} req/s, "
+          f"error rate {report['error_rate']:.2%}, oversell {report['oversell_count']}")
+    print(f"{'step':16} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for step, s in report["steps"].items():
+        print(f"{step:16} {s['requests']:>7} {s['rps']:>8} {s['error_rate'] * 100:>5.1f}% "
+              f"{s['p50_ms']:>7}ms {s['p95_ms']:>7}ms {s['p99_ms']:>7}ms")
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if report["oversell_count"] else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load after setup")
+    parser.add_argument("--concurrency", type=int, default=50, help="Max journeys in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="Journey arrivals per second (0 = closed loop)")
+    parser.add_argument("--mix", help="Journey weights, e.g. browse=50,search=20,cart=15,checkout=10,register=5")
+    parser.add_argument("--users", type=int, default=50, help="Users registered during setup")
+    parser.add_argument("--hot-products", type=int, default=1)
+    parser.add_argument("--hot-stock", type=int, default=100)
+    parser.add_argument("--admin-email", default="loadtest-admin@example.com")
+    parser.add_argument("--admin-password", default="loadtest-admin-password")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(amain(parse_args())))
@@ -0,0 +1,325 @@
+"""
+Synthetic data generator for scale testing.
+
+Generates products, users, carts and orders shaped like the models in models/
+with realistic skew: Zipfian product popularity, heavy-tailed cart lengths and
+a small population of heavy buyers. Output is fully deterministic for a given
+--seed (ids included), and batches are generated and written with parallel
+insert_many calls from several processes so a local mongod is the bottleneck,
+not Python or bcrypt: the password hash is computed once and reused for every
+user.
+
+Usage:
+    python -m tests.benchmarks.seed_data --preset large --mongo-uri mongodb://localhost:27017 --db-name ecommerce_scale --drop
+"""
+import argparse
+import bisect
+import itertools
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+
+from bson import ObjectId
+
+PRESETS = {
+    "tiny": {"products": 1_000, "users": 100, "orders": 5_000},
+    "small": {"products": 10_000, "users": 1_000, "orders": 50_000},
+    "medium": {"products": 50_000, "users": 5_000, "orders": 250_000},
+    "large": {"products": 100_000, "users": 10_000, "orders": 1_000_000},
+    "xlarge": {"products": 1_000_000, "users": 100_000, "orders": 10_000_000},
+}
+
+CATEGORIES = ["electronics", "books", "home", "fashion", "sports", "toys", "beauty", "grocery"]
+WORDS = ["phone", "laptop", "case", "charger", "lamp", "chair", "novel", "shirt", "shoe", "ball", "mug", "cable"]
+STATUSES = ["Pending", "Confirmed", "Shipped", "Delivered", "Cancelled"]
+STATUS_WEIGHTS = [10, 10, 15, 60, 5]
+
+# Fixed epoch so generated ObjectIds (and created_at values) are reproducible
+BASE_TIME = datetime(2025, 1, 1, tzinfo=UTC)
+_KIND = {"product": 1, "user": 2, "cart": 3, "order": 4}
+
+
+def object_id(kind: str, n: int) -> ObjectId:
+    """Deterministic ObjectId: fixed timestamp, one byte of kind, seven bytes of sequence."""
+    return ObjectId(struct.pack(">IB", int(BASE_TIME.timestamp()), _KIND[kind]) + n.to_bytes(7, "big"))
+
+
+def zipf_cum_weights(n: int, exponent: float):
+    """Cumulative weights for rank-frequency sampling (rank 0 is most popular)."""
+    return list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+
+
+class ZipfSampler:
+    """O(log n) Zipfian sampler over [0, n) with a shuffled rank -> id mapping."""
+
+    def __init__(self, n: int, exponent: float, seed: int):
+        self.cum_weights = zipf_cum_weights(n, exponent)
+        self.total = self.cum_weights[-1]
+        self.permutation = list(range(n))
+        random.Random(seed).shuffle(self.permutation)
+
+    def sample(self, rng: random.Random) -> int:
+        rank = bisect.bisect_left(self.cum_weights, rng.random() * self.total)
+        return self.permutation[min(rank, len(self.permutation) - 1)]
+
+
+class DataGenerator:
+    """
+    Deterministic generator of documents matching models/*.py.
+
+    Every batch gets its own RNG derived from (seed, collection, batch index),
+    so batches can be generated concurrently and still be reproducible.
+    """
+
+    def __init__(self, products: int, users: int, orders: int, seed: int = 42, password_hash: str = None,
+                 product_skew: float = 1.1, buyer_skew: float = 1.2, max_cart_items: int = 50,
+                 max_order_items: int = 8, carts_ratio: float = 0.6):
+        self.products = products
+        self.users = users
+        self.orders = orders
+        self.seed = seed
+        self.max_cart_items = max_cart_items
+        self.max_order_items = max_order_items
+        self.carts = int(users * carts_ratio)
+        self.password_hash = password_hash or self._hash_once()
+        self.product_sampler = ZipfSampler(products, product_skew, seed + 1)
+        self.buyer_sampler = ZipfSampler(users, buyer_skew, seed + 2)
+        rng = random.Random(seed)
+        self.prices = [round(rng.lognormvariate(3.3, 0.9), 2) for _ in range(products)]
+        self._product_ids = [str(object_id("product", n)) for n in range(products)]
+
+    @staticmethod
+    def _hash_once() -> str:
+        from utils.auth_utils import hash_password
+        return hash_password("password123")
+
+    def _rng(self, kind: str, batch: int) -> random.Random:
+        return random.Random(f"{self.seed}:{kind}:{batch}")
+
+    def product_id(self, n: int) -> str:
+        return self._product_ids[n]
+
+    def user_id(self, n: int) -> str:
+        return str(object_id("user", n))
+
+    def _long_tail(self, rng: random.Random, upper: int) -> int:
+        # Pareto-ish length: most carts are short, a few are very long
+        return max(1, min(upper, int(rng.paretovariate(1.3))))
+
+    def product_batch(self, start: int, stop: int, batch: int):
+        rng = self._rng("product", batch)
+        return [
+            {
+                "_id": object_id("product", n),
+                "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {n}",
+                "price": self.prices[n],
+                "description": f"Synthetic {rng.choice(WORDS)} for scale testing",
+                "stock": rng.randint(0, 1_000),
+                "image_url": None,
+                "category": CATEGORIES[n % len(CATEGORIES)] if rng.random() < 0.7 else rng.choice(CATEGORIES),
+                "rating": round(min(5.0, max(0.0, rng.gauss(3.8, 0.8))), 1),
+            }
+            for n in range(start, stop)
+        ]
+
+    def user_batch(self, start: int, stop: int, batch: int):
+        return [
+            {
+                "_id": object_id("user", n),
+                "name": f"User {n}",
+                "email": f"user{n}@example.com",
+                "password": self.password_hash,
+                "role": "admin" if n == 0 else "user",
+            }
+            for n in range(start, stop)
+        ]
+
+    def cart_batch(self, start: int, stop: int, batch: int):
+        rng = self._rng("cart", batch)
+        carts = []
+        for n in range(start, stop):
+            items = {}
+            for _ in range(self._long_tail(rng, self.max_cart_items)):
+                pid = self.product_id(self.product_sampler.sample(rng))
+                items[pid] = items.get(pid, 0) + rng.randint(1, 3)
+            carts.append({
+                "_id": object_id("cart", n),
+                "user_id": self.user_id(n),
+                "items": [{"product_id": pid, "quantity": q} for pid, q in items.items()],
+            })
+        return carts
+
+    def order_batch(self, start: int, stop: int, batch: int):
+        rng = self._rng("order", batch)
+        span = 365 * 24 * 3600
+        orders = []
+        for n in range(start, stop):
+            indexes = [self.product_sampler.sample(rng) for _ in range(self._long_tail(rng, self.max_order_items))]
+            orders.append({
+                "_id": object_id("order", n),
+                "products": [self.product_id(i) for i in indexes],
+                "total": round(sum(self.prices[i] for i in indexes), 2),
+                "user_id": self.user_id(self.buyer_sampler.sample(rng)),
+                "shipping_address": f"{rng.randint(1, 9999)} Synthetic Street",
+                "status": rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0],
+                "created_at": BASE_TIME + timedelta(seconds=rng.randint(0, span)),
+            })
+        return orders
+
+    def plan(self):
+        """(collection name, count, batch builder) for every collection to seed."""
+        return [
+            ("products", self.products, self.product_batch),
+            ("users", self.users, self.user_batch),
+            ("carts", self.carts, self.cart_batch),
+            ("orders", self.orders, self.order_batch),
+        ]
+
+
+def validate_shapes(generator: DataGenerator) -> None:
+    """Check one generated document per collection against the pydantic models."""
+    from models.product_models import Product
+    from models.user_models import User
+    from models.cart_models import Cart
+    from models.order_models import Order
+
+    for model, builder in ((Product, generator.product_batch), (User, generator.user_batch),
+                           (Cart, generator.cart_batch), (Order, generator.order_batch)):
+        doc = builder(0, 1, 0)[0]
+        model(**{k: v for k, v in doc.items() if k != "_id"})
+
+
+def seed_collections(generator: DataGenerator, collections, batch_size: int = 10_000, workers: int = 8, log=print):
+    """
+    Generate and insert every collection with parallel insert_many batches.
+
+    Args:
+        generator: DataGenerator describing sizes and skew
+        collections: Mapping of collection name -> Collection-like object
+        batch_size: Documents per insert_many call
+        workers: Concurrent generator/insert workers
+
+    Returns:
+        Dict of collection name -> docs/sec
+    """
+    rates = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for name, count, builder in generator.plan():
+            collection = collections[name]
+            started = time.perf_counter()
+
+            def write(batch: int, collection=collection, builder=builder, count=count):
+                start = batch * batch_size
+                docs = builder(start, min(start + batch_size, count), batch)
+                collection.insert_many(docs, ordered=False)
+                return len(docs)
+
+            inserted = sum(pool.map(write, range((count + batch_size - 1) // batch_size)))
+            elapsed = time.perf_counter() - started
+            rates[name] = round(inserted / elapsed) if elapsed else inserted
+            log(f"{name:9} {inserted:>11,} docs in {elapsed:7.2f}s ({rates[name]:>10,} docs/s)")
+    return rates
+
+
+_worker_state = {}
+
+
+def _init_worker(options: dict, mongo_uri: str, db_name: str) -> None:
+    from pymongo import MongoClient
+    from pymongo.write_concern import WriteConcern
+
+    _worker_state["generator"] = DataGenerator(**options)
+    client = MongoClient(mongo_uri, maxPoolSize=2)
+    _worker_state["db"] = client.get_database(db_name, write_concern=WriteConcern(w=1, j=False))
+
+
+def _write_batch(task) -> int:
+    name, start, stop, batch = task
+    generator = _worker_state["generator"]
+    builder = dict((n, b) for n, _, b in generator.plan())[name]
+    docs = builder(start, stop, batch)
+    _worker_state["db"][name].insert_many(docs, ordered=False, bypass_document_validation=True)
+    return len(docs)
+
+
+def seed_mongo_parallel(options: dict, mongo_uri: str, db_name: str, batch_size: int = 10_000, processes: int = 8, log=print):
+    """
+    Seed a MongoDB database from several processes so document generation
+    isn't limited by the GIL. Each process rebuilds the same deterministic
+    generator from options and writes disjoint batch ranges.
+
+    Returns:
+        Dict of collection name -> docs/sec
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    planner = DataGenerator(**options)
+    rates = {}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(options, mongo_uri, db_name)) as pool:
+        for name, count, _ in planner.plan():
+            tasks = [(name, start, min(start + batch_size, count), n)
+                     for n, start in enumerate(range(0, count, batch_size))]
+            started = time.perf_counter()
+            inserted = sum(pool.map(_write_batch, tasks))
+            elapsed = time.perf_counter() - started
+            rates[name] = round(inserted / elapsed) if elapsed else inserted
+            log(f"{name:9} {inserted:>11,} docs in {elapsed:7.2f}s ({rates[name]:>10,} docs/s)")
+    return rates
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="ecommerce_scale")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--product-skew", type=float, default=1.1, help="Zipf exponent for product popularity")
+    parser.add_argument("--buyer-skew", type=float, default=1.2, help="Zipf exponent for orders per user")
+    parser.add_argument("--max-cart-items", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--processes", type=int, default=8, help="Generator/insert processes")
+    parser.add_argument("--drop", action="store_true", help="Drop the target collections first")
+    args = parser.parse_args(argv)
+    for key, value in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    return args
+
+
+def main(argv=None) -> int:
+    from pymongo import MongoClient
+
+    args = parse_args(argv)
+    options = {
+        "products": args.products,
+        "users": args.users,
+        "orders": args.orders,
+        "seed": args.seed,
+        "product_skew": args.product_skew,
+        "buyer_skew": args.buyer_skew,
+        "max_cart_items": args.max_cart_items,
+        # bcrypt once here; worker processes reuse the hash
+        "password_hash": DataGenerator._hash_once(),
+    }
+    validate_shapes(DataGenerator(**{**options, "products": min(args.products, 1_000), "users": min(args.users, 1_000)}))
+
+    if args.drop:
+        db = MongoClient(args.mongo_uri)[args.db_name]
+        for name in ("products", "users", "carts", "orders"):
+            db.drop_collection(name)
+
+    started = time.perf_counter()
+    seed_mongo_parallel(options, args.mongo_uri, args.db_name, batch_size=args.batch_size, processes=args.processes)
+    print(f"Seeded {args.db_name} in {time.perf_counter() - started:.1f}s (seed={args.seed})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import os
+
+# Point configs.database at the in-memory backend before the app is imported
+os.environ["DB_BACKEND"] = "memory"
+# One test client, one IP: per-IP limits would turn assertions into 429s
+os.environ["RATE_LIMIT_ENABLED"] = "false"
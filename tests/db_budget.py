@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+
+from utils.query_counter import track_queries
+
+
+def db_calls(response) -> int:
+    """DB round trips reported by QueryCountMiddleware for a response."""
+    value = response.headers.get("x-db-calls")
+    if value is None:
+        raise AssertionError("Response has no X-DB-Calls header; is QueryCountMiddleware installed?")
+    return int(value)
+
+
+def assert_db_budget(response, max_calls: int) -> None:
+    """
+    Fail when an endpoint issued more DB round trips than its budget.
+
+    Usage:
+        res = client.get(f"/api/v1/cart/{user_id}", headers=auth)
+        assert_db_budget(res, 3)
+    """
+    calls = db_calls(response)
+    assert calls <= max_calls, (
+        f"{response.request.method} {response.request.url.path} issued {calls} DB round trips "
+        f"(budget {max_calls}, {response.headers.get('x-db-time-ms')} ms)"
+    )
+
+
+@contextmanager
+def db_budget(max_calls: int):
+    """
+    Fail when the code in the block issues more DB round trips than max_calls.
+    Useful for services/repositories called directly rather than over HTTP.
+    """
+    with track_queries() as stats:
+        yield stats
+    assert stats.calls <= max_calls, f"Issued {stats.calls} DB round trips (budget {max_calls}): {stats.commands}"
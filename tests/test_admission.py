@@ -0,0 +1,106 @@
+"""
+Admission control: tiers are shed lowest priority first as in-flight
+requests approach the limit, and checkout queues for a slot instead.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from utils.admission import AdaptiveLimit, AdmissionMiddleware, admission_shed_total
+
+REQUESTS = {
+    "checkout": ("POST", "/api/v1/orders"),
+    "cart": ("POST", "/api/v1/cart/u1/add"),
+    "browse": ("GET", "/api/v1/products"),
+    "admin": ("GET", "/api/v1/admin/stats"),
+}
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def admission(app=ok_app, limit: int = 10, queue_timeout: float = 0.05) -> AdmissionMiddleware:
+    # A fixed limit: the adaptive one would move with every observed request
+    return AdmissionMiddleware(app, enabled=True, limit=AdaptiveLimit(limit, limit, limit),
+                               queue_timeout=queue_timeout)
+
+
+# in flight -> tiers still admitted with a limit of 10 (shares 1.0 / 0.9 / 0.7 / 0.5)
+LOAD = [
+    (4, {"checkout", "cart", "browse", "admin"}),
+    (5, {"checkout", "cart", "browse"}),
+    (7, {"checkout", "cart"}),
+    (9, {"checkout"}),
+    (10, set()),
+]
+
+
+@pytest.mark.parametrize("in_flight, admitted", LOAD)
+def test_tiers_are_shed_lowest_priority_first(in_flight, admitted):
+    middleware = admission()
+    client = TestClient(middleware)
+    for tier, (method, path) in REQUESTS.items():
+        middleware.in_flight = in_flight
+        res = client.request(method, path)
+        if tier in admitted:
+            assert res.status_code == 200, tier
+        else:
+            assert res.status_code == 503, tier
+            assert res.headers["retry-after"] == "1"
+        # Admitted requests give their slot back
+        assert middleware.in_flight == in_flight
+
+
+def test_shed_requests_are_counted_by_tier():
+    middleware = admission()
+    client = TestClient(middleware)
+    before = admission_shed_total.value(tier="admin")
+    middleware.in_flight = 6
+    assert client.get("/api/v1/admin/stats").status_code == 503
+    assert admission_shed_total.value(tier="admin") == before + 1
+
+
+def test_unlisted_paths_are_never_shed():
+    middleware = admission()
+    middleware.in_flight = 100
+    assert TestClient(middleware).get("/metrics").status_code == 200
+
+
+def test_queued_checkout_gets_the_next_free_slot():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        if scope["path"] == "/api/v1/cart/u1/add":
+            await release.wait()
+        await ok_app(scope, receive, send)
+
+    middleware = admission(slow_app, limit=1, queue_timeout=5)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            holder = asyncio.create_task(client.post("/api/v1/cart/u1/add"))
+            while middleware.in_flight == 0:
+                await asyncio.sleep(0)
+            checkout = asyncio.create_task(client.post("/api/v1/orders"))
+            while not middleware._waiters:
+                await asyncio.sleep(0)
+            # Full: other tiers are shed while checkout waits
+            assert (await client.get("/api/v1/products")).status_code == 503
+            release.set()
+            return (await holder).status_code, (await checkout).status_code
+
+    assert asyncio.run(scenario()) == (200, 200)
+    assert middleware.in_flight == 0
+
+
+def test_queued_checkout_times_out_with_503():
+    middleware = admission(queue_timeout=0.05)
+    middleware.in_flight = 10
+    res = TestClient(middleware).post("/api/v1/orders")
+    assert res.status_code == 503
+    assert not middleware._waiters
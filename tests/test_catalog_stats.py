@@ -0,0 +1,53 @@
+"""
+Category listing and dashboard figures with the background job off
+(CATALOG_STATS_ENABLED=false, the default): computed on each request.
+"""
+import uuid
+from datetime import datetime, UTC
+
+import pytest
+from fastapi.testclient import TestClient
+
+from utils.auth_utils import generate_token
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_categories_are_computed_without_the_job(client):
+    from configs.database import product_collection
+
+    category = f"cat-{uuid.uuid4().hex[:8]}"
+    product_collection.insert_many([
+        {"name": "A", "price": 5.0, "category": category, "updated_at": datetime.now(UTC)},
+        {"name": "B", "price": 12.5, "category": category, "updated_at": datetime.now(UTC)},
+    ])
+    res = client.get("/api/v1/catalog/categories")
+    assert res.status_code == 200
+    groups = {group["category"]: group for group in res.json()["categories"]}
+    assert groups[category] == {"category": category, "product_count": 2, "min_price": 5.0, "max_price": 12.5}
+
+    product_collection.insert_one({"name": "C", "price": 20.0, "category": category})
+    groups = {group["category"]: group for group in client.get("/api/v1/catalog/categories").json()["categories"]}
+    assert groups[category]["product_count"] == 3
+
+
+def test_admin_stats_are_computed_without_the_job(client):
+    from configs.database import order_collection, user_collection
+
+    admin_id = str(user_collection.insert_one({"name": "Admin", "email": f"{uuid.uuid4().hex}@test.local",
+                                               "role": "admin"}).inserted_id)
+    headers = {"Authorization": f"Bearer {generate_token({'user_id': admin_id, 'email': 'admin@test.local'})}"}
+    before = client.get("/api/v1/admin/stats", headers=headers).json()
+    assert before["users"] >= 1
+
+    order_collection.insert_one({"user_id": admin_id, "products": [], "total": 40.0, "status": "pending",
+                                 "created_at": datetime.now(UTC)})
+    after = client.get("/api/v1/admin/stats", headers=headers).json()
+    assert after["orders"] == before["orders"] + 1
+    assert after["revenue"] == pytest.approx(before["revenue"] + 40.0)
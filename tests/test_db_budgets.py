@@ -0,0 +1,82 @@
+"""
+DB round-trip budgets of the hot endpoints, checked on the in-memory backend
+(which counts calls like the pymongo listener does) so an N+1 fails here.
+
+Usage:
+    python -m pytest -q tests
+"""
+from datetime import datetime, UTC
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from tests.db_budget import assert_db_budget, db_calls
+
+CART_ITEMS = 20
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def data(client):
+    from configs.database import cart_collection, product_collection, user_collection
+    from utils.auth_utils import generate_token
+
+    products = [
+        {"_id": ObjectId(), "name": f"Product {n}", "price": 10.0 + n, "description": None, "stock": 1000,
+         "image_url": None, "category": "books", "rating": 4.0, "updated_at": datetime.now(UTC)}
+        for n in range(CART_ITEMS)
+    ]
+    product_collection.insert_many(products)
+    user_id = user_collection.insert_one({"name": "Budget", "email": "budget@test.local", "role": "user"}).inserted_id
+    items = [{"product_id": str(p["_id"]), "quantity": 2} for p in products]
+    cart_collection.insert_one({"user_id": str(user_id), "items": items, "updated_at": datetime.now(UTC)})
+    token = generate_token({"user_id": str(user_id), "email": "budget@test.local"})
+    return {
+        "user_id": str(user_id),
+        "product_ids": [str(p["_id"]) for p in products],
+        "total": sum(p["price"] * 2 for p in products),
+        "headers": {"Authorization": f"Bearer {token}"},
+    }
+
+
+def test_get_cart_budget(client, data):
+    res = client.get(f"/api/v1/cart/{data['user_id']}", headers=data["headers"])
+    assert res.status_code == 200
+    body = res.json()
+    assert len(body["items"]) == CART_ITEMS
+    assert body["total_price"] == pytest.approx(data["total"])
+    # The user lookup, the cart and one $in for all of its products; not one per item
+    assert_db_budget(res, 3)
+
+
+def test_product_detail_budget(client, data):
+    product_id = data["product_ids"][0]
+    res = client.get(f"/api/v1/product/{product_id}")
+    assert res.status_code == 200
+    assert_db_budget(res, 1)
+    # Served from the product cache afterwards
+    res = client.get(f"/api/v1/product/{product_id}")
+    assert res.status_code == 200
+    assert db_calls(res) == 0
+
+
+def test_checkout_budget(client, data):
+    order = {
+        "products": data["product_ids"][:3],
+        "total": 33.0,
+        "user_id": data["user_id"],
+        "shipping_address": "1 Test Street",
+    }
+    res = client.post("/api/v1/orders", json=order, headers=data["headers"])
+    assert res.status_code == 200, res.text
+    assert res.json()["success"]
+    # One conditional stock decrement per product; the rest is per order, not per item
+    assert_db_budget(res, len(order["products"]) + 5)
@@ -0,0 +1,116 @@
+"""
+Idempotency-Key handling on cart writes: replay without re-running the
+handler, body mismatch, and keys scoped by the token's user rather than the
+token itself.
+"""
+import uuid
+from datetime import datetime, UTC
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from utils.auth_utils import generate_token
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def bearer(user_id: str, expires_minutes: int = 60) -> dict:
+    token = generate_token({"user_id": user_id, "email": f"{user_id}@test.local"}, expires_minutes)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def shopper():
+    from configs.database import cart_collection, product_collection, user_collection
+
+    product_id = product_collection.insert_one(
+        {"name": "Mug", "price": 8.0, "description": None, "stock": 100, "image_url": None,
+         "category": "kitchen", "rating": 4.0, "updated_at": datetime.now(UTC)}
+    ).inserted_id
+    user_id = str(user_collection.insert_one({"name": "Idem", "email": f"{uuid.uuid4().hex}@test.local",
+                                              "role": "user"}).inserted_id)
+    yield user_id, str(product_id)
+    cart_collection.delete_many({"user_id": user_id})
+
+
+def cart_quantity(user_id: str) -> int:
+    from configs.database import cart_collection
+
+    cart = cart_collection.find_one({"user_id": user_id})
+    return sum(item["quantity"] for item in cart["items"]) if cart else 0
+
+
+def add(client, user_id: str, product_id: str, key: str, quantity: int = 1, headers: dict = None):
+    return client.post(
+        f"/api/v1/cart/{user_id}/add",
+        json={"product_id": product_id, "quantity": quantity},
+        headers={**(headers or bearer(user_id)), "Idempotency-Key": key},
+    )
+
+
+def test_retry_replays_the_first_response(client, shopper):
+    user_id, product_id = shopper
+    first = add(client, user_id, product_id, "k-replay")
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+
+    retry = add(client, user_id, product_id, "k-replay")
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert cart_quantity(user_id) == 1
+
+
+def test_refreshed_token_still_replays(client, shopper):
+    user_id, product_id = shopper
+    assert add(client, user_id, product_id, "k-refresh", headers=bearer(user_id, 60)).status_code == 200
+    retry = add(client, user_id, product_id, "k-refresh", headers=bearer(user_id, 120))
+    assert retry.headers.get("idempotent-replayed") == "true"
+    assert cart_quantity(user_id) == 1
+
+
+def test_same_key_with_a_different_body_is_rejected(client, shopper):
+    user_id, product_id = shopper
+    assert add(client, user_id, product_id, "k-mismatch", quantity=1).status_code == 200
+    mismatch = add(client, user_id, product_id, "k-mismatch", quantity=2)
+    assert mismatch.status_code == 422
+    assert "different request body" in mismatch.json()["detail"]
+    assert cart_quantity(user_id) == 1
+
+
+def test_keys_are_per_user(client, shopper):
+    from configs.database import cart_collection, user_collection
+
+    user_id, product_id = shopper
+    other_id = str(ObjectId())
+    user_collection.insert_one({"_id": ObjectId(other_id), "name": "Other", "email": f"{other_id}@test.local",
+                                "role": "user"})
+    assert add(client, user_id, product_id, "k-shared").status_code == 200
+    other = add(client, other_id, product_id, "k-shared")
+    assert other.status_code == 200
+    assert "idempotent-replayed" not in other.headers
+    assert cart_quantity(other_id) == 1
+    cart_collection.delete_many({"user_id": other_id})
+
+
+def test_client_errors_are_replayed(client, shopper):
+    user_id, _ = shopper
+    missing = str(ObjectId())
+    assert add(client, user_id, missing, "k-retry").status_code == 404
+    # Unlike 429 and 5xx, a 4xx answer is final
+    assert add(client, user_id, missing, "k-retry").headers.get("idempotent-replayed") == "true"
+
+
+def test_requests_without_a_token_pass_through(client, shopper):
+    user_id, product_id = shopper
+    response = client.post(f"/api/v1/cart/{user_id}/add", json={"product_id": product_id, "quantity": 1},
+                           headers={"Idempotency-Key": "k-anonymous"})
+    assert response.status_code in (401, 403)
+    assert "idempotent-replayed" not in response.headers
@@ -0,0 +1,56 @@
+"""
+Unique indexes on the in-memory backend, single-field and compound, as
+configured in configs/indexes.py.
+"""
+import pytest
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from configs.database import get_memory_collection
+from factories.memory_repository import InMemoryCollection
+
+
+@pytest.fixture
+def reviews():
+    collection = InMemoryCollection("unique_reviews", indexes=[])
+    collection.create_index([("product_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+    return collection
+
+
+def test_compound_unique_rejects_only_the_whole_key(reviews):
+    reviews.insert_one({"product_id": "p1", "user_id": "u1"})
+    reviews.insert_one({"product_id": "p1", "user_id": "u2"})
+    reviews.insert_one({"product_id": "p2", "user_id": "u1"})
+    with pytest.raises(DuplicateKeyError, match="product_id_1_user_id_1"):
+        reviews.insert_one({"product_id": "p1", "user_id": "u1", "rating": 5})
+    assert len(reviews) == 3
+
+
+def test_compound_unique_applies_to_updates_and_upserts(reviews):
+    reviews.insert_one({"product_id": "p1", "user_id": "u1"})
+    other = reviews.insert_one({"product_id": "p1", "user_id": "u2"}).inserted_id
+    with pytest.raises(DuplicateKeyError):
+        reviews.update_one({"_id": other}, {"$set": {"user_id": "u1"}})
+    # Rewriting a document onto its own key is not a conflict
+    reviews.update_one({"_id": other}, {"$set": {"user_id": "u2", "rating": 4}})
+    with pytest.raises(DuplicateKeyError):
+        reviews.update_one({"product_id": "p1", "user_id": "u1", "rating": 3}, {"$set": {"title": "x"}}, upsert=True)
+
+
+def test_bulk_insert_reports_compound_duplicates(reviews):
+    with pytest.raises(BulkWriteError) as exc:
+        reviews.insert_many([{"product_id": "p1", "user_id": "u1"}, {"product_id": "p1", "user_id": "u1"}])
+    assert exc.value.details["nInserted"] == 1
+
+
+def test_creating_a_unique_index_over_duplicates_fails():
+    collection = InMemoryCollection("unique_existing", indexes=[])
+    collection.insert_many([{"a": 1, "b": 1}, {"a": 1, "b": 1}])
+    with pytest.raises(DuplicateKeyError):
+        collection.create_index([("a", ASCENDING), ("b", ASCENDING)], unique=True)
+    assert not any(info.get("unique") for info in collection.index_information().values())
+
+
+def test_configured_indexes_apply_to_memory_collections():
+    info = get_memory_collection("reviews").index_information()
+    assert info["product_id_1_user_id_1"] == {"key": [("product_id", 1), ("user_id", 1)], "unique": True}
@@ -0,0 +1,111 @@
+"""
+Order archival on the in-memory backend: orders are written to the archive
+before they leave the hot collection, and order reads fall through to it.
+"""
+import uuid
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from configs.database import get_memory_collection
+from factories.archive_factory import ArchiveFactory
+from utils import order_archive as order_archive_module
+from utils.auth_utils import generate_token
+from utils.order_archive import OrderArchiver, order_archive_moved_total
+
+OLD = datetime.now(UTC) - timedelta(days=400)
+
+
+def order(status: str = "Delivered", created_at: datetime = OLD, user_id: str = "u1", total: float = 10.0) -> dict:
+    return {"_id": ObjectId(), "user_id": user_id, "products": [], "total": total, "status": status,
+            "created_at": created_at}
+
+
+@pytest.fixture
+def orders():
+    collection = get_memory_collection("archive_test_orders")
+    collection.delete_many({})
+    return collection
+
+
+@pytest.fixture(params=["collection", "segments"])
+def archive(request, tmp_path):
+    if request.param == "segments":
+        return ArchiveFactory().create("segments", directory=str(tmp_path / "segments"))
+    collection = get_memory_collection("archive_test_archive")
+    collection.delete_many({})
+    return ArchiveFactory().create("collection", collection=collection)
+
+
+def test_moves_only_old_terminal_orders(orders, archive):
+    old = [order("Delivered"), order("Cancelled")]
+    kept = [order("Pending"), order("Delivered", created_at=datetime.now(UTC))]
+    orders.insert_many(old + kept)
+    before = order_archive_moved_total.value()
+
+    assert OrderArchiver(archive, orders, batch_size=10, rate=0).run_once() == 2
+
+    assert sorted(doc["_id"] for doc in orders.find({})) == sorted(doc["_id"] for doc in kept)
+    assert {str(doc["_id"]) for doc in archive.scan()} == {str(doc["_id"]) for doc in old}
+    assert archive.totals()["orders"] == 2
+    assert order_archive_moved_total.value() == before + 2
+
+
+def test_crash_between_write_and_delete_is_re_archived_once(orders, archive):
+    batch = [order() for _ in range(3)]
+    orders.insert_many(batch)
+    # A previous run wrote the batch and died before deleting it
+    archive.write([dict(doc) for doc in batch])
+
+    assert OrderArchiver(archive, orders, batch_size=2, rate=0).run_once() == 3
+    assert orders.count_documents({}) == 0
+    assert sorted(str(doc["_id"]) for doc in archive.scan()) == sorted(str(doc["_id"]) for doc in batch)
+    assert archive.totals()["orders"] == 3
+
+
+def test_order_changed_mid_batch_stays_hot_and_is_not_counted(orders, archive):
+    reopened, moved = order(), order()
+    orders.insert_many([reopened, moved])
+
+    class ReopeningArchive:
+        def write(self, batch):
+            # An admin changes the status after the batch was read, before the delete
+            orders.update_one({"_id": reopened["_id"]}, {"$set": {"status": "Shipped"}})
+            return archive.write(batch)
+
+    before = order_archive_moved_total.value()
+
+    assert OrderArchiver(ReopeningArchive(), orders, batch_size=10, rate=0).run_once() == 1
+    assert [doc["_id"] for doc in orders.find({})] == [reopened["_id"]]
+    assert order_archive_moved_total.value() == before + 1
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_order_reads_fall_through_to_the_archive(client, monkeypatch, archive):
+    from configs.database import order_collection, user_collection
+
+    user_id = str(user_collection.insert_one({"name": "Old", "email": f"{uuid.uuid4().hex}@test.local",
+                                              "role": "user"}).inserted_id)
+    headers = {"Authorization": f"Bearer {generate_token({'user_id': user_id, 'email': 'old@test.local'})}"}
+    archived, hot = order(user_id=user_id, total=25.0), order("Pending", datetime.now(UTC), user_id=user_id)
+    archive.write([archived])
+    order_collection.insert_one(hot)
+    monkeypatch.setattr(order_archive_module, "order_archive", archive)
+
+    res = client.get(f"/api/v1/orders/{archived['_id']}", headers=headers)
+    assert res.status_code == 200
+    assert res.json()["total"] == 25.0
+
+    listed = client.get(f"/api/v1/orders/user/{user_id}", headers=headers).json()
+    assert sorted(o["id"] for o in listed) == sorted([str(archived["_id"]), str(hot["_id"])])
+
+    assert client.get(f"/api/v1/orders/{ObjectId()}", headers=headers).status_code == 404
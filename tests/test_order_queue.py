@@ -0,0 +1,101 @@
+"""
+Write-behind order queue on the in-memory backend: crash-recovery replay,
+slot adoption and the cart clear after a flush.
+"""
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from bson import ObjectId
+
+from configs.database import get_memory_collection
+from utils.order_queue import OrderQueue
+
+
+@pytest.fixture
+def collections():
+    orders, carts = get_memory_collection("queue_orders"), get_memory_collection("queue_carts")
+    orders.delete_many({})
+    carts.delete_many({})
+    return orders, carts
+
+
+def crash(queue: OrderQueue) -> None:
+    """Drop a queue without flushing, as a killed worker would."""
+    queue._file.close()
+    queue._slot_lock.close()
+    queue._slot_lock = None
+
+
+def order(user_id: str, **fields):
+    return {"user_id": user_id, "products": [], "total": 1.0, "created_at": datetime.now(UTC), **fields}
+
+
+def test_replay_after_crash_writes_every_order_once(tmp_path, collections):
+    orders, carts = collections
+    path = str(tmp_path / "order_queue.log")
+    queue = OrderQueue(orders, carts, path=path)
+    queue._open()
+    queue.recover()
+    ids = [queue.enqueue(order("u1")) for _ in range(3)]
+    # The first order reached the database before the crash, but its ack never made the log
+    orders.insert_one(dict(queue.get(ids[0]), _id=ObjectId(ids[0])))
+    crash(queue)
+
+    restarted = OrderQueue(orders, carts, path=path)
+    restarted._open()
+    assert restarted.path == queue.path
+    assert restarted.recover() == 3
+    assert restarted.flush() == 3
+    assert orders.count_documents({}) == 3
+    assert len(restarted) == 0
+    restarted.stop()
+
+
+def test_orphaned_slot_is_adopted(tmp_path, collections):
+    orders, carts = collections
+    path = str(tmp_path / "order_queue.log")
+    live = OrderQueue(orders, carts, path=path)
+    live._open()
+    live.recover()
+    dead = OrderQueue(orders, carts, path=path)
+    dead._open()
+    dead.enqueue(order("u2"))
+    crash(dead)
+
+    assert live.adopt_orphans() == 1
+    assert live.flush() == 1
+    assert orders.count_documents({"user_id": "u2"}) == 1
+    live.stop()
+
+
+def test_torn_final_record_is_skipped(tmp_path, collections):
+    orders, carts = collections
+    path = str(tmp_path / "order_queue.log")
+    queue = OrderQueue(orders, carts, path=path)
+    queue._open()
+    queue.enqueue(order("u3"))
+    queue._file.write('{"_id": {"$oid": "')
+    crash(queue)
+
+    restarted = OrderQueue(orders, carts, path=path)
+    restarted._open()
+    assert restarted.recover() == 1
+    restarted.stop()
+
+
+def test_flush_keeps_items_added_after_the_order(tmp_path, collections):
+    orders, carts = collections
+    queue = OrderQueue(orders, carts, path=str(tmp_path / "order_queue.log"))
+    queue._open()
+    placed = datetime.now(UTC)
+    carts.insert_one({"user_id": "stale", "items": [{"product_id": "p", "quantity": 1}],
+                      "updated_at": placed - timedelta(minutes=1)})
+    carts.insert_one({"user_id": "fresh", "items": [{"product_id": "p", "quantity": 1}],
+                      "updated_at": placed + timedelta(minutes=1)})
+    queue.enqueue(order("stale", created_at=placed))
+    queue.enqueue(order("fresh", created_at=placed))
+    queue.flush()
+
+    assert carts.find_one({"user_id": "stale"})["items"] == []
+    assert carts.find_one({"user_id": "fresh"})["items"] == [{"product_id": "p", "quantity": 1}]
+    queue.stop()
@@ -0,0 +1,145 @@
+"""
+Order status state machine: allowed and rejected transitions on the single
+and bulk admin endpoints, including 409s and conflicts with concurrent writers.
+"""
+import uuid
+from datetime import datetime, UTC
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from models.order_models import ORDER_TRANSITIONS
+from utils.auth_utils import generate_token
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def admin():
+    from configs.database import user_collection
+
+    admin_id = str(user_collection.insert_one({"name": "Admin", "email": f"{uuid.uuid4().hex}@test.local",
+                                               "role": "admin"}).inserted_id)
+    return {"Authorization": f"Bearer {generate_token({'user_id': admin_id, 'email': 'admin@test.local'})}"}
+
+
+def new_order(status: str) -> str:
+    from configs.database import order_collection
+
+    return str(order_collection.insert_one({"user_id": "u1", "products": [], "total": 10.0, "status": status,
+                                            "created_at": datetime.now(UTC)}).inserted_id)
+
+
+def status_of(order_id: str) -> str:
+    from configs.database import order_collection
+
+    return order_collection.find_one({"_id": ObjectId(order_id)})["status"]
+
+
+def set_status(client, headers, order_id: str, status: str):
+    return client.put(f"/api/v1/admin/orders/{order_id}/status", params={"status": status}, headers=headers)
+
+
+ALLOWED = [(current, target) for current, targets in ORDER_TRANSITIONS.items() for target in sorted(targets)]
+REJECTED = [(current, target) for current in ORDER_TRANSITIONS for target in ORDER_TRANSITIONS
+            if target != current and target not in ORDER_TRANSITIONS[current]]
+
+
+@pytest.mark.parametrize("current, target", ALLOWED)
+def test_allowed_transitions(client, admin, current, target):
+    order_id = new_order(current)
+    res = set_status(client, admin, order_id, target)
+    assert res.status_code == 200
+    assert status_of(order_id) == target
+
+
+@pytest.mark.parametrize("current, target", REJECTED)
+def test_rejected_transitions_are_409(client, admin, current, target):
+    order_id = new_order(current)
+    res = set_status(client, admin, order_id, target)
+    assert res.status_code == 409
+    assert f"from {current} to {target}" in res.json()["detail"]
+    assert status_of(order_id) == current
+
+
+def test_repeating_the_current_status_is_a_no_op(client, admin):
+    order_id = new_order("Shipped")
+    assert set_status(client, admin, order_id, "Shipped").status_code == 200
+    assert status_of(order_id) == "Shipped"
+
+
+def test_unknown_status_and_order(client, admin):
+    assert set_status(client, admin, new_order("Pending"), "Lost").status_code == 400
+    assert set_status(client, admin, str(ObjectId()), "Confirmed").status_code == 404
+
+
+def test_bulk_reports_an_outcome_per_order(client, admin):
+    pending, shipped, delivered = new_order("Pending"), new_order("Shipped"), new_order("Delivered")
+    missing = str(ObjectId())
+    updates = [
+        {"order_id": pending, "status": "Confirmed"},
+        {"order_id": shipped, "status": "Shipped"},
+        {"order_id": delivered, "status": "Pending"},
+        {"order_id": missing, "status": "Cancelled"},
+        {"order_id": "not-an-id", "status": "Cancelled"},
+        {"order_id": new_order("Pending"), "status": "Lost"},
+    ]
+    res = client.post("/api/v1/admin/orders/status", json={"updates": updates}, headers=admin)
+    assert res.status_code == 200
+    outcomes = {item["order_id"]: item["outcome"] for item in res.json()["results"]}
+    assert outcomes[pending] == "updated"
+    assert outcomes[shipped] == "unchanged"
+    assert outcomes[delivered] == "invalid_transition"
+    assert outcomes[missing] == "not_found"
+    assert outcomes["not-an-id"] == "invalid_id"
+    assert outcomes[updates[-1]["order_id"]] == "invalid_status"
+    assert res.json()["counts"]["updated"] == 1
+    assert status_of(pending) == "Confirmed"
+    assert status_of(delivered) == "Delivered"
+
+
+def test_bulk_reports_conflicts_with_concurrent_writers(client, admin, monkeypatch):
+    from configs.database import order_collection
+
+    raced, applied = new_order("Pending"), new_order("Pending")
+    bulk_write = order_collection.bulk_write
+
+    def racing_bulk_write(requests, **kwargs):
+        # Another admin cancels one order between the status read and the guarded write
+        order_collection.update_one({"_id": ObjectId(raced)}, {"$set": {"status": "Cancelled"}})
+        return bulk_write(requests, **kwargs)
+
+    monkeypatch.setattr(order_collection, "bulk_write", racing_bulk_write)
+    updates = [{"order_id": raced, "status": "Confirmed"}, {"order_id": applied, "status": "Confirmed"}]
+    res = client.post("/api/v1/admin/orders/status", json={"updates": updates}, headers=admin)
+
+    outcomes = {item["order_id"]: item["outcome"] for item in res.json()["results"]}
+    assert outcomes == {raced: "conflict", applied: "updated"}
+    assert status_of(raced) == "Cancelled"
+    assert status_of(applied) == "Confirmed"
+
+
+def test_bulk_rejects_duplicate_orders(client, admin):
+    order_id = new_order("Pending")
+    updates = [{"order_id": order_id, "status": "Confirmed"}, {"order_id": order_id, "status": "Cancelled"}]
+    res = client.post("/api/v1/admin/orders/status", json={"updates": updates}, headers=admin)
+    assert res.status_code == 400
+    assert status_of(order_id) == "Pending"
+
+
+def test_status_changes_need_an_admin(client):
+    from configs.database import user_collection
+
+    user_id = str(user_collection.insert_one({"name": "U", "email": f"{uuid.uuid4().hex}@test.local",
+                                              "role": "user"}).inserted_id)
+    headers = {"Authorization": f"Bearer {generate_token({'user_id': user_id, 'email': 'u@test.local'})}"}
+    order_id = new_order("Pending")
+    assert set_status(client, headers, order_id, "Confirmed").status_code == 403
+    assert status_of(order_id) == "Pending"
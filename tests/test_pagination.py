@@ -0,0 +1,58 @@
+"""
+Keyset pagination over the in-memory backend: walking every page returns each
+document exactly once, in (field, _id) order, across ties and null or
+missing sort values.
+"""
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from configs.database import get_memory_collection
+from utils.pagination import keyset_page
+
+
+@pytest.fixture
+def products():
+    collection = get_memory_collection("pagination_products")
+    collection.delete_many({})
+    ratings = [4.5, None, 3.0, 4.5, None, 5.0, 3.0, 4.5, "missing", None, 1.0, "missing"]
+    for rating in ratings:
+        doc = {"_id": ObjectId(), "name": "p"}
+        if rating != "missing":
+            doc["rating"] = rating
+        collection.insert_one(doc)
+    return collection
+
+
+def walk(collection, field: str, direction: int, limit: int, query: dict = None):
+    seen, cursor = [], None
+    while True:
+        docs, cursor = keyset_page(collection, query or {}, field, direction, cursor, limit)
+        seen.extend(docs)
+        if cursor is None:
+            return seen
+
+
+def expected(collection, field: str, direction: int):
+    # MongoDB orders null and missing values before any number
+    docs = list(collection.find({}))
+    key = lambda doc: (doc.get(field) is not None, doc.get(field) or 0, doc["_id"])
+    return sorted(docs, key=key, reverse=direction == DESCENDING)
+
+
+@pytest.mark.parametrize("direction", [ASCENDING, DESCENDING])
+@pytest.mark.parametrize("limit", [1, 2, 3, 5])
+def test_walk_covers_ties_and_nulls_once(products, direction, limit):
+    pages = walk(products, "rating", direction, limit)
+    assert [doc["_id"] for doc in pages] == [doc["_id"] for doc in expected(products, "rating", direction)]
+
+
+def test_filtered_walk_keeps_the_filter(products):
+    pages = walk(products, "rating", ASCENDING, 2, {"rating": {"$gte": 3.0}})
+    assert [doc["rating"] for doc in pages] == [3.0, 3.0, 4.5, 4.5, 4.5, 5.0]
+
+
+def test_single_page_has_no_cursor(products):
+    docs, cursor = keyset_page(products, {}, "_id", ASCENDING, None, 50)
+    assert len(docs) == 12
+    assert cursor is None
@@ -0,0 +1,91 @@
+"""
+Token-bucket rate limiting: 429 with Retry-After once a bucket is empty, and
+blocking (shared) stores kept off the event loop.
+"""
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.auth_utils import generate_token
+from utils.rate_limit import MemoryTokenBucketStore, RateLimitMiddleware, RateLimitRule
+
+
+def limited_app(limits, store=None) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/limited")
+    def limited():
+        return {"ok": True}
+
+    @app.post("/open")
+    def open_route():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, limits=limits, store=store if store is not None else MemoryTokenBucketStore())
+    return TestClient(app)
+
+
+def bearer(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {generate_token({'user_id': user_id, 'email': f'{user_id}@example.com'})}"}
+
+
+def test_burst_then_429_with_retry_after():
+    # One token every 10s: the wait after the burst rounds up to a whole second
+    client = limited_app({"POST /limited": [RateLimitRule("ip", 0.1, 2)]})
+    assert [client.post("/limited").status_code for _ in range(2)] == [200, 200]
+
+    response = client.post("/limited")
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Too Many Requests"}
+    assert 1 <= int(response.headers["retry-after"]) <= 10
+
+
+def test_unlisted_routes_are_not_limited():
+    client = limited_app({"POST /limited": [RateLimitRule("ip", 0.1, 1)]})
+    assert client.post("/limited").status_code == 200
+    assert all(client.post("/open").status_code == 200 for _ in range(5))
+
+
+def test_user_buckets_are_per_user():
+    client = limited_app({"POST /limited": [RateLimitRule("user", 0.1, 1)]})
+    assert client.post("/limited", headers=bearer("u1")).status_code == 200
+    assert client.post("/limited", headers=bearer("u1")).status_code == 429
+    assert client.post("/limited", headers=bearer("u2")).status_code == 200
+    # Anonymous callers have no user bucket to spend
+    assert client.post("/limited").status_code == 200
+
+
+def test_rejection_by_one_rule_keeps_the_other_rules_tokens():
+    store = MemoryTokenBucketStore()
+    client = limited_app({"POST /limited": [RateLimitRule("ip", 0.1, 3), RateLimitRule("user", 0.1, 1)]}, store)
+    assert client.post("/limited", headers=bearer("u1")).status_code == 200
+    assert client.post("/limited", headers=bearer("u1")).status_code == 429
+    # The ip bucket paid once, not twice: two more requests from another user fit
+    assert client.post("/limited", headers=bearer("u2")).status_code == 200
+    assert client.post("/limited", headers=bearer("u3")).status_code == 200
+    assert client.post("/limited", headers=bearer("u4")).status_code == 429
+
+
+class ThreadRecordingStore(MemoryTokenBucketStore):
+    blocking = True
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def acquire(self, buckets, cost: float = 1.0):
+        self.threads.append(threading.current_thread())
+        return super().acquire(buckets, cost)
+
+
+@pytest.mark.parametrize("blocking", [True, False])
+def test_blocking_stores_run_in_a_worker_thread(blocking):
+    store = ThreadRecordingStore()
+    store.blocking = blocking
+    client = limited_app({"POST /limited": [RateLimitRule("ip", 0.1, 1)]}, store)
+    with client:
+        loop_thread = client.portal.call(threading.current_thread)
+        assert client.post("/limited").status_code == 200
+    assert (store.threads[0] is not loop_thread) is blocking
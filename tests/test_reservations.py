@@ -0,0 +1,105 @@
+"""
+Cart stock holds on the in-memory backend: hold, resize, consume at checkout
+and release by the expiry sweep, for plain and sharded (hot) products.
+"""
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from bson import ObjectId
+
+from configs.database import product_collection, reservations_collection, stock_shards_collection
+from utils.inventory import inventory
+from utils.reservations import Reservations, HELD
+
+
+@pytest.fixture
+def reservations():
+    reservations_collection.delete_many({})
+    return Reservations(ttl=900)
+
+
+def make_product(stock: int) -> str:
+    return str(product_collection.insert_one({"name": "Held", "price": 1.0, "stock": stock}).inserted_id)
+
+
+def stock_of(product_id: str) -> int:
+    if inventory.is_hot(product_id):
+        return sum(doc["stock"] for doc in stock_shards_collection.find({"product_id": product_id}))
+    return product_collection.find_one({"_id": ObjectId(product_id)})["stock"]
+
+
+def held(user_id: str, product_id: str) -> int:
+    hold = reservations_collection.find_one({"user_id": user_id, "product_id": product_id, "status": HELD})
+    return hold["quantity"] if hold else 0
+
+
+def test_hold_takes_stock_and_rejects_overdraw(reservations):
+    product_id = make_product(5)
+    assert reservations.hold("u1", product_id, 3)
+    assert stock_of(product_id) == 2
+    assert not reservations.hold("u2", product_id, 3)
+    assert stock_of(product_id) == 2
+    assert reservations.hold("u1", product_id, 2)
+    assert held("u1", product_id) == 5 and stock_of(product_id) == 0
+
+
+def test_hold_rejects_non_positive_quantity(reservations):
+    with pytest.raises(ValueError):
+        reservations.hold("u1", make_product(5), 0)
+
+
+def test_resize_grows_and_shrinks_the_hold(reservations):
+    product_id = make_product(10)
+    reservations.hold("u1", product_id, 2)
+    assert reservations.resize("u1", product_id, 6)
+    assert held("u1", product_id) == 6 and stock_of(product_id) == 4
+    assert not reservations.resize("u1", product_id, 20)
+    assert held("u1", product_id) == 6 and stock_of(product_id) == 4
+    assert reservations.resize("u1", product_id, 1)
+    assert held("u1", product_id) == 1 and stock_of(product_id) == 9
+
+
+def test_consume_converts_units_without_touching_stock(reservations):
+    product_id = make_product(5)
+    reservations.hold("u1", product_id, 2)
+    assert reservations.consume("u1", product_id)
+    assert reservations.consume("u1", product_id)
+    assert not reservations.consume("u1", product_id)
+    assert reservations_collection.count_documents({"user_id": "u1", "product_id": product_id}) == 0
+    assert stock_of(product_id) == 3
+
+
+def test_expired_hold_is_not_consumed_and_is_swept(reservations):
+    product_id = make_product(5)
+    reservations.hold("u1", product_id, 4)
+    reservations_collection.update_one({"user_id": "u1", "product_id": product_id},
+                                       {"$set": {"expires_at": datetime.now(UTC) - timedelta(seconds=1)}})
+    assert not reservations.consume("u1", product_id)
+    assert reservations.sweep() == 1
+    assert stock_of(product_id) == 5
+    assert reservations_collection.count_documents({"product_id": product_id}) == 0
+    assert reservations.sweep() == 0
+
+
+def test_cancel_all_releases_every_hold(reservations):
+    first, second = make_product(3), make_product(3)
+    reservations.hold("u1", first, 1)
+    reservations.hold("u1", second, 2)
+    assert reservations.cancel_all("u1") == 3
+    assert stock_of(first) == 3 and stock_of(second) == 3
+
+
+def test_hold_on_hot_product_spans_shards(reservations):
+    product_id = make_product(12)
+    inventory.enable(product_id, 4)
+    try:
+        # 3 units per shard: no single shard covers 7
+        assert reservations.hold("u1", product_id, 7)
+        assert stock_of(product_id) == 5
+        assert not reservations.hold("u2", product_id, 6)
+        # A failed straddle puts back what it took
+        assert stock_of(product_id) == 5
+        assert reservations.hold("u2", product_id, 5)
+        assert stock_of(product_id) == 0
+    finally:
+        inventory.forget(product_id)
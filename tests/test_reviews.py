@@ -0,0 +1,99 @@
+"""
+Product rating maintained from reviews: the running average through add,
+edit and delete, and what is left once the last review is gone.
+"""
+import uuid
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from utils.auth_utils import generate_token
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def new_user(role: str = "user") -> dict:
+    from configs.database import user_collection
+
+    user_id = str(user_collection.insert_one({"name": "Reviewer", "email": f"{uuid.uuid4().hex}@test.local",
+                                              "role": role}).inserted_id)
+    return {"Authorization": f"Bearer {generate_token({'user_id': user_id, 'email': 'r@test.local'})}"}
+
+
+@pytest.fixture
+def product():
+    from configs.database import product_collection
+
+    product_id = product_collection.insert_one(
+        {"name": "Lamp", "price": 30.0, "description": None, "stock": 5, "image_url": None, "category": "home",
+         "rating": 3.5, "updated_at": datetime.now(UTC) - timedelta(days=1)}
+    ).inserted_id
+    return str(product_id)
+
+
+def stored(product_id: str) -> dict:
+    from configs.database import product_collection
+
+    return product_collection.find_one({"_id": ObjectId(product_id)})
+
+
+def review(client, product_id: str, headers: dict, rating: int) -> str:
+    res = client.post(f"/api/v1/product/{product_id}/reviews", json={"rating": rating}, headers=headers)
+    assert res.status_code == 200, res.text
+    return res.json()["id"]
+
+
+def test_average_follows_add_edit_and_delete(client, product):
+    alice, bob = new_user(), new_user()
+    first = review(client, product, alice, 5)
+    assert stored(product)["rating"] == 5.0
+
+    review(client, product, bob, 2)
+    assert stored(product)["rating"] == 3.5
+    assert (stored(product)["rating_sum"], stored(product)["rating_count"]) == (7, 2)
+
+    assert client.put(f"/api/v1/reviews/{first}", json={"rating": 4}, headers=alice).status_code == 200
+    assert stored(product)["rating"] == 3.0
+
+    assert client.delete(f"/api/v1/reviews/{first}", headers=alice).status_code == 200
+    assert stored(product)["rating"] == 2.0
+    assert (stored(product)["rating_sum"], stored(product)["rating_count"]) == (2, 1)
+
+
+def test_second_review_by_the_same_user_is_rejected(client, product):
+    alice = new_user()
+    review(client, product, alice, 4)
+    res = client.post(f"/api/v1/product/{product}/reviews", json={"rating": 1}, headers=alice)
+    assert res.status_code == 409
+    assert stored(product)["rating"] == 4.0
+    assert stored(product)["rating_count"] == 1
+
+
+def test_deleting_the_last_review_leaves_no_rating(client, product):
+    alice = new_user()
+    review_id = review(client, product, alice, 1)
+    assert client.delete(f"/api/v1/reviews/{review_id}", headers=new_user("admin")).status_code == 200
+
+    doc = stored(product)
+    assert doc["rating_count"] == 0
+    assert "rating" not in doc
+    assert client.get(f"/api/v1/product/{product}").status_code == 200
+
+
+def test_rating_writes_move_updated_at(client, product):
+    before = stored(product)["updated_at"]
+    alice = new_user()
+    review_id = review(client, product, alice, 3)
+    added = stored(product)["updated_at"]
+    assert added > before
+
+    client.delete(f"/api/v1/reviews/{review_id}", headers=alice)
+    assert stored(product)["updated_at"] >= added
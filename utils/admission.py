@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from utils.metrics import REGISTRY
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_INITIAL_LIMIT = int(os.getenv("ADMISSION_INITIAL_LIMIT", "40"))
+ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "8"))
+ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", "400"))
+# How long a checkout may wait for a slot before it is rejected too
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+
+# Highest priority first. share is the fraction of the adaptive limit a tier
+# may fill, so as the limit shrinks admin is shed first, then browse, then
+# cart, and the remaining headroom is kept for checkout.
+TIERS: Dict[str, Dict] = {
+    "checkout": {"priority": 0, "share": 1.0, "queue": True},
+    "cart": {"priority": 1, "share": 0.9, "queue": False},
+    "browse": {"priority": 2, "share": 0.7, "queue": False},
+    "admin": {"priority": 3, "share": 0.5, "queue": False},
+}
+
+# (method or None for any, path regex, tier); first match wins, unmatched API paths are "browse"
+ROUTE_CLASSES: List[Tuple[Optional[str], str, str]] = [
+    ("POST", r"/api/v1/orders", "checkout"),
+    ("GET", r"/api/v1/orders", "admin"),
+    (None, r"/api/v1/admin/.*", "admin"),
+    (None, r"/api/v1/add-product", "admin"),
+    ("POST", r"/api/v1/product/[^/]+", "admin"),
+    ("DELETE", r"/api/v1/product/[^/]+", "admin"),
+    (None, r"/api/v1/auth/promote/.*", "admin"),
+    (None, r"/api/v1/cart/.*", "cart"),
+    (None, r"/api/v1/orders/.*", "cart"),
+    (None, r"/api/v1/auth/.*", "cart"),
+]
+
+admission_limit = REGISTRY.gauge(
+    "admission_concurrency_limit", "Current adaptive concurrency limit.", ()
+)
+admission_in_flight = REGISTRY.gauge(
+    "admission_in_flight", "Admitted requests currently being handled, by tier.", ("tier",)
+)
+admission_shed_total = REGISTRY.counter(
+    "admission_shed_total", "Requests rejected with 503 by the admission controller, by tier.", ("tier",)
+)
+admission_queue_wait_seconds = REGISTRY.histogram(
+    "admission_queue_wait_seconds", "Time checkout requests waited for an admission slot.", ("tier",)
+)
+
+
+def classify(method: str, path: str, route_classes: Iterable[Tuple[Optional[str], "re.Pattern", str]]) -> str:
+    """Tier for a request, from the first matching route class."""
+    for class_method, pattern, tier in route_classes:
+        if (class_method is None or class_method == method) and pattern.fullmatch(path):
+            return tier
+    return "browse"
+
+
+class AdaptiveLimit:
+    """
+    Gradient concurrency limit driven by observed latency.
+
+    Handlers differ by orders of magnitude (bcrypt login vs a cached product
+    read), so each sample is compared with its own route's long-run median
+    latency. While the limit is being used (in flight >= half of it) the ratio
+    shrinks the limit as queueing inflates latency and lets it grow by
+    sqrt(limit) per sample while latency stays near the baseline. Below that,
+    slow samples say nothing about queueing, so the limit drifts back toward
+    its initial value instead.
+    """
+
+    def __init__(self, initial: int = ADMISSION_INITIAL_LIMIT, min_limit: int = ADMISSION_MIN_LIMIT,
+                 max_limit: int = ADMISSION_MAX_LIMIT, tolerance: float = 1.5, smoothing: float = 0.2,
+                 baseline_rate: float = 0.02):
+        self.initial = float(initial)
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.baseline_rate = baseline_rate
+        # route -> running median latency
+        self._baselines: Dict[str, float] = {}
+        admission_limit.set(initial)
+
+    def _baseline(self, route: str, latency: float) -> float:
+        """
+        Streaming median: step up by baseline_rate when a sample is above it,
+        down when below. Outliers move it one small step at most, and it
+        follows lasting shifts (e.g. data growth) over a few hundred samples.
+        """
+        median = self._baselines.get(route)
+        if median is None:
+            median = latency
+        elif latency > median:
+            median *= 1 + self.baseline_rate
+        elif latency < median:
+            median *= 1 - self.baseline_rate
+        self._baselines[route] = median
+        return median
+
+    def observe(self, route: str, latency: float, in_flight: int) -> None:
+        baseline = self._baseline(route, latency)
+        if in_flight >= self.limit / 2:
+            gradient = max(0.5, min(1.0, self.tolerance * baseline / max(latency, 1e-6)))
+            target = self.limit * gradient + self.limit ** 0.5
+        else:
+            target = self.initial
+        self.limit = (1 - self.smoothing) * self.limit + self.smoothing * target
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+        admission_limit.set(round(self.limit, 2))
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware assigning requests to priority tiers and admitting them
+    against an adaptive concurrency limit.
+
+    A tier is admitted while total in-flight requests are below its share of
+    the limit; otherwise it is shed with 503 + Retry-After before it can queue
+    in the threadpool. Checkout waits (up to ADMISSION_QUEUE_TIMEOUT) for a
+    slot instead, and released slots go to waiting checkouts first.
+    """
+
+    def __init__(self, app, enabled: bool = ADMISSION_ENABLED, limit: AdaptiveLimit = None,
+                 tiers: Dict[str, Dict] = None, route_classes: List[Tuple[Optional[str], str, str]] = None,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, skip_paths: Iterable[str] = ("/metrics", "/docs", "/openapi.json")):
+        self.app = app
+        self.enabled = enabled
+        self.limit = limit or AdaptiveLimit()
+        self.tiers = tiers or TIERS
+        self.route_classes = [(m, re.compile(p), t) for m, p, t in (route_classes or ROUTE_CLASSES)]
+        self.queue_timeout = queue_timeout
+        self.skip_paths = set(skip_paths)
+        self.in_flight = 0
+        self.in_flight_by_tier: Dict[str, int] = {tier: 0 for tier in self.tiers}
+        self._waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+
+    def _capacity(self, tier: str) -> float:
+        return self.limit.limit * self.tiers[tier]["share"]
+
+    def _try_acquire(self, tier: str) -> bool:
+        if self.in_flight >= self._capacity(tier):
+            return False
+        self._acquire(tier)
+        return True
+
+    def _acquire(self, tier: str) -> None:
+        self.in_flight += 1
+        self.in_flight_by_tier[tier] += 1
+        admission_in_flight.set(self.in_flight_by_tier[tier], tier=tier)
+
+    def _release(self, tier: str) -> None:
+        self.in_flight -= 1
+        self.in_flight_by_tier[tier] -= 1
+        admission_in_flight.set(self.in_flight_by_tier[tier], tier=tier)
+        # Hand freed capacity to queued checkouts before anyone else can take it
+        while self._waiters and self.in_flight < self.limit.limit:
+            waiting_tier, waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._acquire(waiting_tier)
+                waiter.set_result(True)
+
+    def _drop_waiter(self, tier: str, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove((tier, waiter))
+        except ValueError:
+            pass
+
+    async def _wait_for_slot(self, tier: str) -> bool:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((tier, waiter))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted in the same tick the timeout fired; keep the slot
+                return True
+            self._drop_waiter(tier, waiter)
+            return False
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a granted slot, or leave the queue
+            if waiter.done() and not waiter.cancelled():
+                self._release(tier)
+            else:
+                self._drop_waiter(tier, waiter)
+            raise
+        finally:
+            admission_queue_wait_seconds.observe(time.perf_counter() - start, tier=tier)
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        tier = classify(scope["method"], scope["path"], self.route_classes)
+        queued_tier = self.tiers[tier]["queue"]
+        # Queued tiers are FIFO: don't overtake checkouts already waiting
+        admitted = not (queued_tier and self._waiters) and self._try_acquire(tier)
+        if not admitted and queued_tier:
+            admitted = await self._wait_for_slot(tier)
+        if not admitted:
+            admission_shed_total.inc(tier=tier)
+            await self._reject(send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight = self.in_flight
+            self._release(tier)
+            # Server errors are often fast failures and would drag the baseline down
+            if status_holder["status"] < 500:
+                route = scope.get("route")
+                key = f"{scope['method']} {route.path}" if route is not None else tier
+                self.limit.observe(key, time.perf_counter() - start, in_flight)
+
+    @staticmethod
+    async def _reject(send) -> None:
+        body = json.dumps({"detail": "Service overloaded, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
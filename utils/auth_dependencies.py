@@ -6,6 +6,7 @@ import jwt
 import os 
 from dotenv import load_dotenv
 from configs.database import user_collection
+from configs.cache import principal_cache
 
 from bson import ObjectId
 
@@ -26,11 +27,18 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         if not user_id:
             raise HTTPException(status_code = status.HTTP_401_UNAUTHORIZED, detail = "User Not Found")
         
-        user = user_collection.find_one({"_id" : ObjectId(user_id)})
+        user = principal_cache.get(user_id)
+        if user is not None:
+            return user
+        
+        # The password hash is never needed past login, so it isn't cached
+        user = user_collection.find_one({"_id" : ObjectId(user_id)}, {"password": 0})
         
         if not user:
             raise HTTPException(status_code = status.HTTP_401_UNAUTHORIZED, detail = "No User Found")
         
+        principal_cache.set(user_id, user)
+        
         return user
     
     except jwt.ExpiredSignatureError:
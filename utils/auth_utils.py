@@ -3,6 +3,7 @@ from passlib.context import CryptContext
 import jwt
 import os
 from datetime import datetime, timedelta, UTC
+from typing import Dict, Optional
 
 from dotenv import load_dotenv
 
@@ -26,3 +27,16 @@ def generate_token(data: dict, expires_minutes: int = 60):
     
     to_encode.update({"exp":expire})
     return jwt.encode( to_encode, JWT_SECRET, algorithm="HS256")
+
+
+def bearer_user_id(headers: Dict[bytes, bytes]) -> Optional[str]:
+    """user_id from a valid bearer token in raw ASGI headers, without touching the database."""
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(auth[7:], JWT_SECRET, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return None
+    return payload.get("user_id")
+
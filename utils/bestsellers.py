@@ -0,0 +1,354 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, UTC
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from configs.database import order_collection, product_collection, product_sales_collection
+from utils.metrics import REGISTRY
+from utils.order_archive import get_order_archive
+
+logger = logging.getLogger(__name__)
+
+BESTSELLERS_ENABLED = os.getenv("BESTSELLERS_ENABLED", "false").lower() == "true"
+BESTSELLERS_TOP_K = int(os.getenv("BESTSELLERS_TOP_K", "50"))
+# Trending windows as name:half-life hours; "all" (all-time units) is always available
+BESTSELLERS_WINDOWS = {
+    name: float(hours) * 3600
+    for name, hours in (w.split(":") for w in os.getenv("BESTSELLERS_WINDOWS", "day:24,week:168").split(","))
+}
+# Reload counters written by other workers
+BESTSELLERS_REFRESH_INTERVAL = float(os.getenv("BESTSELLERS_REFRESH_INTERVAL", "60"))
+# Correct counters against the orders (drift from crashes, cancellations, deleted products)
+BESTSELLERS_RECONCILE_INTERVAL = float(os.getenv("BESTSELLERS_RECONCILE_INTERVAL", "21600"))
+
+ALL_TIME = "all"
+
+# Forward decay: a sale at t adds exp((t - L) / tau) to a window's counter, L being a landmark.
+# Landmarks advance every generation so the exponent stays small; counters are kept per generation.
+_EPOCH = datetime(2025, 1, 1, tzinfo=UTC)
+_GENERATION = timedelta(days=7)
+_WRITE_BATCH = 1000
+_DUPLICATE_KEY = 11000
+
+bestsellers_reconcile_seconds = REGISTRY.histogram(
+    "bestsellers_reconcile_seconds", "Time to rebuild sales counters from the orders.", (),
+    buckets=(1, 5, 15, 60, 300, 900, 3600),
+)
+bestsellers_record_failures_total = REGISTRY.counter(
+    "bestsellers_record_failures_total", "Placed orders whose sales counters could not be updated.", ()
+)
+
+
+def _generation(at: datetime) -> int:
+    return int((at - _EPOCH) / _GENERATION)
+
+
+def _landmark(generation: int) -> datetime:
+    return _EPOCH + generation * _GENERATION
+
+
+def _weight(at: datetime, landmark: datetime, half_life: float) -> float:
+    return math.exp((at - landmark).total_seconds() * math.log(2) / half_life)
+
+
+def _utc(at: Optional[datetime]) -> datetime:
+    if at is None:
+        return _EPOCH
+    # pymongo returns naive UTC datetimes unless the client is tz_aware
+    return at if at.tzinfo else at.replace(tzinfo=UTC)
+
+
+class TopK:
+    """
+    The k largest members by score, for scores that only ever grow.
+
+    A min-heap holds the current top k; raising a member's score pushes a new
+    entry and leaves the old one stale (skipped when it reaches the root), so
+    every offer() is O(log k). A product that dropped out can only come back
+    by selling again, which offers it again.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[float, str]] = []
+        self._members: Dict[str, float] = {}
+
+    def offer(self, key: str, score: float) -> None:
+        current = self._members.get(key)
+        if current is not None:
+            if score > current:
+                self._members[key] = score
+                heapq.heappush(self._heap, (score, key))
+                if len(self._heap) > 4 * self.k:
+                    self._heap = [(s, k) for k, s in self._members.items()]
+                    heapq.heapify(self._heap)
+            return
+        if len(self._members) < self.k:
+            self._members[key] = score
+            heapq.heappush(self._heap, (score, key))
+            return
+        while self._members.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if score > self._heap[0][0]:
+            _, evicted = heapq.heapreplace(self._heap, (score, key))
+            del self._members[evicted]
+            self._members[key] = score
+
+    def discard(self, key: str) -> None:
+        # Its heap entry goes stale; the slot refills on the next refresh
+        self._members.pop(key, None)
+
+    def items(self) -> List[Tuple[str, float]]:
+        return sorted(self._members.items(), key=lambda item: item[1], reverse=True)
+
+
+class Bestsellers:
+    """
+    All-time and trending sales rankings, overall and per category.
+
+    place_order calls record(): one bulk_write of $inc per ordered product on
+    product_sales ({_id: product id, category, units, decay: {window:
+    {"g<generation>": counter}}}) and the same increments in memory. Rankings
+    are TopK heaps per (window, category) served straight from memory; other
+    workers' sales arrive with refresh(), and reconcile() periodically
+    corrects the counters against the orders (and the order archive).
+    Forward-decayed counters keep their order as time passes, so the heaps
+    never need re-sorting between refreshes.
+    """
+
+    def __init__(self, sales=product_sales_collection, products=product_collection, orders=order_collection,
+                 k: int = BESTSELLERS_TOP_K, windows: Dict[str, float] = None):
+        self.sales = sales
+        self.products = products
+        self.orders = orders
+        self.k = k
+        self.windows = dict(BESTSELLERS_WINDOWS if windows is None else windows)
+        self._lock = threading.Lock()
+        self._category: Dict[str, Optional[str]] = {}
+        self._landmark = _landmark(_generation(datetime.now(UTC)))
+        self._scores: Dict[str, Dict[str, float]] = {}
+        self._tops: Dict[Tuple[str, Optional[str]], TopK] = {}
+        self._reset()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _reset(self) -> None:
+        self._scores = {window: defaultdict(float) for window in (ALL_TIME, *self.windows)}
+        self._tops = {}
+
+    def _offer(self, product_id: str) -> None:
+        category = self._category.get(product_id)
+        for window, scores in self._scores.items():
+            score = scores[product_id]
+            for key in ((window, None), (window, category)):
+                top = self._tops.get(key)
+                if top is None:
+                    top = self._tops[key] = TopK(self.k)
+                top.offer(product_id, score)
+
+    # ---- writes ----
+
+    def _categories(self, product_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        missing = [pid for pid in product_ids if pid not in self._category]
+        if missing:
+            found = {str(p["_id"]): p.get("category")
+                     for p in self.products.find({"_id": {"$in": [ObjectId(pid) for pid in missing]}}, {"category": 1})}
+            for pid in missing:
+                self._category[pid] = found.get(pid)
+        return {pid: self._category[pid] for pid in product_ids}
+
+    def record(self, product_ids: List[str], at: datetime = None) -> None:
+        """Count the products of a placed order (a repeated id is one more unit)."""
+        at = at or datetime.now(UTC)
+        units = Counter(product_ids)
+        categories = self._categories(list(units))
+        generation = f"g{_generation(at)}"
+        landmark = _landmark(_generation(at))
+        self.sales.bulk_write([
+            UpdateOne({"_id": pid}, {
+                "$inc": {"units": n, **{f"decay.{window}.{generation}": n * _weight(at, landmark, half_life)
+                                        for window, half_life in self.windows.items()}},
+                "$setOnInsert": {"category": categories[pid]},
+            }, upsert=True)
+            for pid, n in units.items()
+        ], ordered=False)
+        with self._lock:
+            for pid, n in units.items():
+                self._scores[ALL_TIME][pid] += n
+                for window, half_life in self.windows.items():
+                    self._scores[window][pid] += n * _weight(at, self._landmark, half_life)
+                self._offer(pid)
+
+    def forget(self, product_id: str) -> None:
+        """Drop a deleted product from the rankings and its counters."""
+        self.sales.delete_one({"_id": product_id})
+        with self._lock:
+            for top in self._tops.values():
+                top.discard(product_id)
+            for scores in self._scores.values():
+                scores.pop(product_id, None)
+
+    # ---- reads ----
+
+    def top(self, category: Optional[str] = None, window: str = ALL_TIME, limit: int = 10) -> List[Dict]:
+        """Best sellers, best first; trending scores are decayed to now."""
+        if window not in self._scores:
+            raise ValueError(f"Window '{window}' not supported. Available: {[ALL_TIME, *self.windows]}")
+        with self._lock:
+            top = self._tops.get((window, category))
+            ranked = top.items()[:limit] if top else []
+            units = self._scores[ALL_TIME]
+            decay = 1.0 if window == ALL_TIME else _weight(self._landmark, datetime.now(UTC), self.windows[window])
+            return [{"product_id": pid, "category": self._category.get(pid), "units": int(units.get(pid, 0)),
+                     "score": round(score * decay, 4)} for pid, score in ranked]
+
+    # ---- refresh / reconcile ----
+
+    def refresh(self) -> int:
+        """Rebuild the in-memory rankings from product_sales; returns how many products were loaded."""
+        landmark = _landmark(_generation(datetime.now(UTC)))
+        docs = list(self.sales.find())
+        with self._lock:
+            self._landmark = landmark
+            self._reset()
+            for doc in docs:
+                pid = doc["_id"]
+                self._category[pid] = doc.get("category")
+                self._scores[ALL_TIME][pid] = doc.get("units", 0)
+                for window, half_life in self.windows.items():
+                    counters = (doc.get("decay") or {}).get(window) or {}
+                    # Re-express each generation's counter relative to the current landmark
+                    self._scores[window][pid] = sum(
+                        value * _weight(_landmark(int(generation[1:])), landmark, half_life)
+                        for generation, value in counters.items()
+                    )
+                self._offer(pid)
+        return len(docs)
+
+    def _sold(self) -> Iterable[Dict]:
+        yield from self.orders.find({"status": {"$ne": "Cancelled"}}, {"products": 1, "created_at": 1}).batch_size(10_000)
+        archive = get_order_archive()
+        if archive is not None:
+            for order in archive.scan():
+                if order.get("status") != "Cancelled":
+                    yield order
+
+    def reconcile(self) -> int:
+        """
+        Correct every counter to what the orders add up to; returns products corrected.
+
+        Counters are read before the orders are scanned and each is moved by
+        the difference with $inc, so sales record()ed during the scan are kept.
+        A correction applies only while the counter's reconciled_at is still
+        the one read: when several workers reconcile at once, it lands once.
+        """
+        start = time.perf_counter()
+        reconciled_at = datetime.now(UTC)
+        generation = f"g{_generation(reconciled_at)}"
+        landmark = _landmark(_generation(reconciled_at))
+        snapshot = {doc["_id"]: doc for doc in self.sales.find({}, {"units": 1, "decay": 1, "reconciled_at": 1})}
+
+        units: Dict[str, int] = defaultdict(int)
+        decay: Dict[str, Dict[str, float]] = {window: defaultdict(float) for window in self.windows}
+        for order in self._sold():
+            at = _utc(order.get("created_at"))
+            for pid in order.get("products") or []:
+                units[pid] += 1
+                for window, half_life in self.windows.items():
+                    decay[window][pid] += _weight(at, landmark, half_life)
+
+        categories = {str(p["_id"]): p.get("category") for p in self.products.find({}, {"category": 1})}
+        requests = []
+        written = 0
+        for pid in units.keys() | snapshot.keys():
+            if pid not in categories:
+                continue
+            doc = snapshot.get(pid, {})
+            inc = {"units": units.get(pid, 0) - doc.get("units", 0)}
+            unset = {}
+            for window in self.windows:
+                counters = (doc.get("decay") or {}).get(window) or {}
+                # Older generations are folded into the current one
+                unset.update({f"decay.{window}.{g}": "" for g in counters if g != generation})
+                inc[f"decay.{window}.{generation}"] = decay[window].get(pid, 0.0) - counters.get(generation, 0.0)
+            if not unset and all(math.isclose(delta, 0.0, abs_tol=1e-9) for delta in inc.values()):
+                continue
+            update = {"$inc": inc, "$set": {"category": categories[pid], "reconciled_at": reconciled_at}}
+            if unset:
+                update["$unset"] = unset
+            # A counter first created after the snapshot (by record()) has no reconciled_at yet
+            requests.append(UpdateOne({"_id": pid, "reconciled_at": doc.get("reconciled_at")}, update,
+                                      upsert=pid not in snapshot))
+            if len(requests) >= _WRITE_BATCH:
+                self._write(requests)
+                written += len(requests)
+                requests = []
+        if requests:
+            self._write(requests)
+            written += len(requests)
+        # Deleted products, then counters corrected down to no sales
+        self.sales.delete_many({"_id": {"$in": [pid for pid in snapshot if pid not in categories]}})
+        self.sales.delete_many({"_id": {"$in": [pid for pid in snapshot if pid not in units]}, "units": {"$lte": 0}})
+        self.refresh()
+        bestsellers_reconcile_seconds.observe(time.perf_counter() - start)
+        logger.info("Reconciled sales counters of %d products in %.1fs", written, time.perf_counter() - start)
+        return written
+
+    def _write(self, requests: List[UpdateOne]) -> None:
+        try:
+            self.sales.bulk_write(requests, ordered=False)
+        except BulkWriteError as exc:
+            # Another worker's reconcile created the counter first; its correction stands
+            if any(error.get("code") != _DUPLICATE_KEY for error in exc.details.get("writeErrors", [])):
+                raise
+
+    # ---- background ----
+
+    def start(self) -> None:
+        if self.refresh() == 0:
+            # First start: build the counters from the existing order history
+            self.reconcile()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bestsellers", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        next_reconcile = time.monotonic() + BESTSELLERS_RECONCILE_INTERVAL
+        while not self._stop.wait(BESTSELLERS_REFRESH_INTERVAL):
+            try:
+                if time.monotonic() >= next_reconcile:
+                    self.reconcile()
+                    next_reconcile = time.monotonic() + BESTSELLERS_RECONCILE_INTERVAL
+                else:
+                    self.refresh()
+            except Exception:
+                logger.exception("Bestsellers refresh failed")
+
+
+bestsellers = Bestsellers()
+
+
+def record_sales(product_ids: List[str], at: datetime = None) -> None:
+    """Count a placed order; the order is already written, so a failure is left to the reconcile."""
+    if not BESTSELLERS_ENABLED:
+        return
+    try:
+        bestsellers.record(product_ids, at)
+    except Exception:
+        bestsellers_record_failures_total.inc()
+        logger.exception("Could not update sales counters")
@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from typing import Dict, Optional
+
+from pymongo import ReplaceOne
+
+from configs.database import cart_collection, carts_archive_collection
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CART_CLEANUP_ENABLED = os.getenv("CART_CLEANUP_ENABLED", "false").lower() == "true"
+CART_CLEANUP_INTERVAL = float(os.getenv("CART_CLEANUP_INTERVAL", "3600"))
+CART_CLEANUP_BATCH = int(os.getenv("CART_CLEANUP_BATCH", "500"))
+# Documents per second the job may delete/archive, so it never competes with checkout for the primary
+CART_CLEANUP_RATE = float(os.getenv("CART_CLEANUP_RATE", "2000"))
+# Empty carts are kept briefly (a user may be mid-session); non-empty ones until abandoned
+CART_EMPTY_GRACE = float(os.getenv("CART_EMPTY_GRACE", "3600"))
+CART_STALE_DAYS = float(os.getenv("CART_STALE_DAYS", "30"))
+# Copy stale non-empty carts to carts_archive before deleting them
+CART_ARCHIVE = os.getenv("CART_ARCHIVE", "true").lower() == "true"
+
+cart_cleanup_removed_total = REGISTRY.counter(
+    "cart_cleanup_removed_total", "Carts removed by the cleanup job by reason.", ("reason",)
+)
+cart_cleanup_archived_total = REGISTRY.counter(
+    "cart_cleanup_archived_total", "Stale carts copied to carts_archive before removal.", ()
+)
+cart_cleanup_run_seconds = REGISTRY.histogram(
+    "cart_cleanup_run_seconds", "Duration of one full cleanup run.", (), buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900)
+)
+
+
+class CartCleanupJob:
+    """
+    Scheduled removal of empty and abandoned carts.
+
+    Each run (1) stamps updated_at on legacy carts that predate it, so they
+    get a full grace period instead of being treated as ancient, (2) deletes
+    empty carts untouched for CART_EMPTY_GRACE seconds and (3) archives then
+    deletes non-empty carts untouched for CART_STALE_DAYS. Work happens in
+    batches of ids; every delete re-checks updated_at, so a cart written to
+    after it was selected survives. Batches are paced to CART_CLEANUP_RATE.
+    """
+
+    def __init__(self, carts=cart_collection, archive=carts_archive_collection, batch_size: int = CART_CLEANUP_BATCH,
+                 rate: float = CART_CLEANUP_RATE, archive_stale: bool = CART_ARCHIVE):
+        self.carts = carts
+        self.archive = archive
+        self.batch_size = batch_size
+        self.rate = rate
+        self.archive_stale = archive_stale
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _pace(self, processed: int, started: float) -> None:
+        """Sleep so this batch averages at most self.rate documents per second."""
+        if self.rate > 0:
+            remaining = processed / self.rate - (time.perf_counter() - started)
+            if remaining > 0:
+                self._stop.wait(remaining)
+
+    def _batches(self, query: Dict):
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            ids = [doc["_id"] for doc in self.carts.find(query, {"_id": 1}).limit(self.batch_size)]
+            if not ids:
+                return
+            yield ids
+            self._pace(len(ids), started)
+            if len(ids) < self.batch_size:
+                return
+
+    def backfill(self, now: datetime) -> int:
+        stamped = 0
+        for ids in self._batches({"updated_at": {"$exists": False}}):
+            stamped += self.carts.update_many({"_id": {"$in": ids}, "updated_at": {"$exists": False}},
+                                              {"$set": {"updated_at": now}}).modified_count
+        return stamped
+
+    def remove_empty(self, now: datetime) -> int:
+        cutoff = now - timedelta(seconds=CART_EMPTY_GRACE)
+        query = {"items": {"$size": 0}, "updated_at": {"$lte": cutoff}}
+        removed = 0
+        for ids in self._batches(query):
+            removed += self.carts.delete_many({"_id": {"$in": ids}, **query}).deleted_count
+        cart_cleanup_removed_total.inc(removed, reason="empty")
+        return removed
+
+    def remove_stale(self, now: datetime) -> int:
+        cutoff = now - timedelta(days=CART_STALE_DAYS)
+        query = {"updated_at": {"$lte": cutoff}}
+        removed = 0
+        for ids in self._batches(query):
+            if self.archive_stale:
+                carts = list(self.carts.find({"_id": {"$in": ids}}))
+                if carts:
+                    # Upsert by cart _id so a retried batch doesn't duplicate archive entries
+                    self.archive.bulk_write([ReplaceOne({"_id": cart["_id"]}, {**cart, "archived_at": now}, upsert=True)
+                                             for cart in carts], ordered=False)
+                    cart_cleanup_archived_total.inc(len(carts))
+            removed += self.carts.delete_many({"_id": {"$in": ids}, **query}).deleted_count
+        cart_cleanup_removed_total.inc(removed, reason="stale")
+        return removed
+
+    def run_once(self) -> Dict[str, int]:
+        """One full cleanup pass; returns counts per step."""
+        start = time.perf_counter()
+        now = datetime.now(UTC)
+        result = {
+            "backfilled": self.backfill(now),
+            "empty_removed": self.remove_empty(now),
+            "stale_removed": self.remove_stale(now),
+        }
+        cart_cleanup_run_seconds.observe(time.perf_counter() - start)
+        logger.info("Cart cleanup: %s", result)
+        return result
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cart-cleanup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(CART_CLEANUP_INTERVAL):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Cart cleanup failed")
+
+
+cart_cleanup = CartCleanupJob()
@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, UTC
+from typing import Dict, List, Optional
+
+from configs.database import order_collection, product_collection, user_collection
+from factories.archive_factory import order_totals
+from utils import invalidation
+from utils.metrics import REGISTRY
+from utils.order_archive import archived_totals
+
+logger = logging.getLogger(__name__)
+
+# Without the background job both endpoints compute their figures on every request
+CATALOG_STATS_ENABLED = os.getenv("CATALOG_STATS_ENABLED", "false").lower() == "true"
+# Full recompute at least this often (catches writes made by other workers without a change stream)
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "60"))
+STATS_REFRESH_INTERVAL = float(os.getenv("STATS_REFRESH_INTERVAL", "300"))
+# After a write event, wait this long before recomputing so a burst of writes costs one scan
+CATALOG_REFRESH_DEBOUNCE = float(os.getenv("CATALOG_REFRESH_DEBOUNCE", "5"))
+STATS_REFRESH_DEBOUNCE = float(os.getenv("STATS_REFRESH_DEBOUNCE", "30"))
+
+_SCAN_BATCH = 10_000
+
+catalog_stats_refresh_seconds = REGISTRY.histogram(
+    "catalog_stats_refresh_seconds", "Time to recompute an in-memory aggregate.", ("aggregate",),
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60),
+)
+
+
+class _Aggregate:
+    """Refresh schedule of one snapshot: dirty since a write event, or due by interval."""
+
+    def __init__(self, interval: float, debounce: float):
+        self.interval = interval
+        self.debounce = debounce
+        self.dirty_since: Optional[float] = None
+        self.refreshed = 0.0
+
+    def due(self, now: float) -> bool:
+        if self.dirty_since is not None and now - self.dirty_since >= self.debounce:
+            return True
+        return now - self.refreshed >= self.interval
+
+    def next_check(self, now: float) -> float:
+        wake = self.refreshed + self.interval
+        if self.dirty_since is not None:
+            wake = min(wake, self.dirty_since + self.debounce)
+        return max(wake - now, 0.0)
+
+
+class CatalogStats:
+    """
+    Category listing and admin dashboard figures, served from memory.
+
+    Both snapshots are recomputed in the background: shortly after a write
+    event on the invalidation bus (debounced, so a bulk import is one scan)
+    and at least every interval. Readers only ever get the last snapshot, so
+    the endpoints cost no database round trip. Categories are grouped in
+    Python over a projected scan; order figures are one $group per refresh
+    (a projected scan on the in-memory backend). The archive only changes when
+    the archiver runs or an archived order is deleted, so its totals are
+    re-read on the interval or after an archive or delete event, not on every
+    order event. When the job isn't running, every read recomputes.
+    """
+
+    def __init__(self):
+        self._categories: List[Dict] = []
+        self._catalog_refreshed_at: Optional[datetime] = None
+        self._stats: Dict = {}
+        self._archived: Optional[Dict] = None
+        self._archived_at = 0.0
+        self._catalog = _Aggregate(CATALOG_REFRESH_INTERVAL, CATALOG_REFRESH_DEBOUNCE)
+        self._dashboard = _Aggregate(STATS_REFRESH_INTERVAL, STATS_REFRESH_DEBOUNCE)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- reads ----
+
+    def categories(self) -> Dict:
+        if self._thread is None:
+            self.refresh_categories()
+        return {"categories": self._categories, "refreshed_at": self._catalog_refreshed_at}
+
+    def stats(self) -> Dict:
+        if self._thread is None:
+            # Nothing re-reads the archive on a schedule either
+            self._archived = None
+            return self.refresh_stats()
+        return self._stats
+
+    # ---- recompute ----
+
+    def refresh_categories(self) -> int:
+        start = time.perf_counter()
+        groups: Dict[str, Dict] = {}
+        for product in product_collection.find({}, {"category": 1, "price": 1, "_id": 0}).batch_size(_SCAN_BATCH):
+            category = product.get("category")
+            if not category:
+                continue
+            price = product.get("price") or 0
+            group = groups.get(category)
+            if group is None:
+                groups[category] = {"category": category, "product_count": 1, "min_price": price, "max_price": price}
+                continue
+            group["product_count"] += 1
+            group["min_price"] = min(group["min_price"], price)
+            group["max_price"] = max(group["max_price"], price)
+
+        # Swapped in whole: readers see the old list or the new one, never a partial one
+        self._categories = sorted(groups.values(), key=lambda g: g["category"].lower())
+        self._catalog_refreshed_at = datetime.now(UTC)
+        catalog_stats_refresh_seconds.observe(time.perf_counter() - start, aggregate="categories")
+        return len(groups)
+
+    def refresh_stats(self) -> Dict:
+        start = time.perf_counter()
+        hot = order_totals(order_collection)
+        if self._archived is None or time.monotonic() - self._archived_at >= STATS_REFRESH_INTERVAL:
+            self._archived, self._archived_at = archived_totals(), time.monotonic()
+        archived = self._archived
+
+        by_status = dict(hot["by_status"])
+        for status, count in archived["by_status"].items():
+            by_status[status] = by_status.get(status, 0) + count
+
+        self._stats = {
+            "users": user_collection.estimated_document_count(),
+            "products": product_collection.estimated_document_count(),
+            "orders": hot["orders"] + archived["orders"],
+            "archived_orders": archived["orders"],
+            "orders_by_status": {status: count for status, count in by_status.items() if count},
+            "revenue": round(hot["revenue"] + archived["revenue"], 2),
+            "refreshed_at": datetime.now(UTC),
+        }
+        catalog_stats_refresh_seconds.observe(time.perf_counter() - start, aggregate="stats")
+        return self._stats
+
+    # ---- write events ----
+
+    def _mark(self, *aggregates: _Aggregate) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for aggregate in aggregates:
+                if aggregate.dirty_since is None:
+                    aggregate.dirty_since = now
+        self._wake.set()
+
+    def _on_product_change(self, ids: Optional[List[str]], operation: str) -> None:
+        self._mark(self._catalog, self._dashboard)
+
+    def _on_change(self, ids: Optional[List[str]], operation: str) -> None:
+        self._mark(self._dashboard)
+
+    def _on_order_change(self, ids: Optional[List[str]], operation: str) -> None:
+        if operation in ("delete", "archive"):
+            # The archive changed (an archiver run, or a delete that may have hit an archived order)
+            self._archived = None
+        self._mark(self._dashboard)
+
+    # ---- background ----
+
+    def start(self) -> None:
+        self._refresh(self._catalog, self.refresh_categories)
+        self._refresh(self._dashboard, self.refresh_stats)
+        invalidation.subscribe("products", self._on_product_change)
+        invalidation.subscribe("orders", self._on_order_change)
+        invalidation.subscribe("users", self._on_change)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        invalidation.unsubscribe("products", self._on_product_change)
+        invalidation.unsubscribe("orders", self._on_order_change)
+        invalidation.unsubscribe("users", self._on_change)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _refresh(self, aggregate: _Aggregate, compute) -> None:
+        with self._lock:
+            # Events arriving during the scan mark it dirty again
+            aggregate.dirty_since = None
+        aggregate.refreshed = time.monotonic()
+        compute()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for aggregate, compute in ((self._catalog, self.refresh_categories), (self._dashboard, self.refresh_stats)):
+                if aggregate.due(now):
+                    try:
+                        self._refresh(aggregate, compute)
+                    except Exception:
+                        logger.exception("Catalog stats refresh failed")
+            now = time.monotonic()
+            with self._lock:
+                timeout = min(self._catalog.next_check(now), self._dashboard.next_check(now))
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+
+catalog_stats = CatalogStats()
@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, UTC
+from typing import Dict, Iterable, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from configs.cache import principal_cache, product_cache
+from utils import invalidation
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Collections whose changes invalidate in-process caches, indexes and snapshots
+WATCHED_COLLECTIONS = ("products", "users", "carts")
+POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "2"))
+POLL_BATCH_SIZE = int(os.getenv("CHANGE_POLL_BATCH_SIZE", "1000"))
+# Name under which the stream resume token is persisted
+CONSUMER_NAME = os.getenv("CHANGE_STREAM_NAME", "default")
+# Persist the resume token at most this often (and on stop) instead of after every event
+RESUME_TOKEN_SAVE_INTERVAL = float(os.getenv("CHANGE_STREAM_SAVE_INTERVAL", "5"))
+STATE_COLLECTION = "change_stream_state"
+
+change_events_total = REGISTRY.counter(
+    "change_stream_events_total", "Change events applied by collection, operation and source.", ("collection", "operation", "source")
+)
+change_stream_errors_total = REGISTRY.counter(
+    "change_stream_errors_total", "Change stream failures (followed by a resume or fallback).", ("mode",)
+)
+
+# Error codes meaning change streams are unavailable on this deployment
+_NOT_SUPPORTED_CODES = {40573, 40324, 136}
+
+
+def _invalidate_product(ids: Optional[List[str]], operation: str) -> None:
+    if ids is None:
+        product_cache.clear()
+    else:
+        product_cache.delete_many(ids)
+
+
+def _invalidate_principal(ids: Optional[List[str]], operation: str) -> None:
+    if ids is None:
+        principal_cache.clear()
+    else:
+        principal_cache.delete_many(ids)
+
+
+def register_default_handlers() -> None:
+    """Wire the shared caches to product/user change events."""
+    invalidation.subscribe("products", _invalidate_product)
+    invalidation.subscribe("users", _invalidate_principal)
+
+
+class ChangeStreamConsumer:
+    """
+    Background consumer pushing database changes into the invalidation bus.
+
+    Watches the configured collections with a single database-level change
+    stream and persists its resume token every save_interval seconds (and on
+    stop), so a restart picks up close to where it left off and replays at
+    most a few seconds of invalidations. When change streams are unavailable
+    (standalone mongod) it falls back to polling each collection by
+    updated_at; deletes are not visible in that mode, so writers should also
+    invalidate directly.
+
+    Poll watermarks are kept in memory: every worker process has its own
+    caches and must see every change itself, so a shared watermark would let
+    the first worker to poll hide changes from the others. A fresh process
+    starts from now, its caches being empty anyway.
+    """
+
+    def __init__(self, db, collections: Iterable[str] = WATCHED_COLLECTIONS, name: str = "default",
+                 poll_interval: float = POLL_INTERVAL, save_interval: float = RESUME_TOKEN_SAVE_INTERVAL):
+        self.db = db
+        self.collections = list(collections)
+        self.name = name
+        self.poll_interval = poll_interval
+        self.save_interval = save_interval
+        self.mode = "stream"
+        self._resume_token = None
+        self._saved_token = None
+        self._saved_at = 0.0
+        self._watermarks: Dict[str, datetime] = {}
+        self._state = db[STATE_COLLECTION]
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- lifecycle ----
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"change-stream-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self._save_token(force=True)
+        except PyMongoError:
+            logger.warning("Could not persist the change stream resume token", exc_info=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.mode == "stream":
+                    self._watch()
+                else:
+                    self._poll_once()
+                    self._stop.wait(self.poll_interval)
+            except OperationFailure as exc:
+                change_stream_errors_total.inc(mode=self.mode)
+                if self.mode == "stream" and (exc.code in _NOT_SUPPORTED_CODES or "replica set" in str(exc)):
+                    logger.warning("Change streams unavailable (%s); falling back to polling by updated_at", exc)
+                    self.mode = "poll"
+                elif exc.code == 286:
+                    # ChangeStreamHistoryLost: the token fell off the oplog; resume from now
+                    logger.warning("Change stream history lost; restarting without resume token")
+                    self._resume_token = None
+                    self._save_token(force=True)
+                    self._invalidate_all()
+                else:
+                    logger.exception("Change consumer failed; retrying")
+                    self._stop.wait(1.0)
+            except PyMongoError:
+                change_stream_errors_total.inc(mode=self.mode)
+                logger.exception("Change consumer failed; retrying")
+                self._stop.wait(1.0)
+
+    # ---- state ----
+
+    def _load_state(self) -> Dict:
+        return self._state.find_one({"_id": self.name}) or {}
+
+    def _save_state(self, fields: Dict) -> None:
+        self._state.update_one({"_id": self.name}, {"$set": fields}, upsert=True)
+
+    def _save_token(self, force: bool = False) -> None:
+        """Persist the resume token if it moved and save_interval has passed (or force)."""
+        if self._resume_token == self._saved_token:
+            return
+        now = time.monotonic()
+        if not force and now - self._saved_at < self.save_interval:
+            return
+        self._save_state({"resume_token": self._resume_token})
+        self._saved_token, self._saved_at = self._resume_token, now
+
+    def _invalidate_all(self) -> None:
+        for collection in self.collections:
+            invalidation.publish(collection, None, "invalidate")
+
+    # ---- change streams ----
+
+    def _watch(self) -> None:
+        token = self._resume_token
+        if token is None:
+            token = self._saved_token = self._load_state().get("resume_token")
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": self.collections}}},
+            {"$project": {"operationType": 1, "ns": 1, "documentKey": 1}},
+        ]
+        with self.db.watch(pipeline, resume_after=token, max_await_time_ms=1000) as stream:
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self._apply(change)
+                self._resume_token = stream.resume_token
+                self._save_token()
+
+    def _apply(self, change: Dict) -> None:
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            targets = [collection] if collection in self.collections else self.collections
+            for name in targets:
+                invalidation.publish(name, None, operation)
+                change_events_total.inc(collection=name, operation=operation, source="stream")
+            return
+        if collection not in self.collections:
+            return
+        doc_id = change.get("documentKey", {}).get("_id")
+        invalidation.publish(collection, [str(doc_id)], operation)
+        change_events_total.inc(collection=collection, operation=operation, source="stream")
+
+    # ---- polling fallback ----
+
+    def _poll_once(self) -> None:
+        for collection in self.collections:
+            since = self._watermarks.get(collection)
+            if since is None:
+                # First poll: start from now instead of replaying history
+                self._watermarks[collection] = datetime.now(UTC)
+                continue
+            cursor = (self.db[collection]
+                      .find({"updated_at": {"$gt": since}}, {"_id": 1, "updated_at": 1})
+                      .sort("updated_at", 1)
+                      .limit(POLL_BATCH_SIZE))
+            docs = list(cursor)
+            if not docs:
+                continue
+            invalidation.publish(collection, [str(d["_id"]) for d in docs], "update")
+            change_events_total.inc(len(docs), collection=collection, operation="update", source="poll")
+            self._watermarks[collection] = docs[-1]["updated_at"]
+
+
+_consumer: Optional[ChangeStreamConsumer] = None
+
+
+def start_change_consumer(db) -> ChangeStreamConsumer:
+    """Start the process-wide consumer (called from the app lifespan)."""
+    global _consumer
+    register_default_handlers()
+    _consumer = ChangeStreamConsumer(db, name=CONSUMER_NAME)
+    _consumer.start()
+    return _consumer
+
+
+def stop_change_consumer() -> None:
+    global _consumer
+    if _consumer is not None:
+        _consumer.stop()
+        _consumer = None
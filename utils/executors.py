@@ -0,0 +1,144 @@
+import functools
+import os
+import time
+from typing import Callable, Dict, Tuple
+
+import anyio
+import anyio.to_thread
+from fastapi import HTTPException
+
+from utils.metrics import REGISTRY
+
+executor_pool_size = REGISTRY.gauge(
+    "executor_pool_size", "Worker threads a named executor pool may use.", ("pool",)
+)
+executor_pool_busy = REGISTRY.gauge(
+    "executor_pool_busy", "Handlers currently running in a named executor pool.", ("pool",)
+)
+executor_pool_queued = REGISTRY.gauge(
+    "executor_pool_queued", "Handlers waiting for a thread in a named executor pool.", ("pool",)
+)
+executor_pool_rejected_total = REGISTRY.counter(
+    "executor_pool_rejected_total", "Handlers rejected because a pool's queue was full.", ("pool",)
+)
+executor_pool_wait_seconds = REGISTRY.histogram(
+    "executor_pool_wait_seconds", "Time handlers waited for a thread in a named executor pool.", ("pool",)
+)
+
+# name -> (threads, queue bound)
+DEFAULT_EXECUTOR_POOLS: Dict[str, Tuple[int, int]] = {
+    "catalog": (16, 64),
+    "cart": (12, 48),
+    "checkout": (8, 64),
+    "auth": (4, 32),
+    "admin": (2, 8),
+}
+
+
+def parse_executor_pools(raw: str) -> Dict[str, Tuple[int, int]]:
+    """Parse EXECUTOR_POOLS, e.g. "catalog:16:64,admin:2:8"."""
+    pools = {}
+    for entry in filter(None, (part.strip() for part in raw.split(","))):
+        name, size, queue_size = entry.split(":")
+        pools[name.strip()] = (int(size), int(queue_size))
+    return pools
+
+
+class ExecutorPool:
+    """
+    Named slice of the anyio worker threads with its own size and queue bound.
+
+    Handlers run through anyio.to_thread with this pool's CapacityLimiter, so
+    a saturated pool only delays its own route class. Once queue_size callers
+    are already waiting, further calls fail fast with 503.
+    """
+
+    def __init__(self, name: str, size: int, queue_size: int):
+        self.name = name
+        self.queue_size = queue_size
+        self.limiter = anyio.CapacityLimiter(size)
+        executor_pool_size.set(size, pool=name)
+
+    @property
+    def size(self) -> int:
+        return int(self.limiter.total_tokens)
+
+    def resize(self, size: int) -> None:
+        self.limiter.total_tokens = size
+        executor_pool_size.set(size, pool=self.name)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run a blocking callable on a worker thread owned by this pool."""
+        stats = self.limiter.statistics()
+        if stats.borrowed_tokens >= stats.total_tokens and stats.tasks_waiting >= self.queue_size:
+            executor_pool_rejected_total.inc(pool=self.name)
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+        queued_at = time.perf_counter()
+
+        def call():
+            executor_pool_wait_seconds.observe(time.perf_counter() - queued_at, pool=self.name)
+            executor_pool_busy.set(self.limiter.borrowed_tokens, pool=self.name)
+            return fn(*args, **kwargs)
+
+        executor_pool_queued.set(stats.tasks_waiting + 1, pool=self.name)
+        try:
+            # anyio copies the context into the worker, so QueryStats still applies
+            return await anyio.to_thread.run_sync(call, limiter=self.limiter)
+        finally:
+            stats = self.limiter.statistics()
+            executor_pool_queued.set(stats.tasks_waiting, pool=self.name)
+            executor_pool_busy.set(stats.borrowed_tokens, pool=self.name)
+
+
+_pools: Dict[str, ExecutorPool] = {}
+
+
+def _configured_pools() -> Dict[str, Tuple[int, int]]:
+    pools = dict(DEFAULT_EXECUTOR_POOLS)
+    pools.update(parse_executor_pools(os.getenv("EXECUTOR_POOLS", "")))
+    return pools
+
+
+def get_executor_pool(name: str) -> ExecutorPool:
+    """
+    Get (creating on first use) a named executor pool.
+
+    Raises:
+        ValueError: If the pool is not configured
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        configured = _configured_pools()
+        if name not in configured:
+            raise ValueError(f"Executor pool '{name}' not configured. Available: {list(configured.keys())}")
+        size, queue_size = configured[name]
+        pool = _pools[name] = ExecutorPool(name, size, queue_size)
+    return pool
+
+
+def run_in_executor(pool_name: str) -> Callable:
+    """
+    Run a sync route handler on a named executor pool instead of the shared
+    default threadpool.
+
+    Usage:
+        @router.post("/cart/{user_id}/add")
+        @run_in_executor("cart")
+        def add_to_cart(...):
+            ...
+
+    functools.wraps keeps __wrapped__, so FastAPI still reads the handler's
+    parameters and dependencies from the original signature.
+    """
+    pool = get_executor_pool(pool_name)
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await pool.run(fn, *args, **kwargs)
+
+        wrapper.executor_pool = pool_name
+        return wrapper
+
+    return decorator
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Tuple
+
+import anyio.to_thread
+
+from configs.cache import make_cache
+from utils.auth_utils import bearer_user_id
+from utils.metrics import REGISTRY
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+# A crashed worker's in-flight marker stops blocking retries after this long
+IDEMPOTENCY_IN_FLIGHT_TTL = float(os.getenv("IDEMPOTENCY_IN_FLIGHT_TTL", "60"))
+
+# (method, path regex) of the writes that honour Idempotency-Key
+IDEMPOTENT_ROUTES = (
+    ("POST", r"/api/v1/orders"),
+    ("POST", r"/api/v1/cart/[^/]+/add"),
+)
+
+idempotency_requests_total = REGISTRY.counter(
+    "idempotency_requests_total", "Requests carrying an Idempotency-Key by outcome.", ("outcome",)
+)
+
+
+def _json_response(status: int, detail: str) -> Tuple[int, list, bytes]:
+    body = json.dumps({"detail": detail}).encode()
+    return status, [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())], body
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware replaying the stored response for a repeated Idempotency-Key.
+
+    Keys are scoped to the route and the token's user_id (a refreshed token
+    still replays) and bound to a hash of the request body; requests without
+    a valid token pass straight through. The first request marks the key
+    in-flight; duplicates arriving meanwhile in this process wait for its
+    result, while duplicates on other workers (shared cache backend) get 409.
+    Completed non-5xx responses are kept for IDEMPOTENCY_TTL and replayed
+    without re-running the handler; 429 and 5xx responses release the key for
+    retry.
+    """
+
+    def __init__(self, app, routes: Iterable[Tuple[str, str]] = IDEMPOTENT_ROUTES, store=None):
+        self.app = app
+        self.routes = [(method, re.compile(pattern)) for method, pattern in routes]
+        self.store = store or make_cache("idempotency", IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_KEYS)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _applies(self, scope) -> bool:
+        return any(method == scope["method"] and pattern.fullmatch(scope["path"]) for method, pattern in self.routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers", []))
+        idempotency_key = headers.get(b"idempotency-key")
+        user_id = bearer_user_id(headers)
+        if not idempotency_key or user_id is None:
+            # Unauthenticated requests are rejected by the route without side effects
+            await self.app(scope, receive, send)
+            return
+
+        body, more_messages = await self._read_body(receive)
+        key = f"{scope['method']} {scope['path']}|{user_id}|{idempotency_key.decode('latin-1')}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        # Same key already running in this process: wait, then answer from the store
+        while key in self._in_flight:
+            idempotency_requests_total.inc(outcome="waited")
+            await asyncio.shield(self._in_flight[key])
+
+        # Claimed before the first await, so later duplicates in this process queue up behind it
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            await self._handle(key, fingerprint, scope, self._replay_receive(body, more_messages, receive), send)
+        finally:
+            del self._in_flight[key]
+            future.set_result(None)
+
+    async def _handle(self, key: str, fingerprint: str, scope, receive, send) -> None:
+        record = await self._store(self.store.get, key)
+        if record is not None:
+            if record["fingerprint"] != fingerprint:
+                idempotency_requests_total.inc(outcome="mismatch")
+                await self._send(send, *_json_response(422, "Idempotency-Key was already used with a different request body"))
+            elif record.get("in_flight"):
+                # Running on another worker
+                idempotency_requests_total.inc(outcome="conflict")
+                await self._send(send, *_json_response(409, "A request with this Idempotency-Key is still being processed"))
+            else:
+                idempotency_requests_total.inc(outcome="replayed")
+                headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["headers"]]
+                headers.append((b"idempotent-replayed", b"true"))
+                await self._send(send, record["status"], headers, record["body"])
+            return
+
+        await self._store(self.store.set, key, {"fingerprint": fingerprint, "in_flight": True}, IDEMPOTENCY_IN_FLIGHT_TTL)
+        idempotency_requests_total.inc(outcome="executed")
+
+        response = {"status": 500, "headers": [], "body": b""}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Throttled (429) and server-error responses leave the key free for a retry
+            if response["status"] < 500 and response["status"] != 429:
+                await self._store(self.store.set, key, {"fingerprint": fingerprint, **response})
+            else:
+                await self._store(self.store.delete, key)
+
+    async def _store(self, method, *args) -> Any:
+        # A shared (Redis) store is a network round trip: keep it off the event loop
+        if self.store.blocking:
+            return await anyio.to_thread.run_sync(method, *args)
+        return method(*args)
+
+    @staticmethod
+    async def _read_body(receive) -> Tuple[bytes, list]:
+        chunks, messages = [], []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away before sending the whole body
+                messages.append(message)
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks), messages
+
+    @staticmethod
+    def _replay_receive(body: bytes, extra: list, receive):
+        pending = [{"type": "http.request", "body": body, "more_body": False}] + extra
+
+        async def replay():
+            if pending:
+                return pending.pop(0)
+            return await receive()
+
+        return replay
+
+    @staticmethod
+    async def _send(send, status: int, headers: list, body: bytes) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,39 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# handler(ids, operation): ids is None when every document may have changed
+InvalidationHandler = Callable[[Optional[List[str]], str], None]
+
+_handlers: Dict[str, List[InvalidationHandler]] = {}
+_lock = threading.Lock()
+
+
+def subscribe(collection: str, handler: InvalidationHandler) -> None:
+    """Register a handler for changes to documents in a collection."""
+    with _lock:
+        _handlers.setdefault(collection, []).append(handler)
+
+
+def unsubscribe(collection: str, handler: InvalidationHandler) -> None:
+    with _lock:
+        if handler in _handlers.get(collection, []):
+            _handlers[collection].remove(handler)
+
+
+def publish(collection: str, ids: Optional[List[str]], operation: str = "update") -> None:
+    """
+    Notify every subscriber that documents in a collection changed.
+
+    Handlers run synchronously on the caller's thread; a failing handler is
+    logged and does not stop the others.
+    """
+    with _lock:
+        handlers = list(_handlers.get(collection, []))
+    for handler in handlers:
+        try:
+            handler(ids, operation)
+        except Exception:
+            logger.exception("Invalidation handler %r failed for %s", handler, collection)
@@ -0,0 +1,369 @@
+import logging
+import os
+import random
+import threading
+from datetime import datetime, UTC
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from configs.database import product_collection, stock_shards_collection
+from factories.cache_factory import TTLCache
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Sharded stock totals are summed on read and may be this many seconds stale
+INVENTORY_READ_TTL = float(os.getenv("INVENTORY_READ_TTL", "1"))
+INVENTORY_REBALANCE_INTERVAL = float(os.getenv("INVENTORY_REBALANCE_INTERVAL", "5"))
+# Rebalance once the emptiest shard holds less than this fraction of its fair share
+INVENTORY_REBALANCE_THRESHOLD = float(os.getenv("INVENTORY_REBALANCE_THRESHOLD", "0.25"))
+MAX_STOCK_SHARDS = 64
+
+inventory_decrements_total = REGISTRY.counter(
+    "inventory_decrements_total", "Stock reservations by storage mode and outcome.", ("mode", "outcome")
+)
+inventory_shard_fallbacks_total = REGISTRY.counter(
+    "inventory_shard_fallbacks_total", "Reservations that had to try another shard after the first was empty.", ()
+)
+inventory_rebalance_moves_total = REGISTRY.counter(
+    "inventory_rebalance_moves_total", "Units moved between stock shards by the rebalancer.", ()
+)
+inventory_hot_products = REGISTRY.gauge(
+    "inventory_hot_products", "Products whose stock is split across shards.", ()
+)
+
+
+def _shard_id(product_id: str, shard: int) -> str:
+    return f"{product_id}:{shard}"
+
+
+def _split(total: int, shards: int) -> List[int]:
+    base, extra = divmod(max(total, 0), shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+class Inventory:
+    """
+    Stock reservation for plain and sharded ("hot") products.
+
+    A plain product keeps its stock on the product document. A hot product has
+    product.stock pinned at 0 and product.stock_shards = N, and its stock lives
+    in N stock_shards documents; a checkout decrements a random shard with a
+    conditional $inc, so concurrent checkouts of one SKU mostly hit different
+    documents; a quantity no single shard holds is taken across several. Reads sum the shards (cached for INVENTORY_READ_TTL seconds).
+
+    Each worker learns hot products from the products collection on refresh().
+    A worker that hasn't refreshed yet fails against the pinned
+    product.stock = 0 and re-checks the product, so stale knowledge costs one
+    extra read, never an oversell.
+    """
+
+    def __init__(self, products=product_collection, shards=stock_shards_collection):
+        self.products = products
+        self.shards = shards
+        self._hot: Dict[str, int] = {}
+        self._totals = TTLCache(INVENTORY_READ_TTL, 10_000)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- hot product registry ----
+
+    def is_hot(self, product_id: str) -> bool:
+        return product_id in self._hot
+
+    def refresh(self) -> None:
+        """Reload which products are sharded."""
+        hot = {str(doc["_id"]): doc["stock_shards"]
+               for doc in self.products.find({"stock_shards": {"$exists": True}}, {"stock_shards": 1})}
+        with self._lock:
+            self._hot = hot
+        inventory_hot_products.set(len(hot))
+
+    def learn(self, product_id: str) -> bool:
+        """Re-check whether one product is sharded (e.g. after a failed plain write); True if it is."""
+        doc = self.products.find_one({"_id": ObjectId(product_id), "stock_shards": {"$exists": True}}, {"stock_shards": 1})
+        if doc is None:
+            return False
+        with self._lock:
+            self._hot[product_id] = doc["stock_shards"]
+        return True
+
+    # ---- reservations ----
+
+    def decrement(self, product_id: str, quantity: int = 1) -> bool:
+        """Reserve quantity units; False if there isn't enough stock (or no such product)."""
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        # Read once: disable/forget/refresh may drop the product from _hot concurrently
+        shards = self._hot.get(product_id)
+        if shards is None:
+            res = self.products.update_one(
+                {"_id": ObjectId(product_id), "stock": {"$gte": quantity}},
+                {"$inc": {"stock": -quantity}, "$set": {"updated_at": datetime.now(UTC)}}
+            )
+            if res.modified_count:
+                inventory_decrements_total.inc(mode="plain", outcome="reserved")
+                return True
+            shards = self._hot.get(product_id) if self.learn(product_id) else None
+            if shards is None:
+                inventory_decrements_total.inc(mode="plain", outcome="insufficient")
+                return False
+
+        order = list(range(shards))
+        random.shuffle(order)
+        for attempt, shard in enumerate(order):
+            res = self.shards.update_one(
+                {"_id": _shard_id(product_id, shard), "stock": {"$gte": quantity}},
+                {"$inc": {"stock": -quantity}}
+            )
+            if res.modified_count:
+                if attempt:
+                    inventory_shard_fallbacks_total.inc()
+                inventory_decrements_total.inc(mode="sharded", outcome="reserved")
+                self._totals.delete(product_id)
+                return True
+        # No single shard can cover it: a quantity > 1 may still fit across several
+        if quantity > 1 and self._take_across_shards(product_id, quantity):
+            inventory_shard_fallbacks_total.inc()
+            inventory_decrements_total.inc(mode="sharded", outcome="reserved")
+            self._totals.delete(product_id)
+            return True
+        inventory_decrements_total.inc(mode="sharded", outcome="insufficient")
+        return False
+
+    def _take_across_shards(self, product_id: str, quantity: int) -> bool:
+        """
+        Take quantity units from several shards, fullest first, with one
+        conditional $inc each; all or nothing. Shards drained by checkouts
+        since the read are re-read, and if the shards no longer add up to
+        quantity whatever was taken is put back.
+        """
+        taken: Dict[int, int] = {}
+        need = quantity
+        stocks = self._shard_stocks(product_id)
+        while 0 < need <= sum(stocks.values()):
+            missed = False
+            for shard, available in sorted(stocks.items(), key=lambda item: item[1], reverse=True):
+                take = min(available, need)
+                if take <= 0:
+                    break
+                res = self.shards.update_one(
+                    {"_id": _shard_id(product_id, shard), "stock": {"$gte": take}},
+                    {"$inc": {"stock": -take}}
+                )
+                if res.modified_count:
+                    taken[shard] = taken.get(shard, 0) + take
+                    need -= take
+                else:
+                    missed = True
+            if not need or not missed:
+                break
+            stocks = self._shard_stocks(product_id)
+        if need:
+            for shard, amount in taken.items():
+                self.shards.update_one({"_id": _shard_id(product_id, shard)}, {"$inc": {"stock": amount}})
+        return not need
+
+    def release(self, product_id: str, quantity: int = 1) -> None:
+        """Return previously reserved units (compensation or cancellation)."""
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        shards = self._hot.get(product_id)
+        if shards is None:
+            self.products.update_one(
+                {"_id": ObjectId(product_id)},
+                {"$inc": {"stock": quantity}, "$set": {"updated_at": datetime.now(UTC)}}
+            )
+            return
+        self.shards.update_one({"_id": _shard_id(product_id, random.randrange(shards))}, {"$inc": {"stock": quantity}})
+        self._totals.delete(product_id)
+
+    # ---- reads ----
+
+    def available(self, product_id: str) -> Optional[int]:
+        """Summed stock of a hot product (None for plain products)."""
+        if not self.is_hot(product_id):
+            return None
+        total = self._totals.get(product_id)
+        if total is None:
+            total = sum(doc.get("stock", 0) for doc in self.shards.find({"product_id": product_id}, {"stock": 1}))
+            self._totals.set(product_id, total)
+        return total
+
+    def overlay(self, products: Iterable[Dict]) -> None:
+        """Replace the pinned stock of hot products in formatted product dicts with their shard sums."""
+        for product in products:
+            total = self.available(product.get("id", ""))
+            if total is not None:
+                product["stock"] = total
+
+    # ---- admin ----
+
+    def enable(self, product_id: str, shards: int) -> int:
+        """
+        Move a product's stock into shards (or re-split an already sharded one).
+
+        Returns:
+            The total stock now held by the shards
+
+        Raises:
+            ValueError: If shards is out of range or the product doesn't exist
+        """
+        if not 1 <= shards <= MAX_STOCK_SHARDS:
+            raise ValueError(f"shards must be between 1 and {MAX_STOCK_SHARDS}")
+        if self.is_hot(product_id) or self.learn(product_id):
+            # Re-split: fold the old shards back into product.stock first
+            self.disable(product_id)
+
+        # Create empty shards first so a reservation racing the move can only fail, not oversell
+        self.shards.bulk_write([
+            UpdateOne({"_id": _shard_id(product_id, i)}, {"$setOnInsert": {"product_id": product_id, "shard": i, "stock": 0}}, upsert=True)
+            for i in range(shards)
+        ], ordered=False)
+        before = self.products.find_one_and_update(
+            {"_id": ObjectId(product_id)},
+            {"$set": {"stock": 0, "stock_shards": shards, "updated_at": datetime.now(UTC)}},
+            projection={"stock": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            self.shards.delete_many({"product_id": product_id})
+            raise ValueError(f"Product {product_id} not found")
+        total = before.get("stock", 0)
+        requests = [UpdateOne({"_id": _shard_id(product_id, i)}, {"$inc": {"stock": amount}})
+                    for i, amount in enumerate(_split(total, shards)) if amount]
+        if requests:
+            self.shards.bulk_write(requests, ordered=False)
+        with self._lock:
+            self._hot[product_id] = shards
+        self._totals.delete(product_id)
+        inventory_hot_products.set(len(self._hot))
+        return total
+
+    def disable(self, product_id: str) -> int:
+        """Fold a hot product's shards back into product.stock; returns the stock moved."""
+        total = 0
+        for doc in list(self.shards.find({"product_id": product_id}, {"_id": 1})):
+            removed = self.shards.find_one_and_delete({"_id": doc["_id"]})
+            total += (removed or {}).get("stock", 0)
+        self.products.update_one(
+            {"_id": ObjectId(product_id)},
+            {"$inc": {"stock": total}, "$unset": {"stock_shards": ""}, "$set": {"updated_at": datetime.now(UTC)}}
+        )
+        with self._lock:
+            self._hot.pop(product_id, None)
+        self._totals.delete(product_id)
+        inventory_hot_products.set(len(self._hot))
+        return total
+
+    def forget(self, product_id: str) -> None:
+        """Drop the shards of a deleted product."""
+        self.shards.delete_many({"product_id": product_id})
+        with self._lock:
+            self._hot.pop(product_id, None)
+        self._totals.delete(product_id)
+
+    def _shard_stocks(self, product_id: str) -> Dict[int, int]:
+        return {doc["shard"]: doc.get("stock", 0) for doc in self.shards.find({"product_id": product_id}, {"shard": 1, "stock": 1})}
+
+    def set_stock(self, product_id: str, stock: int) -> None:
+        """
+        Admin stock edit for a hot product: adjust the shards by the difference
+        from their current sum (read fresh, not the cached total). A reduction
+        is one conditional $inc per shard, fullest first; shards drained by
+        checkouts since the read are re-read and the rest taken from them.
+        """
+        self._totals.delete(product_id)
+        stocks = self._shard_stocks(product_id)
+        delta = stock - sum(stocks.values())
+        if delta > 0:
+            self.release(product_id, delta)
+            return
+        need = -delta
+        while need > 0 and any(stocks.values()):
+            missed = False
+            for shard, available in sorted(stocks.items(), key=lambda item: item[1], reverse=True):
+                take = min(available, need)
+                if take <= 0:
+                    break
+                res = self.shards.update_one(
+                    {"_id": _shard_id(product_id, shard), "stock": {"$gte": take}},
+                    {"$inc": {"stock": -take}}
+                )
+                if res.modified_count:
+                    need -= take
+                else:
+                    missed = True
+            if not missed:
+                break
+            stocks = self._shard_stocks(product_id)
+        self._totals.delete(product_id)
+
+    # ---- rebalancing ----
+
+    def rebalance(self, product_id: str) -> int:
+        """Even out a hot product's shards when one runs low; returns units moved."""
+        shards = self._hot.get(product_id)
+        if not shards or shards < 2:
+            return 0
+        stocks = self._shard_stocks(product_id)
+        total = sum(stocks.values())
+        fair = total / shards
+        if total == 0 or min(stocks.get(i, 0) for i in range(shards)) >= fair * INVENTORY_REBALANCE_THRESHOLD:
+            return 0
+
+        targets = _split(total, shards)
+        moved = 0
+        for shard in range(shards):
+            surplus = stocks.get(shard, 0) - targets[shard]
+            if surplus <= 0:
+                continue
+            # Conditional take: checkouts may have drained this shard since we read it
+            res = self.shards.update_one(
+                {"_id": _shard_id(product_id, shard), "stock": {"$gte": surplus}},
+                {"$inc": {"stock": -surplus}}
+            )
+            if not res.modified_count:
+                continue
+            for poor in range(shards):
+                deficit = targets[poor] - stocks.get(poor, 0)
+                give = min(deficit, surplus)
+                if give <= 0:
+                    continue
+                self.shards.update_one({"_id": _shard_id(product_id, poor)}, {"$inc": {"stock": give}})
+                stocks[poor] = stocks.get(poor, 0) + give
+                surplus -= give
+                moved += give
+                if not surplus:
+                    break
+            if surplus:
+                self.shards.update_one({"_id": _shard_id(product_id, shard)}, {"$inc": {"stock": surplus}})
+        inventory_rebalance_moves_total.inc(moved)
+        return moved
+
+    def start(self) -> None:
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="inventory-rebalancer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(INVENTORY_REBALANCE_INTERVAL):
+            try:
+                self.refresh()
+                for product_id in list(self._hot):
+                    self.rebalance(product_id)
+            except Exception:
+                logger.exception("Stock shard rebalance failed")
+
+
+inventory = Inventory()
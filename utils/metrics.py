@@ -0,0 +1,371 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+
+# Default latency buckets (seconds), tuned for HTTP handlers and Mongo commands
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Base class for a labelled metric family.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Render the metric family in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing counter.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """
+    Cumulative histogram with fixed bucket boundaries.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += hits
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of metric families rendered at /metrics.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+http_requests_total = REGISTRY.counter(
+    "http_requests_total", "Total HTTP requests by route, method and status.", ("method", "route", "status")
+)
+http_request_duration_seconds = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and method.", ("method", "route")
+)
+http_requests_in_progress = REGISTRY.gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled.", ("method",)
+)
+mongo_commands_total = REGISTRY.counter(
+    "mongo_commands_total", "MongoDB commands by collection, command and outcome.", ("collection", "command", "outcome")
+)
+mongo_command_duration_seconds = REGISTRY.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection and command.", ("collection", "command")
+)
+mongo_pool_checkout_wait_seconds = REGISTRY.histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool.", ("address",)
+)
+mongo_pool_checkout_failures_total = REGISTRY.counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts by reason.", ("address", "reason")
+)
+mongo_pool_connections_in_use = REGISTRY.gauge(
+    "mongo_pool_connections_in_use", "Connections currently checked out of the pool.", ("address",)
+)
+
+
+_route_paths: Dict[object, str] = {}
+
+
+def route_template(scope) -> str:
+    """Resolve the matched route's path template for a handled ASGI scope."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        app = scope.get("app")
+        for route in getattr(getattr(app, "router", None), "routes", []):
+            if getattr(route, "endpoint", None) is endpoint:
+                path = route.path
+                break
+        else:
+            path = getattr(endpoint, "__name__", "unknown")
+        _route_paths[endpoint] = path
+    return path
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request count, status and latency.
+
+    Routes are labelled by their path template (e.g. /api/v1/product/{id}) so
+    the label cardinality stays bounded by the number of declared routes.
+    """
+
+    def __init__(self, app, skip_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec(method=method)
+            route = route_template(scope)
+            http_requests_total.inc(method=method, route=route, status=status_holder["status"])
+            http_request_duration_seconds.observe(elapsed, method=method, route=route)
+
+def command_collection(command_name: str, command: Dict) -> str:
+    """Extract the target collection from a command document, if any."""
+    value = command.get(command_name)
+    if isinstance(value, str):
+        return value
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+    return ""
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener recording per-collection, per-command counts and durations.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def _event_key(self, event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        with self._lock:
+            self._pending[self._event_key(event)] = command_collection(event.command_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, "failure")
+
+    def _record(self, event, outcome: str) -> None:
+        with self._lock:
+            collection = self._pending.pop(self._event_key(event), "")
+        command = event.command_name
+        mongo_commands_total.inc(collection=collection, command=command, outcome=outcome)
+        mongo_command_duration_seconds.observe(event.duration_micros / 1_000_000, collection=collection, command=command)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    pymongo pool listener recording checkout wait time and connections in use.
+    """
+
+    def _address(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_checked_out(self, event) -> None:
+        address = self._address(event)
+        mongo_pool_connections_in_use.inc(address=address)
+        if event.duration is not None:
+            mongo_pool_checkout_wait_seconds.observe(event.duration, address=address)
+
+    def connection_check_out_failed(self, event) -> None:
+        mongo_pool_checkout_failures_total.inc(address=self._address(event), reason=event.reason)
+
+    def connection_checked_in(self, event) -> None:
+        mongo_pool_connections_in_use.dec(address=self._address(event))
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+
+def mongo_event_listeners() -> List:
+    """Listeners to pass to MongoClient(event_listeners=...)."""
+    return [MongoCommandMetrics(), MongoPoolMetrics()]
+
+
+def render_metrics(registry: Optional[MetricsRegistry] = None) -> str:
+    return (registry or REGISTRY).render()
@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, Optional
+
+from configs.database import order_collection, orders_archive_collection
+from factories.archive_factory import ArchiveFactory, BaseOrderArchive, empty_totals
+from utils import invalidation
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ORDER_ARCHIVE_ENABLED = os.getenv("ORDER_ARCHIVE_ENABLED", "false").lower() == "true"
+# "collection" (orders_archive) or "segments" (gzip NDJSON files under ORDER_ARCHIVE_DIR)
+ORDER_ARCHIVE_BACKEND = os.getenv("ORDER_ARCHIVE_BACKEND", "collection")
+ORDER_ARCHIVE_DIR = os.path.abspath(os.getenv("ORDER_ARCHIVE_DIR", "data/order_archive"))
+ORDER_ARCHIVE_AGE_DAYS = float(os.getenv("ORDER_ARCHIVE_AGE_DAYS", "180"))
+ORDER_ARCHIVE_BATCH = int(os.getenv("ORDER_ARCHIVE_BATCH", "1000"))
+ORDER_ARCHIVE_INTERVAL = float(os.getenv("ORDER_ARCHIVE_INTERVAL", "3600"))
+# Orders per second moved, so archival never competes with checkout
+ORDER_ARCHIVE_RATE = float(os.getenv("ORDER_ARCHIVE_RATE", "2000"))
+
+# Only orders that can no longer change are archived
+TERMINAL_STATUSES = ["Delivered", "Cancelled"]
+
+order_archive_moved_total = REGISTRY.counter(
+    "order_archive_moved_total", "Orders moved from the hot collection to the archive.", ()
+)
+order_archive_run_seconds = REGISTRY.histogram(
+    "order_archive_run_seconds", "Duration of one archival run.", (), buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900)
+)
+order_archive_reads_total = REGISTRY.counter(
+    "order_archive_reads_total", "Order reads that fell through to the archive by result.", ("result",)
+)
+
+
+def make_archive(backend: str = ORDER_ARCHIVE_BACKEND) -> BaseOrderArchive:
+    if backend == "segments":
+        return ArchiveFactory().create("segments", directory=ORDER_ARCHIVE_DIR)
+    return ArchiveFactory().create(backend, collection=orders_archive_collection)
+
+
+class OrderArchiver:
+    """
+    Moves old orders in a terminal status out of the hot orders collection.
+
+    Each batch is written to the archive first and only then deleted from
+    orders (with the same age/status filter), so a crash in between leaves a
+    duplicate that the next run re-archives idempotently, never a lost order.
+    """
+
+    def __init__(self, archive: BaseOrderArchive, orders=order_collection, batch_size: int = ORDER_ARCHIVE_BATCH,
+                 rate: float = ORDER_ARCHIVE_RATE):
+        self.archive = archive
+        self.orders = orders
+        self.batch_size = batch_size
+        self.rate = rate
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: datetime = None) -> int:
+        """Archive every eligible order; returns how many were moved."""
+        start = time.perf_counter()
+        cutoff = (now or datetime.now(UTC)) - timedelta(days=ORDER_ARCHIVE_AGE_DAYS)
+        query = {"status": {"$in": TERMINAL_STATUSES}, "created_at": {"$lt": cutoff}}
+        moved = 0
+        while not self._stop.is_set():
+            batch_start = time.perf_counter()
+            batch = list(self.orders.find(query).limit(self.batch_size))
+            if not batch:
+                break
+            self.archive.write(batch)
+            # Only what the delete removed counts: an order changed meanwhile stays (and is still archived)
+            deleted = self.orders.delete_many({"_id": {"$in": [order["_id"] for order in batch]}, **query}).deleted_count
+            moved += deleted
+            order_archive_moved_total.inc(deleted)
+            if len(batch) < self.batch_size:
+                break
+            if self.rate > 0:
+                self._stop.wait(max(0.0, len(batch) / self.rate - (time.perf_counter() - batch_start)))
+        order_archive_run_seconds.observe(time.perf_counter() - start)
+        if moved:
+            logger.info("Archived %d orders older than %s", moved, cutoff.isoformat())
+            invalidation.publish("orders", None, "archive")
+        return moved
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(ORDER_ARCHIVE_INTERVAL):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Order archival failed")
+
+
+order_archive: Optional[BaseOrderArchive] = make_archive() if ORDER_ARCHIVE_ENABLED else None
+order_archiver: Optional[OrderArchiver] = OrderArchiver(order_archive) if order_archive is not None else None
+
+
+def get_order_archive() -> Optional[BaseOrderArchive]:
+    """The configured archive, or None when archival is disabled."""
+    return order_archive
+
+
+def delete_archived_order(order_id: str) -> bool:
+    """Remove an order from the archive; False if it isn't archived (or archival is disabled)."""
+    return order_archive is not None and order_archive.delete(order_id)
+
+
+def archived_totals() -> Dict:
+    """Order count, per-status counts and revenue of the archive (zeros when archival is disabled)."""
+    return order_archive.totals() if order_archive is not None else empty_totals()
+
+
+def find_archived_order(order_id: str) -> Optional[Dict]:
+    """Archived order by id, or None (also when archival is disabled)."""
+    if order_archive is None:
+        return None
+    order = order_archive.find_by_id(order_id)
+    order_archive_reads_total.inc(result="hit" if order else "miss")
+    return order
+
+
+def find_archived_orders(user_id: str) -> List[Dict]:
+    """Archived orders of a user ([] when archival is disabled)."""
+    if order_archive is None:
+        return []
+    return order_archive.find_by_user(user_id)
@@ -0,0 +1,352 @@
+import glob
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, UTC
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId, json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from utils.metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ORDER_WRITE_BEHIND = os.getenv("ORDER_WRITE_BEHIND", "false").lower() == "true"
+# Each worker claims its own log next to this path (order_queue.0.log, order_queue.1.log, ...)
+ORDER_QUEUE_PATH = os.path.abspath(os.getenv("ORDER_QUEUE_PATH", "data/order_queue.log"))
+ORDER_QUEUE_BATCH_SIZE = int(os.getenv("ORDER_QUEUE_BATCH_SIZE", "500"))
+ORDER_QUEUE_FLUSH_INTERVAL = float(os.getenv("ORDER_QUEUE_FLUSH_INTERVAL", "0.05"))
+# fsync every append; turning it off trades crash durability for latency
+ORDER_QUEUE_FSYNC = os.getenv("ORDER_QUEUE_FSYNC", "true").lower() == "true"
+# Rewrite the log with only the pending orders once it holds this many records
+ORDER_QUEUE_COMPACT_RECORDS = int(os.getenv("ORDER_QUEUE_COMPACT_RECORDS", "10000"))
+
+_DUPLICATE_KEY = 11000
+# created_at comes back as an aware UTC datetime, as enqueued
+_LOG_JSON = json_util.JSONOptions(tz_aware=True, tzinfo=UTC)
+
+order_queue_depth = REGISTRY.gauge(
+    "order_queue_depth", "Orders acknowledged but not yet written to MongoDB.", ()
+)
+order_queue_flush_seconds = REGISTRY.histogram(
+    "order_queue_flush_seconds", "Time to write one batch of queued orders and clear their carts.", ()
+)
+order_queue_batch_size = REGISTRY.histogram(
+    "order_queue_batch_size", "Orders written per flush.", (), buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+order_queue_flush_failures_total = REGISTRY.counter(
+    "order_queue_flush_failures_total", "Flushes that failed and will be retried.", ()
+)
+
+
+class OrderQueue:
+    """
+    Write-behind queue for placed orders.
+
+    enqueue() appends the order to a local append-only log (fsynced) and keeps
+    it in memory; the request is acknowledged as soon as that returns. A
+    background thread writes batches with insert_many and clears the ordering
+    users' carts with one bulk_write, leaving carts changed since the order.
+    Orders carry their _id from the start, so replaying the log after a crash
+    is idempotent: already-written orders come back as duplicate-key errors
+    and are skipped.
+
+    Log lines are either an order document or {"ack": [ids]} written after a
+    successful flush; the log is truncated whenever the queue drains and
+    compacted down to the pending orders once it holds compact_records lines.
+
+    Every worker process owns one log slot (order_queue.<n>.log next to
+    ORDER_QUEUE_PATH), claimed with an exclusive lock on its .lock file. The
+    lock dies with the process, so a restarted worker reclaims and replays a
+    crashed worker's slot, and slots nobody holds (fewer workers than before)
+    are adopted by the first worker that finds them.
+    """
+
+    def __init__(self, order_collection, cart_collection, path: str = ORDER_QUEUE_PATH,
+                 batch_size: int = ORDER_QUEUE_BATCH_SIZE, flush_interval: float = ORDER_QUEUE_FLUSH_INTERVAL,
+                 fsync: bool = ORDER_QUEUE_FSYNC, compact_records: int = ORDER_QUEUE_COMPACT_RECORDS):
+        self.order_collection = order_collection
+        self.cart_collection = cart_collection
+        self.base_path = path
+        self.path: Optional[str] = None
+        self.compact_records = compact_records
+        self._records = 0
+        self._slot_lock = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+    # ---- log ----
+
+    def _slot_path(self, slot: int) -> str:
+        root, ext = os.path.splitext(self.base_path)
+        return f"{root}.{slot}{ext or '.log'}"
+
+    @staticmethod
+    def _try_lock(path: str):
+        """Exclusive non-blocking lock on path + '.lock'; the open lock file, or None if another process holds it."""
+        lock = open(path + ".lock", "a")
+        if fcntl is None:
+            return lock
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return None
+        return lock
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        slot = 0
+        while self._slot_lock is None:
+            self.path = self._slot_path(slot)
+            self._slot_lock = self._try_lock(self.path)
+            slot += 1
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _append(self, record: Dict) -> None:
+        self._file.write(json_util.dumps(record) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._records += 1
+
+    def _rewrite(self) -> None:
+        """Replace the log with one record per pending order (caller holds _lock)."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            for order in self._pending.values():
+                out.write(json_util.dumps(order) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        self._file.close()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._records = len(self._pending)
+
+    def _read_log(self, path: str) -> "OrderedDict[str, Dict]":
+        orders: "OrderedDict[str, Dict]" = OrderedDict()
+        with open(path, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    record = json_util.loads(line, json_options=_LOG_JSON)
+                except ValueError:
+                    # Torn final write from a crash mid-append
+                    logger.warning("Skipping unreadable order queue record in %s", path)
+                    continue
+                if "ack" in record:
+                    for order_id in record["ack"]:
+                        orders.pop(order_id, None)
+                else:
+                    orders[str(record["_id"])] = record
+        return orders
+
+    def recover(self) -> int:
+        """Reload orders this slot's log holds but no flush acknowledged; returns how many."""
+        recovered = self._read_log(self.path) if os.path.exists(self.path) else OrderedDict()
+        with self._lock:
+            for order_id, order in recovered.items():
+                self._pending.setdefault(order_id, order)
+            self._rewrite()
+            order_queue_depth.set(len(self._pending))
+        if recovered:
+            logger.info("Recovered %d queued orders from %s", len(recovered), self.path)
+        return len(recovered) + self.adopt_orphans()
+
+    def adopt_orphans(self) -> int:
+        """Move pending orders out of slot logs no live worker holds into this one; returns how many."""
+        root, ext = os.path.splitext(self.base_path)
+        adopted = 0
+        # Slot logs, plus the single shared log of older versions
+        candidates = glob.glob(f"{glob.escape(root)}.*{ext or '.log'}") + [self.base_path]
+        for path in candidates:
+            if path == self.path or not os.path.exists(path) or not os.path.getsize(path):
+                continue
+            lock = self._try_lock(path)
+            if lock is None:
+                continue
+            try:
+                orders = self._read_log(path)
+                with self._lock:
+                    for order_id, order in orders.items():
+                        self._pending.setdefault(order_id, order)
+                    # Durable in our log before the orphan is emptied
+                    self._rewrite()
+                    order_queue_depth.set(len(self._pending))
+                open(path, "w").close()
+                adopted += len(orders)
+                if orders:
+                    logger.info("Adopted %d queued orders from %s", len(orders), path)
+            finally:
+                lock.close()
+        return adopted
+
+    # ---- API ----
+
+    def enqueue(self, order: Dict) -> str:
+        """Durably queue an order document (assigning its _id); returns the id."""
+        order.setdefault("_id", ObjectId())
+        order_id = str(order["_id"])
+        with self._lock:
+            self._append(order)
+            self._pending[order_id] = order
+            order_queue_depth.set(len(self._pending))
+        self._wakeup.set()
+        return order_id
+
+    def get(self, order_id: str) -> Optional[Dict]:
+        """An order still waiting to be written, if any."""
+        with self._lock:
+            order = self._pending.get(order_id)
+            return dict(order) if order is not None else None
+
+    def pending_for_user(self, user_id: str) -> List[Dict]:
+        with self._lock:
+            return [dict(o) for o in self._pending.values() if o.get("user_id") == user_id]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # ---- worker ----
+
+    def start(self) -> None:
+        self._open()
+        self.recover()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the worker after draining what it can within timeout."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._slot_lock is not None:
+            self._slot_lock.close()
+            self._slot_lock = None
+
+    def _run(self) -> None:
+        backoff = self.flush_interval
+        while True:
+            stopping = self._stop.is_set()
+            if not self._pending and stopping:
+                return
+            if not self._pending:
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                continue
+            # Let a burst accumulate into one batch
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                backoff = self.flush_interval
+            except Exception:
+                order_queue_flush_failures_total.inc()
+                logger.exception("Order queue flush failed; %d orders still queued", len(self._pending))
+                if stopping:
+                    return
+                backoff = min(backoff * 2, 5.0)
+                self._stop.wait(backoff)
+
+    def flush(self) -> int:
+        """Write one batch of queued orders; returns how many were written."""
+        with self._lock:
+            batch = [dict(order) for order in list(self._pending.values())[: self.batch_size]]
+        if not batch:
+            return 0
+
+        start = time.perf_counter()
+        self._insert(batch)
+        self._clear_carts(batch)
+        order_queue_flush_seconds.observe(time.perf_counter() - start)
+        order_queue_batch_size.observe(len(batch))
+
+        ids = [str(order["_id"]) for order in batch]
+        with self._lock:
+            for order_id in ids:
+                self._pending.pop(order_id, None)
+            if not self._pending:
+                # Nothing left to recover: start the log over
+                self._file.truncate(0)
+                self._file.seek(0)
+                self._records = 0
+            elif self._records >= self.compact_records:
+                # The queue never drained: drop acknowledged orders from the log
+                self._rewrite()
+            else:
+                self._append({"ack": ids})
+            order_queue_depth.set(len(self._pending))
+        return len(batch)
+
+    def _insert(self, batch: List[Dict]) -> None:
+        try:
+            self.order_collection.insert_many(batch, ordered=False)
+        except BulkWriteError as exc:
+            # Replayed orders that were written before a crash are fine
+            errors = [e for e in exc.details.get("writeErrors", []) if e.get("code") != _DUPLICATE_KEY]
+            if errors:
+                raise
+
+    def _clear_carts(self, orders: Iterable[Dict]) -> None:
+        """
+        Empty the ordering users' carts, unless a cart changed after the
+        user's latest order in the batch: a flush (or a replay after a crash)
+        can run well after checkout, and items added since must survive it.
+        """
+        now = datetime.now(UTC)
+        placed: Dict[str, datetime] = {}
+        for order in orders:
+            at = order.get("created_at") or now
+            placed[order["user_id"]] = max(placed.get(order["user_id"], at), at)
+        requests = [
+            UpdateOne({"user_id": user_id, "$or": [{"updated_at": {"$lte": at}}, {"updated_at": {"$exists": False}}]},
+                      {"$set": {"items": [], "updated_at": now}})
+            for user_id, at in placed.items()
+        ]
+        if requests:
+            self.cart_collection.bulk_write(requests, ordered=False)
+
+
+_queue: Optional[OrderQueue] = None
+
+
+def get_order_queue() -> Optional[OrderQueue]:
+    """The running write-behind queue, or None when orders are written inline."""
+    return _queue
+
+
+def start_order_queue(order_collection, cart_collection) -> OrderQueue:
+    """Recover and start the process-wide queue (called from the app lifespan)."""
+    global _queue
+    _queue = OrderQueue(order_collection, cart_collection)
+    _queue.start()
+    return _queue
+
+
+def stop_order_queue() -> None:
+    global _queue
+    if _queue is not None:
+        _queue.stop()
+        _queue = None
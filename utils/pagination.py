@@ -0,0 +1,84 @@
+import base64
+from datetime import UTC
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+from factories.response_factory import ResponseFactory
+
+MAX_PAGE_SIZE = 200
+
+formatter = ResponseFactory().create("formatter", "standard")
+
+# Cursor datetimes come back UTC-aware, like the stored created_at values
+_CURSOR_JSON = json_util.JSONOptions(tz_aware=True, tzinfo=UTC)
+
+
+def parse_sort(sort: str, allowed: List[str]) -> Tuple[str, int]:
+    """'field' sorts ascending, '-field' descending; only fields with a supporting index are allowed."""
+    field, direction = (sort[1:], DESCENDING) if sort.startswith("-") else (sort, ASCENDING)
+    if field not in allowed:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{field}'. Available: {allowed}")
+    return field, direction
+
+
+def encode_cursor(doc: Dict, field: str) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps([doc.get(field), doc["_id"]], json_options=_CURSOR_JSON).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        value, last_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode()), json_options=_CURSOR_JSON)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+
+def _after(field: str, direction: int, value: Any, last_id: Any) -> Dict:
+    """Documents ordered after (value, last_id); null and missing values sort before everything else, as in MongoDB."""
+    op = "$gt" if direction == ASCENDING else "$lt"
+    if field == "_id":
+        return {"_id": {op: last_id}}
+    ties = {field: value, "_id": {op: last_id}}
+    if value is None:
+        # Every non-null value follows the nulls ascending; nothing does descending
+        return {"$or": [ties, {field: {"$ne": None}}]} if direction == ASCENDING else ties
+    after = [{field: {op: value}}, ties]
+    if direction == DESCENDING:
+        after.append({field: None})
+    return {"$or": after}
+
+
+def keyset_page(collection, query: Dict, field: str, direction: int, cursor: Optional[str], limit: int,
+                projection: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a keyset (cursor) pagination ordered by (field, _id).
+
+    The cursor holds the sort value and _id of the previous page's last
+    document, so every page is one index range scan no matter how deep it is
+    (no skip). Returns the documents and the cursor of the next page, or None
+    on the last page.
+    """
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        after = _after(field, direction, value, last_id)
+        query = {"$and": [query, after]} if query else after
+
+    sort = [("_id", direction)] if field == "_id" else [(field, direction), ("_id", direction)]
+    # One extra document tells whether there is a next page
+    docs = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], field)
+
+
+def estimated_total(collection, query: Dict) -> Optional[int]:
+    """Collection size from metadata for unfiltered lists; filtered lists don't get a total (it would mean counting)."""
+    return None if query else collection.estimated_document_count()
+
+
+def paginated(data: List, limit: int, total: Optional[int], next_cursor: Optional[str]) -> Dict:
+    return formatter.paginated_response(data, None, limit, total, next_cursor=next_cursor)
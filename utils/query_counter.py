@@ -0,0 +1,159 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from pymongo import monitoring
+
+from utils.metrics import REGISTRY, route_template
+
+logger = logging.getLogger(__name__)
+
+# Default number of DB round trips a single request may issue before we warn
+DB_ROUNDTRIP_BUDGET = int(os.getenv("DB_ROUNDTRIP_BUDGET", "10"))
+
+
+def _parse_budgets(raw: str) -> Dict[str, int]:
+    """Parse "METHOD /route=N,/route=N" overrides from the environment."""
+    budgets = {}
+    for entry in filter(None, (part.strip() for part in raw.split(","))):
+        route, _, value = entry.rpartition("=")
+        if route and value.isdigit():
+            budgets[route.strip()] = int(value)
+    return budgets
+
+
+# Per-route overrides, keyed by "METHOD /path/template" or just "/path/template"
+DB_ROUNDTRIP_BUDGETS = _parse_budgets(os.getenv("DB_ROUNDTRIP_BUDGETS", ""))
+
+db_calls_per_request = REGISTRY.histogram(
+    "http_request_db_calls", "MongoDB round trips issued per HTTP request.", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+db_budget_exceeded_total = REGISTRY.counter(
+    "http_request_db_budget_exceeded_total", "Requests that exceeded their DB round-trip budget.", ("method", "route")
+)
+
+
+class QueryStats:
+    """
+    DB round trips and time accumulated by the current request.
+    """
+
+    __slots__ = ("calls", "duration", "commands")
+
+    def __init__(self):
+        self.calls = 0
+        self.duration = 0.0
+        self.commands: Dict[str, int] = {}
+
+    def record(self, command: str, seconds: float) -> None:
+        self.calls += 1
+        self.duration += seconds
+        self.commands[command] = self.commands.get(command, 0) + 1
+
+    @property
+    def duration_ms(self) -> float:
+        return round(self.duration * 1000, 3)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats for the request being handled in this context, if any."""
+    return _current_stats.get()
+
+
+class track_queries:
+    """
+    Context manager collecting DB round trips issued inside its block.
+
+    Usage:
+        with track_queries() as stats:
+            ...
+        stats.calls
+    """
+
+    def __enter__(self) -> QueryStats:
+        self.stats = QueryStats()
+        self._token = _current_stats.set(self.stats)
+        return self.stats
+
+    def __exit__(self, *exc) -> None:
+        _current_stats.reset(self._token)
+
+
+class QueryCounterListener(monitoring.CommandListener):
+    """
+    pymongo command listener charging each command to the current request's QueryStats.
+
+    pymongo publishes events on the thread that issued the command, and FastAPI
+    runs sync handlers with a copy of the request context, so the contextvar
+    resolves to the stats object installed by QueryCountMiddleware.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event)
+
+    def _record(self, event) -> None:
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(event.command_name, event.duration_micros / 1_000_000)
+
+
+def budget_for(method: str, route: str) -> int:
+    """Round-trip budget for a route, falling back to DB_ROUNDTRIP_BUDGET."""
+    return DB_ROUNDTRIP_BUDGETS.get(f"{method} {route}", DB_ROUNDTRIP_BUDGETS.get(route, DB_ROUNDTRIP_BUDGET))
+
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware adding X-DB-Calls / X-DB-Time-Ms response headers and
+    warning when a route exceeds its DB round-trip budget.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-calls", str(stats.calls).encode()))
+                headers.append((b"x-db-time-ms", str(stats.duration_ms).encode()))
+                message["headers"] = headers
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats, time.perf_counter() - start)
+
+    def _report(self, scope, stats: QueryStats, elapsed: float) -> None:
+        method = scope["method"]
+        route = route_template(scope)
+        db_calls_per_request.observe(stats.calls, method=method, route=route)
+        budget = budget_for(method, route)
+        if stats.calls > budget:
+            db_budget_exceeded_total.inc(method=method, route=route)
+            logger.warning(
+                "DB round-trip budget exceeded: %s %s db_calls=%d budget=%d db_time_ms=%.3f total_ms=%.3f commands=%s",
+                method, route, stats.calls, budget, stats.duration_ms, elapsed * 1000, stats.commands,
+            )
@@ -0,0 +1,243 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import anyio.to_thread
+
+from utils.auth_utils import bearer_user_id
+from utils.metrics import REGISTRY
+
+rate_limited_total = REGISTRY.counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by route and limit scope.", ("route", "scope")
+)
+rate_limit_buckets = REGISTRY.gauge(
+    "rate_limit_buckets", "Token buckets currently held in memory.", ()
+)
+
+
+class RateLimitRule(NamedTuple):
+    scope: str    # "ip" or "user"
+    rate: float   # tokens refilled per second
+    burst: int    # bucket capacity
+
+
+# Per-route limits, keyed by "METHOD path". bcrypt-bound auth routes and the
+# regex collection scan behind /search-product are the cheapest ways to
+# degrade the whole service, so they are limited by default.
+DEFAULT_RATE_LIMITS: Dict[str, List[RateLimitRule]] = {
+    "POST /api/v1/auth/login": [RateLimitRule("ip", 10 / 60, 10)],
+    "POST /api/v1/auth/register": [RateLimitRule("ip", 5 / 60, 5)],
+    "POST /api/v1/auth/register-admin": [RateLimitRule("ip", 5 / 60, 5)],
+    "POST /api/v1/search-product": [RateLimitRule("ip", 5, 20), RateLimitRule("user", 10, 30)],
+}
+
+
+def parse_rate_limits(raw: str) -> Dict[str, List[RateLimitRule]]:
+    """
+    Parse RATE_LIMITS, e.g.
+    "POST /api/v1/auth/login=ip:0.2:10;POST /api/v1/search-product=ip:5:20,user:10:30"
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in raw.split(";"))):
+        route, _, rules = entry.partition("=")
+        parsed = []
+        for rule in filter(None, rules.split(",")):
+            scope, rate, burst = rule.split(":")
+            parsed.append(RateLimitRule(scope.strip(), float(rate), int(burst)))
+        limits[route.strip()] = parsed
+    return limits
+
+
+class MemoryTokenBucketStore:
+    """
+    In-process token buckets stored as (tokens, last_refill, full_after) tuples in one dict.
+
+    A bucket idle long enough to have refilled completely is indistinguishable
+    from a new one, so the periodic sweep drops it without changing behaviour.
+    """
+
+    # A dict update under a lock: cheap enough to run on the event loop
+    blocking = False
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def acquire(self, buckets: List[Tuple[str, float, int]], cost: float = 1.0) -> List[float]:
+        """
+        Take cost tokens from every (key, rate, burst) bucket, or from none.
+
+        Returns the seconds each bucket needs until it holds enough tokens (0
+        for buckets that could pay); tokens are only taken when all are 0.
+        """
+        now = time.monotonic()
+        with self._lock:
+            refilled = []
+            for key, rate, burst in buckets:
+                tokens, last, _ = self._buckets.get(key, (burst, now, 0.0))
+                refilled.append(min(burst, tokens + (now - last) * rate))
+            waits = [0.0 if tokens >= cost else (cost - tokens) / rate
+                     for tokens, (_, rate, _) in zip(refilled, buckets)]
+            taken = cost if not any(waits) else 0.0
+            for tokens, (key, rate, burst) in zip(refilled, buckets):
+                self._buckets[key] = (tokens - taken, now, burst / rate)
+            if now >= self._next_sweep:
+                self._sweep(now)
+        return waits
+
+    def _sweep(self, now: float) -> None:
+        idle = [k for k, (_, last, full_after) in self._buckets.items() if now - last >= full_after]
+        for key in idle:
+            del self._buckets[key]
+        self._next_sweep = now + self._sweep_interval
+        rate_limit_buckets.set(len(self._buckets))
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Atomic refill of every bucket, then take from all of them only if all can pay;
+# bucket hashes expire once they'd be full again anyway
+_REDIS_TOKEN_BUCKET = """
+local cost = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local tokens, rates, bursts, waits = {}, {}, {}, {}
+local allowed = true
+for i, key in ipairs(KEYS) do
+  local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+  local rate = tonumber(ARGV[1 + 2 * i])
+  local burst = tonumber(ARGV[2 + 2 * i])
+  local ts = tonumber(bucket[2]) or now
+  tokens[i] = math.min(burst, (tonumber(bucket[1]) or burst) + math.max(0, now - ts) * rate)
+  rates[i], bursts[i] = rate, burst
+  if tokens[i] >= cost then
+    waits[i] = '0'
+  else
+    waits[i] = tostring((cost - tokens[i]) / rate)
+    allowed = false
+  end
+end
+for i, key in ipairs(KEYS) do
+  if allowed then tokens[i] = tokens[i] - cost end
+  redis.call('HSET', key, 'tokens', tokens[i], 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil(bursts[i] / rates[i] * 1000))
+end
+return waits
+"""
+
+
+class RedisTokenBucketStore:
+    """
+    Token buckets shared by every worker, evaluated atomically in a Lua script.
+
+    All buckets of one request are checked in the same script (one key per
+    bucket; in Redis Cluster they would need a common hash tag).
+    """
+
+    # A network round trip: the middleware runs acquire in a worker thread
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImportError("RedisTokenBucketStore requires the 'redis' package (pip install redis)") from exc
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def acquire(self, buckets: List[Tuple[str, float, int]], cost: float = 1.0) -> List[float]:
+        args = [cost, time.time()]
+        for _, rate, burst in buckets:
+            args += [rate, burst]
+        waits = self._script(keys=[self.prefix + key for key, _, _ in buckets], args=args)
+        return [float(wait) for wait in waits]
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying per-route token-bucket limits per client IP and
+    per authenticated user. Rejected requests get 429 with Retry-After.
+    """
+
+    def __init__(self, app, limits: Dict[str, List[RateLimitRule]] = None, store=None, trust_forwarded: bool = None):
+        self.app = app
+        if limits is None:
+            # RATE_LIMIT_ENABLED=false or an empty RATE_LIMITS turns limiting off
+            if os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "true":
+                limits = {}
+            elif "RATE_LIMITS" in os.environ:
+                limits = parse_rate_limits(os.environ["RATE_LIMITS"])
+            else:
+                limits = DEFAULT_RATE_LIMITS
+        self.limits = limits
+        self.store = store if store is not None else self._default_store()
+        self.trust_forwarded = trust_forwarded if trust_forwarded is not None else os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+
+    @staticmethod
+    def _default_store():
+        if os.getenv("RATE_LIMIT_BACKEND", "memory") == "redis":
+            from configs.cache import REDIS_URL
+            return RedisTokenBucketStore(REDIS_URL)
+        return MemoryTokenBucketStore()
+
+    def _client_ip(self, scope, headers) -> str:
+        if self.trust_forwarded and b"x-forwarded-for" in headers:
+            return headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = f"{scope['method']} {scope['path'].rstrip('/') or '/'}"
+        rules = self.limits.get(route)
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        identities = {"ip": self._client_ip(scope, headers)}
+        if any(rule.scope == "user" for rule in rules):
+            identities["user"] = bearer_user_id(headers)
+
+        applicable = [rule for rule in rules if identities.get(rule.scope) is not None]
+        # All or nothing: a request rejected by one rule doesn't spend the others' tokens
+        buckets = [(f"{route}|{rule.scope}|{identities[rule.scope]}", rule.rate, rule.burst) for rule in applicable]
+        waits = await self._acquire(buckets) if buckets else []
+        retry_after = 0.0
+        for rule, wait in zip(applicable, waits):
+            if wait > 0:
+                rate_limited_total.inc(route=route, scope=rule.scope)
+                retry_after = max(retry_after, wait)
+
+        if retry_after > 0:
+            await self._reject(send, retry_after)
+            return
+        await self.app(scope, receive, send)
+
+    async def _acquire(self, buckets: List[Tuple[str, float, int]]) -> List[float]:
+        # Stores without a blocking flag are assumed to do I/O
+        if getattr(self.store, "blocking", True):
+            return await anyio.to_thread.run_sync(self.store.acquire, buckets)
+        return self.store.acquire(buckets)
+
+    @staticmethod
+    async def _reject(send, retry_after: float) -> None:
+        body = json.dumps({"detail": "Too Many Requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
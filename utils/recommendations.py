@@ -0,0 +1,240 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime, UTC
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ReplaceOne
+
+from configs.cache import make_cache
+from configs.database import order_collection, product_related_collection
+from utils.metrics import REGISTRY
+
+try:
+    import numpy as np
+except ImportError:  # Optional: the pure-Python path gives the same result, only slower
+    np = None
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_ENABLED = os.getenv("RECOMMENDATIONS_ENABLED", "false").lower() == "true"
+RECOMMENDATIONS_INTERVAL = float(os.getenv("RECOMMENDATIONS_INTERVAL", "86400"))
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "10"))
+# Pairs bought together fewer times than this are noise, whatever their lift
+RECOMMENDATIONS_MIN_SUPPORT = int(os.getenv("RECOMMENDATIONS_MIN_SUPPORT", "2"))
+# Orders with more distinct products are counted for popularity but not paired (k items -> k*(k-1)/2 pairs)
+RECOMMENDATIONS_MAX_BASKET = int(os.getenv("RECOMMENDATIONS_MAX_BASKET", "50"))
+RELATED_CACHE_TTL = float(os.getenv("RELATED_CACHE_TTL", "300"))
+
+# Pair codes buffered before they are folded into the running (code, count) arrays
+_CHUNK_PAIRS = 4_000_000
+_WRITE_BATCH = 1000
+
+related_cache = make_cache("related", RELATED_CACHE_TTL, 50_000)
+
+recommendations_build_seconds = REGISTRY.histogram(
+    "recommendations_build_seconds", "Duration of one co-purchase recommendations build.", (),
+    buckets=(1, 5, 15, 60, 300, 900, 3600),
+)
+recommendations_pairs = REGISTRY.gauge(
+    "recommendations_pairs", "Distinct co-purchased product pairs above the support threshold in the last build.", ()
+)
+
+
+class CoPurchaseCounter:
+    """
+    Streams baskets and accumulates product and product-pair counts.
+
+    Product ids are mapped to dense integers; a pair (i, j), i < j, is encoded
+    as one int64 (i << 32 | j). With NumPy the codes are buffered in a flat
+    array and periodically folded with np.unique into sorted (code, count)
+    arrays, i.e. a COO sparse matrix holding only the upper triangle, so
+    memory follows the number of distinct pairs rather than the number of
+    orders. Without NumPy a Counter of (i, j) tuples is used.
+    """
+
+    def __init__(self, max_basket: int = RECOMMENDATIONS_MAX_BASKET, use_numpy: Optional[bool] = None):
+        self.max_basket = max_basket
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        if self.use_numpy and np is None:
+            raise ImportError("CoPurchaseCounter(use_numpy=True) requires the 'numpy' package (pip install numpy)")
+        self.products: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.item_counts = array("q")
+        self.orders = 0
+        self._buffer = array("q")
+        self._codes = np.empty(0, dtype=np.int64) if self.use_numpy else None
+        self._counts = np.empty(0, dtype=np.int64) if self.use_numpy else None
+        self._pairs: Counter = Counter()
+
+    def _id(self, product_id: str) -> int:
+        i = self.index.get(product_id)
+        if i is None:
+            i = self.index[product_id] = len(self.products)
+            self.products.append(product_id)
+            self.item_counts.append(0)
+        return i
+
+    def add(self, basket: Iterable[str]) -> None:
+        """Count one order (duplicates within the basket count once)."""
+        items = sorted({self._id(str(product_id)) for product_id in basket})
+        self.orders += 1
+        for i in items:
+            self.item_counts[i] += 1
+        if len(items) < 2 or len(items) > self.max_basket:
+            return
+        if self.use_numpy:
+            for a, i in enumerate(items):
+                self._buffer.extend([(i << 32) | j for j in items[a + 1:]])
+            if len(self._buffer) >= _CHUNK_PAIRS:
+                self._fold()
+        else:
+            for a, i in enumerate(items):
+                for j in items[a + 1:]:
+                    self._pairs[(i, j)] += 1
+
+    def _fold(self) -> None:
+        if not self._buffer:
+            return
+        codes, counts = np.unique(np.frombuffer(self._buffer, dtype=np.int64), return_counts=True)
+        self._buffer = array("q")
+        if self._codes.size:
+            merged, inverse = np.unique(np.concatenate((self._codes, codes)), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate((self._counts, counts))).astype(np.int64)
+            codes = merged
+        self._codes, self._counts = codes, counts
+
+    def top_k(self, k: int = RECOMMENDATIONS_TOP_K, min_support: int = RECOMMENDATIONS_MIN_SUPPORT) -> Dict[str, List[Dict]]:
+        """
+        Best k neighbours of every product by lift = P(i, j) / (P(i) * P(j)).
+
+        Returns:
+            product id -> [{"product_id", "lift", "count"}], best first
+        """
+        if self.use_numpy:
+            return self._top_k_numpy(k, min_support)
+        neighbours = defaultdict(list)
+        for (i, j), count in self._pairs.items():
+            if count < min_support:
+                continue
+            lift = count * self.orders / (self.item_counts[i] * self.item_counts[j])
+            # Negated so nsmallest ranks by lift, then count, then the older product
+            neighbours[i].append((-lift, -count, j))
+            neighbours[j].append((-lift, -count, i))
+        recommendations_pairs.set(sum(len(v) for v in neighbours.values()) // 2)
+        return {
+            self.products[i]: [{"product_id": self.products[j], "lift": round(-lift, 4), "count": -count}
+                               for lift, count, j in heapq.nsmallest(k, candidates)]
+            for i, candidates in neighbours.items()
+        }
+
+    def _top_k_numpy(self, k: int, min_support: int) -> Dict[str, List[Dict]]:
+        self._fold()
+        keep = self._counts >= min_support
+        codes, counts = self._codes[keep], self._counts[keep]
+        recommendations_pairs.set(int(codes.size))
+        if not codes.size:
+            return {}
+        upper, lower = codes >> 32, codes & 0xFFFFFFFF
+        # Mirror the upper triangle so every product sees all its neighbours
+        rows = np.concatenate((upper, lower))
+        cols = np.concatenate((lower, upper))
+        counts = np.concatenate((counts, counts))
+        items = np.frombuffer(self.item_counts, dtype=np.int64)
+        lift = (counts * self.orders) / (items[rows] * items[cols])
+
+        order = np.lexsort((cols, -counts, -lift, rows))
+        rows, cols, counts, lift = rows[order], cols[order], counts[order], lift[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        rank = np.arange(rows.size) - np.repeat(starts, np.diff(np.r_[starts, rows.size]))
+        best = rank < k
+        rows, cols, counts, lift = rows[best], cols[best], counts[best], lift[best]
+
+        related: Dict[str, List[Dict]] = {}
+        for i, j, count, score in zip(rows.tolist(), cols.tolist(), counts.tolist(), lift.tolist()):
+            related.setdefault(self.products[i], []).append(
+                {"product_id": self.products[j], "lift": round(score, 4), "count": count})
+        return related
+
+
+class RecommendationsJob:
+    """
+    Rebuilds "frequently bought together" lists from order history.
+
+    Each run streams non-cancelled orders (products only), computes the top-K
+    neighbours per product and replaces the product_related documents
+    ({_id: product id, related: [...]}); documents the run did not touch are
+    removed. Reads go through related_for(): a cache hit or one _id lookup.
+    """
+
+    def __init__(self, orders=order_collection, related=product_related_collection):
+        self.orders = orders
+        self.related = related
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def build(self) -> Dict[str, List[Dict]]:
+        counter = CoPurchaseCounter()
+        cursor = self.orders.find({"status": {"$ne": "Cancelled"}}, {"products": 1, "_id": 0}).batch_size(10_000)
+        for order in cursor:
+            counter.add(order.get("products") or [])
+        return counter.top_k()
+
+    def run_once(self) -> int:
+        """Rebuild and store every product's related list; returns how many were written."""
+        start = time.perf_counter()
+        related = self.build()
+        computed_at = datetime.now(UTC)
+        requests = []
+        for product_id, neighbours in related.items():
+            requests.append(ReplaceOne({"_id": product_id},
+                                       {"related": neighbours, "computed_at": computed_at}, upsert=True))
+            if len(requests) >= _WRITE_BATCH:
+                self.related.bulk_write(requests, ordered=False)
+                requests = []
+        if requests:
+            self.related.bulk_write(requests, ordered=False)
+        # Products that no longer have any qualifying pair
+        self.related.delete_many({"computed_at": {"$lt": computed_at}})
+        related_cache.clear()
+        recommendations_build_seconds.observe(time.perf_counter() - start)
+        logger.info("Rebuilt related products for %d products in %.1fs", len(related), time.perf_counter() - start)
+        return len(related)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="recommendations", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        # Build once at startup, then on the interval
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Recommendations build failed")
+            if self._stop.wait(RECOMMENDATIONS_INTERVAL):
+                return
+
+
+def related_for(product_id: str) -> List[Dict]:
+    """Precomputed related products of a product ([] when there are none)."""
+    related = related_cache.get(product_id)
+    if related is None:
+        doc = product_related_collection.find_one({"_id": product_id}, {"related": 1})
+        related = doc["related"] if doc else []
+        related_cache.set(product_id, related)
+    return related
+
+
+recommendations = RecommendationsJob()
@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from configs.database import reservations_collection
+from utils.inventory import inventory
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Hold stock on add_to_cart (unless the request passes hold=false) and convert holds at checkout
+CART_RESERVATIONS_ENABLED = os.getenv("CART_RESERVATIONS_ENABLED", "false").lower() == "true"
+RESERVATION_TTL = float(os.getenv("RESERVATION_TTL", "900"))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "5"))
+RESERVATION_SWEEP_BATCH = int(os.getenv("RESERVATION_SWEEP_BATCH", "500"))
+# A "releasing" claim older than this belongs to a sweeper that died mid-batch
+RESERVATION_CLAIM_TIMEOUT = float(os.getenv("RESERVATION_CLAIM_TIMEOUT", "60"))
+
+HELD = "held"
+RELEASING = "releasing"
+
+reservations_total = REGISTRY.counter(
+    "cart_reservations_total", "Stock holds by outcome (held, rejected, converted, expired, cancelled).", ("outcome",)
+)
+reservation_units_total = REGISTRY.counter(
+    "cart_reservation_units_total", "Units held, converted at checkout or released by expiry.", ("outcome",)
+)
+reservation_sweep_seconds = REGISTRY.histogram(
+    "cart_reservation_sweep_seconds", "Time taken by one expiry sweep batch.", ()
+)
+
+
+class Reservations:
+    """
+    Time-limited stock holds taken when an item is added to a cart.
+
+    A hold reserves stock through the inventory (so the unit is gone from
+    sale immediately) and records {user_id, product_id, quantity, expires_at}.
+    Checkout consumes unexpired holds one unit at a time instead of reserving
+    stock again. Expired holds are claimed atomically by the sweeper (status
+    held -> releasing), their stock is returned in one release per product,
+    and the records are deleted. A Mongo TTL index alone would delete records
+    without returning stock, so expiry is driven by the sweeper instead.
+    """
+
+    def __init__(self, collection=reservations_collection, ttl: float = RESERVATION_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def hold(self, user_id: str, product_id: str, quantity: int) -> bool:
+        """Reserve stock for a cart item and start (or extend) its hold; False if out of stock."""
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        if not inventory.decrement(product_id, quantity):
+            reservations_total.inc(outcome="rejected")
+            return False
+        now = datetime.now(UTC)
+        self.collection.update_one(
+            {"user_id": user_id, "product_id": product_id, "status": HELD},
+            {"$inc": {"quantity": quantity}, "$set": {"expires_at": now + timedelta(seconds=self.ttl)},
+             "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        )
+        reservations_total.inc(outcome="held")
+        reservation_units_total.inc(quantity, outcome="held")
+        return True
+
+    def resize(self, user_id: str, product_id: str, quantity: int) -> bool:
+        """
+        Make an existing hold cover quantity units (the cart line's new quantity).
+
+        Extra units are reserved before the hold grows and surplus units are
+        released after it shrinks; the hold is updated only if nobody changed
+        it since it was read, otherwise the change is undone and retried.
+        Returns False if the extra stock isn't there. Cart lines without a
+        hold (added with hold=false, or already expired) are left alone.
+        """
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        while True:
+            hold = self.collection.find_one({"user_id": user_id, "product_id": product_id, "status": HELD})
+            if hold is None:
+                return True
+            current = max(hold.get("quantity", 0), 0)
+            delta = quantity - current
+            if delta > 0 and not inventory.decrement(product_id, delta):
+                reservations_total.inc(outcome="rejected")
+                return False
+            res = self.collection.update_one(
+                {"_id": hold["_id"], "status": HELD, "quantity": hold.get("quantity", 0)},
+                {"$set": {"quantity": quantity, "expires_at": datetime.now(UTC) + timedelta(seconds=self.ttl)}},
+            )
+            if res.matched_count:
+                break
+            if delta > 0:
+                inventory.release(product_id, delta)
+        if delta < 0:
+            inventory.release(product_id, -delta)
+        if delta:
+            reservation_units_total.inc(abs(delta), outcome="held" if delta > 0 else "cancelled")
+        return True
+
+    def consume(self, user_id: str, product_id: str) -> bool:
+        """Convert one unit of an unexpired hold at checkout; False if there is none."""
+        hold = self.collection.find_one_and_update(
+            {"user_id": user_id, "product_id": product_id, "status": HELD,
+             "quantity": {"$gte": 1}, "expires_at": {"$gt": datetime.now(UTC)}},
+            {"$inc": {"quantity": -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if hold is None:
+            return False
+        if hold["quantity"] == 0:
+            self.collection.delete_one({"_id": hold["_id"], "quantity": 0})
+            reservations_total.inc(outcome="converted")
+        reservation_units_total.inc(outcome="converted")
+        return True
+
+    def restore(self, user_id: str, product_id: str) -> None:
+        """Put a consumed unit back on the user's hold (checkout failed after consume)."""
+        self.collection.update_one(
+            {"user_id": user_id, "product_id": product_id, "status": HELD},
+            {"$inc": {"quantity": 1}, "$setOnInsert": {"expires_at": datetime.now(UTC) + timedelta(seconds=self.ttl),
+                                                        "created_at": datetime.now(UTC)}},
+            upsert=True,
+        )
+
+    def cancel(self, user_id: str, product_id: str) -> int:
+        """Release a hold early (item removed from the cart); returns units released."""
+        hold = self.collection.find_one_and_delete({"user_id": user_id, "product_id": product_id, "status": HELD})
+        if not hold or hold.get("quantity", 0) <= 0:
+            return 0
+        inventory.release(product_id, hold["quantity"])
+        reservations_total.inc(outcome="cancelled")
+        return hold["quantity"]
+
+    def cancel_all(self, user_id: str) -> int:
+        """Release every hold a user still has (after checkout emptied the cart); returns units released."""
+        released = 0
+        for hold in self.collection.find({"user_id": user_id, "status": HELD}, {"product_id": 1}):
+            released += self.cancel(user_id, hold["product_id"])
+        return released
+
+    # ---- expiry ----
+
+    def _claim_expired(self, now: datetime) -> List[Dict]:
+        claimed = []
+        stale_claim = now - timedelta(seconds=RESERVATION_CLAIM_TIMEOUT)
+        expired = {"$or": [
+            {"status": HELD, "expires_at": {"$lte": now}},
+            {"status": RELEASING, "claimed_at": {"$lte": stale_claim}},
+        ]}
+        for candidate in self.collection.find(expired, {"_id": 1}).limit(RESERVATION_SWEEP_BATCH):
+            # Re-check inside the update: checkout may have consumed or extended it meanwhile
+            hold = self.collection.find_one_and_update(
+                {"_id": candidate["_id"], **expired},
+                {"$set": {"status": RELEASING, "claimed_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if hold is not None:
+                claimed.append(hold)
+        return claimed
+
+    def sweep(self) -> int:
+        """Release one batch of expired holds; returns how many holds were released."""
+        start = time.perf_counter()
+        claimed = self._claim_expired(datetime.now(UTC))
+        if not claimed:
+            return 0
+
+        units: Dict[str, int] = defaultdict(int)
+        for hold in claimed:
+            units[hold["product_id"]] += max(hold.get("quantity", 0), 0)
+        # Delete before releasing: a crash in between leaks stock instead of returning it twice
+        self.collection.delete_many({"_id": {"$in": [hold["_id"] for hold in claimed]}, "status": RELEASING})
+        for product_id, quantity in units.items():
+            if quantity:
+                inventory.release(product_id, quantity)
+
+        reservations_total.inc(len(claimed), outcome="expired")
+        reservation_units_total.inc(sum(units.values()), outcome="expired")
+        reservation_sweep_seconds.observe(time.perf_counter() - start)
+        return len(claimed)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(RESERVATION_SWEEP_INTERVAL):
+            try:
+                # Keep going while full batches come back
+                while self.sweep() >= RESERVATION_SWEEP_BATCH and not self._stop.is_set():
+                    pass
+            except Exception:
+                logger.exception("Reservation sweep failed")
+
+
+reservations = Reservations()
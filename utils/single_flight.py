@@ -0,0 +1,123 @@
+import asyncio
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+import anyio.to_thread
+
+from utils.metrics import REGISTRY
+
+single_flight_calls_total = REGISTRY.counter(
+    "single_flight_calls_total", "Single-flight calls by group and role (leader ran the loader, coalesced waited on it).", ("group", "role")
+)
+single_flight_in_flight = REGISTRY.gauge(
+    "single_flight_in_flight", "Keys with a loader currently running.", ("group",)
+)
+
+
+class _Call:
+    """One in-flight load shared by every caller asking for the same key."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        # (event loop, future) pairs for async callers waiting on this load
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+def _resolve(future: asyncio.Future, result: Any, error: BaseException) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent loads of the same key into a single call.
+
+    Works across both execution models FastAPI uses: sync handlers on the
+    threadpool call do(), async code awaits do_async(). Both share the same
+    in-flight table, so a thread and a coroutine asking for the same key still
+    trigger only one loader.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable) -> Tuple[_Call, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                single_flight_calls_total.inc(group=self.group, role="coalesced")
+                return call, False
+            call = self._calls[key] = _Call()
+        single_flight_calls_total.inc(group=self.group, role="leader")
+        single_flight_in_flight.inc(group=self.group)
+        return call, True
+
+    def _finish(self, key: Hashable, call: _Call, result: Any, error: BaseException) -> None:
+        with self._lock:
+            call.result, call.error = result, error
+            self._calls.pop(key, None)
+            waiters = list(call.waiters)
+            call.done.set()
+        single_flight_in_flight.dec(group=self.group)
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for the identical call already in flight (blocking)."""
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        result = error = None
+        try:
+            result = fn()
+            return result
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._finish(key, call, result, error)
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Async variant of do(). fn may be a coroutine function or a blocking
+        callable; blocking loaders run on the threadpool.
+        """
+        call, leader = self._join(key)
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                if call.done.is_set():
+                    _resolve(future, call.result, call.error)
+                else:
+                    call.waiters.append((loop, future))
+            return await future
+        result = error = None
+        try:
+            if inspect.iscoroutinefunction(fn):
+                result = await fn()
+            else:
+                result = await anyio.to_thread.run_sync(fn)
+            return result
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._finish(key, call, result, error)
+
+    def in_flight(self) -> int:
+        return len(self._calls)